@@ -0,0 +1,431 @@
+"""
+长期记忆策略基准测试
+对比各策略的提取耗时、检索延迟和召回率，输出 JSON 报告
+
+- 语料参照 SAMPLE_CONVERSATIONS_CN / SAMPLE_USERS 的句式生成：每个 actor 随机填充一组事实和偏好，
+  穿插示例对话作为干扰轮次，按会话通过 BulkIngester 并发写入
+- 提取耗时：抽样 actor 的会话最后写入，从写入完成到各策略命名空间出现记录的时间
+- 检索：每条事实按所属策略命名空间查询，统计 p50/p90/p99 延迟（含客户端限流排队）；
+  top-k 结果中任意一条包含该事实的取值即视为命中，计算 recall@k
+- 无 AWS 凭证时使用 FakeMemoryClient，延迟和各策略的提取耗时由 --latency-profile 指定
+
+运行:
+    python benchmark_memory_strategy.py                          # 有凭证时使用真实服务，否则离线运行
+    python benchmark_memory_strategy.py --backend fake --actors 1000 --latency-profile realistic
+    python benchmark_memory_strategy.py --backend fake --latency-profile my_profile.json --output report.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+from bulk_ingest import BulkIngester
+from memory_utils import (
+    SAMPLE_CONVERSATIONS_CN,
+    SAMPLE_USERS,
+    extract_content,
+    get_memory_client,
+    get_or_create_memory,
+    print_header,
+    retrieve_memories,
+    wait_for_memory_records_async,
+)
+from rate_limiter import DEFAULT_RATES, get_rate_limiter
+
+
+# ============================================================
+# 策略与语料模板
+# ============================================================
+STRATEGIES = {
+    # 名称: (策略类型, 命名空间模板)
+    "semantic": ("semanticMemoryStrategy", "/facts/{actorId}"),
+    "preference": ("userPreferenceMemoryStrategy", "/preferences/{actorId}"),
+    "summary": ("summaryMemoryStrategy", "/summaries/{actorId}/{sessionId}"),
+}
+
+# (所属策略, 用户消息, 查询, 可选取值)；summary 策略查询所有事实
+FACT_TEMPLATES = [
+    ("semantic", "你好，我叫{value}，很高兴认识你", "我叫什么名字",
+     ["张三", "李明", "王芳", "赵磊", "陈静", "刘洋", "杨帆", "周婷"]),
+    ("semantic", "我在{value}工作，已经五年了", "我在哪个城市工作",
+     ["北京", "上海", "深圳", "杭州", "成都", "广州", "南京", "武汉"]),
+    ("semantic", "我的职业是{value}", "我的职业是什么",
+     ["软件工程师", "产品经理", "UI设计师", "数据分析师", "运维工程师", "律师", "医生", "教师"]),
+    ("semantic", "我今年{value}岁", "我今年多少岁", [str(age) for age in range(24, 46)]),
+    ("preference", "我比较喜欢{value}的产品，用惯了", "我喜欢什么品牌的产品",
+     ["苹果", "华为", "小米", "ThinkPad", "戴尔", "索尼"]),
+    ("preference", "我买电脑的预算是{value}元左右", "买电脑的预算是多少",
+     ["6000", "8000", "10000", "12000", "15000", "20000"]),
+    ("preference", "我平时主要用{value}", "平时主要用什么工具",
+     ["Python", "Figma", "Linux", "Excel", "Java", "Photoshop"]),
+    ("preference", "我更看重{value}，不太在意外观", "我更看重什么",
+     ["性能", "稳定性", "续航", "屏幕", "便携性"]),
+]
+
+ASSISTANT_REPLIES = ["好的，我记住了。", "明白了，谢谢告诉我。", "了解，还有什么可以帮您？", "收到！"]
+
+# 干扰轮次：示例数据中的全部对话
+FILLER_TURNS = [(c["user"], c["assistant"]) for c in SAMPLE_CONVERSATIONS_CN] + [
+    (c["user"], c["assistant"]) for user in SAMPLE_USERS.values() for c in user["conversations"]
+]
+
+
+# ============================================================
+# 离线延迟配置
+# ============================================================
+# latency: {API: 秒数 或 [中位数秒数, 对数正态 sigma]}；extraction_delay: {策略类型: 秒数}
+LATENCY_PROFILES = {
+    "zero": {"latency": {}, "extraction_delay": {}},
+    "fast": {
+        "latency": {
+            "create_event": [0.01, 0.3],
+            "retrieve_memory_records": [0.02, 0.3],
+            "list_memory_records": [0.01, 0.3],
+        },
+        "extraction_delay": {
+            "semanticMemoryStrategy": 0.5,
+            "userPreferenceMemoryStrategy": 0.8,
+            "summaryMemoryStrategy": 1.5,
+        },
+    },
+    "realistic": {
+        "latency": {
+            "create_event": [0.05, 0.4],
+            "retrieve_memory_records": [0.15, 0.5],
+            "list_memory_records": [0.05, 0.4],
+        },
+        "extraction_delay": {
+            "semanticMemoryStrategy": 20,
+            "userPreferenceMemoryStrategy": 25,
+            "summaryMemoryStrategy": 40,
+        },
+    },
+}
+
+
+def load_latency_profile(name_or_path):
+    """内置配置名，或同格式的 JSON 文件路径"""
+    if name_or_path in LATENCY_PROFILES:
+        return LATENCY_PROFILES[name_or_path]
+    with open(name_or_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_latency(spec, rng):
+    """把配置转换为 FakeMemoryClient 的 latency 参数"""
+    latency = {}
+    for api, value in spec.items():
+        if isinstance(value, (int, float)):
+            latency[api] = value
+        else:
+            median, sigma = value
+            latency[api] = lambda mu=math.log(median), sigma=sigma: rng.lognormvariate(mu, sigma)
+    return latency
+
+
+def create_client(backend, profile_spec, region=None, aws_profile=None, seed=None):
+    """backend 为 auto 时，检测到 AWS 凭证则使用真实服务；返回 (client, 实际后端)"""
+    if backend == "auto":
+        backend = "real" if boto3.Session(profile_name=aws_profile).get_credentials() else "fake"
+    if backend == "real":
+        return get_memory_client(region, aws_profile), backend
+
+    from fake_memory_client import FakeMemoryClient
+    rng = random.Random(seed)
+    return FakeMemoryClient(
+        latency=build_latency(profile_spec.get("latency", {}), rng),
+        extraction_delay=profile_spec.get("extraction_delay", {}),
+        seed=seed,
+        region_name=region,
+    ), backend
+
+
+# ============================================================
+# 语料生成
+# ============================================================
+def namespace_for(strategy, actor_id, session_id):
+    return STRATEGIES[strategy][1].replace("{actorId}", actor_id).replace("{sessionId}", session_id)
+
+
+def generate_actor(actor_id, run_id, sessions, filler_turns, rng):
+    """
+    生成一个 actor 的会话记录和对应的探测查询
+
+    Returns:
+        (records, probes)：records 为 BulkIngester 的输入，
+        probes 为 [(策略名, 命名空间, 查询, 期望取值)]
+    """
+    facts = [(strategy, user.format(value=value), query, value)
+             for strategy, user, query, values in FACT_TEMPLATES
+             for value in [rng.choice(values)]]
+    rng.shuffle(facts)
+    fact_values = [value for _, _, _, value in facts]
+    # 排除包含本 actor 取值的干扰轮次，避免干扰轮次被误判为命中
+    fillers = [turn for turn in FILLER_TURNS if not any(value in turn[0] for value in fact_values)]
+
+    records, probes = [], []
+    for index in range(sessions):
+        session_id = f"bench-{run_id}-s{index}"
+        session_facts = facts[index::sessions]
+        turns = [(user, rng.choice(ASSISTANT_REPLIES)) for _, user, _, _ in session_facts]
+        turns += rng.sample(fillers, min(filler_turns, len(fillers)))
+        rng.shuffle(turns)
+        records.append({
+            "actor_id": actor_id,
+            "session_id": session_id,
+            "messages": [message for user, assistant in turns for message in ([user, "USER"], [assistant, "ASSISTANT"])],
+        })
+        for strategy, _, query, value in session_facts:
+            probes.append((strategy, namespace_for(strategy, actor_id, session_id), query, value))
+            probes.append(("summary", namespace_for("summary", actor_id, session_id), query, value))
+    return records, probes
+
+
+def generate_corpus(actors, sessions, filler_turns, probe_actors, run_id, seed=None):
+    """返回 (背景语料记录, 抽样 actor 记录, 抽样 actor 探测查询)"""
+    rng = random.Random(seed)
+    background, sampled, probes = [], [], []
+    for index in range(actors):
+        records, actor_probes = generate_actor(f"bench-{run_id}-u{index:06d}", run_id, sessions, filler_turns, rng)
+        if index < probe_actors:
+            sampled.extend(records)
+            probes.extend(actor_probes)
+        else:
+            background.extend(records)
+    return background, sampled, probes
+
+
+# ============================================================
+# 测量
+# ============================================================
+def percentile(values, p):
+    """计算百分位数（线性插值），values 为空时返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def latency_summary(values):
+    return {f"p{p}": percentile(values, p) for p in (50, 90, 99)}
+
+
+def measure_extraction(client, memory_id, namespaces_by_strategy, start, timeout, poll_interval):
+    """
+    各策略、各命名空间并发轮询，记录每个命名空间从 start 起到出现记录的秒数
+
+    Returns:
+        {策略名: {"p50", "p90", "p99", "max", "ready", "timeouts"}}
+    """
+    async def wait(strategy):
+        ready_at = {}
+
+        def mark(namespace, records):
+            ready_at.setdefault(namespace, time.monotonic() - start)
+            return True
+
+        namespaces = namespaces_by_strategy[strategy]
+        try:
+            await wait_for_memory_records_async(client, memory_id, namespaces, predicate=mark, timeout=timeout,
+                                                initial_delay=poll_interval, max_delay=poll_interval)
+        except TimeoutError:
+            pass
+        times = list(ready_at.values())
+        return strategy, dict(latency_summary(times), max=max(times, default=None),
+                              ready=len(times), timeouts=len(namespaces) - len(times))
+
+    async def wait_all():
+        return dict(await asyncio.gather(*(wait(strategy) for strategy in namespaces_by_strategy)))
+
+    return asyncio.run(wait_all())
+
+
+def measure_retrieval(client, memory_id, probes, top_k, concurrency):
+    """
+    执行探测查询
+
+    Returns:
+        {策略名: {"queries", "errors", "p50_ms", "p90_ms", "p99_ms", "recall_at_k"}}
+    """
+    def run_probe(probe):
+        strategy, namespace, query, value = probe
+        start = time.perf_counter()
+        try:
+            results = retrieve_memories(client, memory_id, namespace, query, top_k=top_k)
+        except Exception:
+            return strategy, None, False
+        hit = any(value in extract_content(r) for r in results[:top_k])
+        return strategy, time.perf_counter() - start, hit
+
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for strategy, seconds, hit in executor.map(run_probe, probes):
+            outcomes.setdefault(strategy, []).append((seconds, hit))
+
+    report = {}
+    for strategy, results in outcomes.items():
+        latencies = [seconds * 1000 for seconds, _ in results if seconds is not None]
+        report[strategy] = {
+            "queries": len(results),
+            "errors": len(results) - len(latencies),
+            **{f"{key}_ms": value for key, value in latency_summary(latencies).items()},
+            "recall_at_k": sum(hit for _, hit in results) / len(results),
+        }
+    return report
+
+
+# ============================================================
+# 基准测试
+# ============================================================
+def run_benchmark(client, memory_id, actors=100, sessions=2, filler_turns=2, probe_actors=10, top_k=3,
+                  workers=8, concurrency=8, timeout=600, poll_interval=1.0, seed=None):
+    """生成并写入语料，测量各策略的提取耗时、检索延迟和 recall@k，返回报告字典"""
+    run_id = f"{int(time.time())}-{random.Random(seed).randrange(16 ** 4):04x}"
+    probe_actors = min(probe_actors, actors)
+    background, sampled, probes = generate_corpus(actors, sessions, filler_turns, probe_actors, run_id, seed)
+
+    # 1. 背景语料
+    print(f"\n[*] 写入背景语料: {actors - probe_actors} 个 actor, {len(background)} 个会话")
+    ingest = BulkIngester(memory_id, client=client, workers=workers).run(json.dumps(r) for r in background)
+
+    # 2. 抽样 actor 最后写入，从写入完成开始计算提取耗时
+    print(f"\n[*] 写入抽样语料: {probe_actors} 个 actor, {len(sampled)} 个会话")
+    probe_ingest = BulkIngester(memory_id, client=client, workers=workers).run(json.dumps(r) for r in sampled)
+    written_at = time.monotonic()
+
+    namespaces_by_strategy = {}
+    for strategy, namespace, _, _ in probes:
+        namespaces_by_strategy.setdefault(strategy, set()).add(namespace)
+    namespaces_by_strategy = {strategy: sorted(ns) for strategy, ns in namespaces_by_strategy.items()}
+
+    print(f"\n[*] 等待长期记忆提取: {sum(len(ns) for ns in namespaces_by_strategy.values())} 个命名空间")
+    extraction = measure_extraction(client, memory_id, namespaces_by_strategy, written_at, timeout, poll_interval)
+
+    print(f"\n[*] 执行 {len(probes)} 条检索查询 (top_k={top_k}, 并发 {concurrency})")
+    retrieval = measure_retrieval(client, memory_id, probes, top_k, concurrency)
+
+    events = ingest["events"] + probe_ingest["events"]
+    seconds = ingest["seconds"] + probe_ingest["seconds"]
+    return {
+        "run_id": run_id,
+        "memory_id": memory_id,
+        "config": {
+            "actors": actors,
+            "sessions_per_actor": sessions,
+            "filler_turns": filler_turns,
+            "probe_actors": probe_actors,
+            "top_k": top_k,
+            "workers": workers,
+            "concurrency": concurrency,
+            "seed": seed,
+        },
+        "ingest": {
+            "sessions": len(background) + len(sampled),
+            "events": events,
+            "failed_records": ingest["failed_records"] + probe_ingest["failed_records"],
+            "seconds": seconds,
+            "events_per_sec": events / seconds if seconds else None,
+        },
+        "strategies": {
+            strategy: {
+                "strategy_type": STRATEGIES[strategy][0],
+                "namespaces": len(namespaces_by_strategy[strategy]),
+                "time_to_extraction_s": extraction[strategy],
+                "retrieval": retrieval.get(strategy),
+            }
+            for strategy in namespaces_by_strategy
+        },
+    }
+
+
+def print_report(report):
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    print(f"\n{'策略':<12} | {'提取p50(s)':>10} | {'提取max(s)':>10} | {'超时':>4} | "
+          f"{'p50(ms)':>8} | {'p90(ms)':>8} | {'p99(ms)':>8} | {'recall@k':>8}")
+    print("-" * 92)
+    for strategy, result in report["strategies"].items():
+        extraction, retrieval = result["time_to_extraction_s"], result["retrieval"] or {}
+        print(f"{strategy:<12} | {fmt(extraction['p50'], '>10.2f')} | {fmt(extraction['max'], '>10.2f')} | "
+              f"{extraction['timeouts']:>4} | {fmt(retrieval.get('p50_ms'), '>8.1f')} | "
+              f"{fmt(retrieval.get('p90_ms'), '>8.1f')} | {fmt(retrieval.get('p99_ms'), '>8.1f')} | "
+              f"{fmt(retrieval.get('recall_at_k'), '>8.1%')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AgentCore 长期记忆策略基准测试")
+    parser.add_argument("--backend", choices=["auto", "fake", "real"], default="auto",
+                        help="auto: 有 AWS 凭证时使用真实服务，否则使用 FakeMemoryClient")
+    parser.add_argument("--actors", type=int, default=100)
+    parser.add_argument("--sessions", type=int, default=2, help="每个 actor 的会话数")
+    parser.add_argument("--filler-turns", type=int, default=2, help="每个会话的干扰轮次数")
+    parser.add_argument("--probe-actors", type=int, default=10, help="用于测量的抽样 actor 数")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8, help="写入线程数")
+    parser.add_argument("--concurrency", type=int, default=8, help="检索并发数")
+    parser.add_argument("--timeout", type=float, default=600, help="等待提取的最长秒数")
+    parser.add_argument("--poll-interval", type=float, help="提取轮询间隔（默认 fake 0.1 秒，real 5 秒）")
+    parser.add_argument("--latency-profile", default="fast",
+                        help=f"离线延迟配置: {'/'.join(LATENCY_PROFILES)} 或 JSON 文件路径")
+    parser.add_argument("--memory-name", default="StrategyBenchmarkMemory")
+    parser.add_argument("--region", help="AWS 区域")
+    parser.add_argument("--profile", help="AWS 凭证 profile")
+    parser.add_argument("--rate", type=float, help="每个 API 每秒请求上限（默认 real 使用共享限流器的配置，fake 不限流）")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", default="memory_strategy_benchmark.json", help="JSON 报告路径")
+    args = parser.parse_args()
+
+    print_header("长期记忆策略基准测试")
+    client, backend = create_client(args.backend, load_latency_profile(args.latency_profile),
+                                    args.region, args.profile, args.seed)
+    print(f"[*] 后端: {backend}" + (f", 延迟配置: {args.latency_profile}" if backend == "fake" else ""))
+    # 检索延迟包含客户端限流的排队时间；离线运行时不限流，只测量注入的延迟
+    if args.rate or backend == "fake":
+        for api in DEFAULT_RATES:
+            get_rate_limiter().set_rate(api, args.rate)
+
+    memory_id = get_or_create_memory(
+        name=args.memory_name,
+        description="长期记忆策略基准测试",
+        strategies=[{strategy_type: {"name": name, "namespaces": [namespace]}}
+                    for name, (strategy_type, namespace) in STRATEGIES.items()],
+        event_expiry_days=7,
+        client=client,
+        use_cache=backend == "real",
+    )
+
+    report = run_benchmark(
+        client, memory_id,
+        actors=args.actors,
+        sessions=args.sessions,
+        filler_turns=args.filler_turns,
+        probe_actors=args.probe_actors,
+        top_k=args.top_k,
+        workers=args.workers,
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        poll_interval=args.poll_interval or (0.1 if backend == "fake" else 5),
+        seed=args.seed,
+    )
+    report["backend"] = backend
+    if backend == "fake":
+        report["latency_profile"] = args.latency_profile
+
+    print_report(report)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n[+] 报告已写入 {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+AgentCore Memory 批量导入
+从 JSONL 导入历史对话，每行 {"actor_id": ..., "session_id": ..., "messages": [["内容", "USER"], ...]}
+
+- 按 actor_id 分区到固定的工作线程，同一 actor（及其所有会话）的记录按文件顺序写入
+- 定期把"之前所有行都已完成"的行号写入检查点文件，中断后用同样的命令续跑
+  （检查点之后已完成的少量记录会被重新写入）
+- 写入失败的记录（包括格式错误、无法解析的记录）保存到 <path>.failed.jsonl，可直接作为输入重新导入
+- 定期打印 events/sec
+
+运行:
+    python bulk_ingest.py chats.jsonl --memory-name HistoryMemory --workers 16
+    python bulk_ingest.py chats.jsonl --fake --workers 16      # 使用本地 FakeMemoryClient
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+
+from memory_utils import (
+    create_event_with_retry,
+    get_long_term_memory,
+    get_memory_client,
+    print_header,
+)
+from rate_limiter import get_rate_limiter
+
+
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_MESSAGES = 20        # 单个事件最多包含的消息数
+DEFAULT_CHECKPOINT_INTERVAL = 5  # 秒
+QUEUE_SIZE = 1000                # 每个工作线程的待处理记录上限
+
+
+def parse_messages(messages):
+    """支持 ["内容", "角色"] 和 {"text"/"content": ..., "role": ...} 两种格式"""
+    parsed = []
+    for message in messages:
+        if isinstance(message, dict):
+            parsed.append((message.get("text") or message.get("content"), message["role"].upper()))
+        else:
+            parsed.append((message[0], message[1].upper()))
+    return parsed
+
+
+class Checkpoint:
+    """
+    记录连续完成的最大行号
+
+    各工作线程完成顺序不同，只有当某行之前的所有行都完成时水位才会前进
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.lock = threading.Lock()
+        self.line = -1
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.line = json.load(f)["line"]
+
+    def complete(self, line):
+        with self.lock:
+            self.done.add(line)
+            while self.line + 1 in self.done:
+                self.line += 1
+                self.done.remove(self.line)
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            line = self.line
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"line": line, "updated_at": time.time()}, f)
+        os.replace(tmp_path, self.path)
+
+
+class BulkIngester:
+    """
+    按 actor 分区的并发导入
+
+    Args:
+        client: MemoryClient 实例（可选，默认使用单例）
+        memory_id: Memory ID
+        workers: 工作线程数
+        checkpoint_path: 检查点文件路径（None 表示不记录）
+        failures_path: 写入失败的记录追加到该 JSONL 文件，可直接作为输入重新导入
+        max_messages: 单个事件最多包含的消息数，超出的记录拆成多个事件
+    """
+
+    def __init__(self, memory_id, client=None, workers=DEFAULT_WORKERS, checkpoint_path=None, failures_path=None,
+                 max_messages=DEFAULT_MAX_MESSAGES, report_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.client = client or get_memory_client()
+        self.memory_id = memory_id
+        self.workers = workers
+        self.max_messages = max_messages
+        self.report_interval = report_interval
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.stats = {"records": 0, "events": 0, "failed_records": 0, "skipped": 0}
+        self.failed_lines = []
+        self.failures_path = failures_path
+        self.stats_lock = threading.Lock()
+
+    def _ingest_record(self, record):
+        messages = parse_messages(record["messages"])
+        for start in range(0, len(messages), self.max_messages):
+            if not create_event_with_retry(self.client, self.memory_id, record["actor_id"],
+                                           record["session_id"], messages[start:start + self.max_messages]):
+                return False
+            with self.stats_lock:
+                self.stats["events"] += 1
+        return True
+
+    def _record_result(self, line, record, success):
+        """统计一条记录的结果，失败的记录追加到 failures 文件（record 为原始行文本时原样写入）"""
+        with self.stats_lock:
+            self.stats["records"] += 1
+            if not success:
+                self.stats["failed_records"] += 1
+                self.failed_lines.append(line)
+                if self.failures_path:
+                    text = record.rstrip("\n") if isinstance(record, str) else json.dumps(record, ensure_ascii=False)
+                    with open(self.failures_path, "a", encoding="utf-8") as f:
+                        f.write(text + "\n")
+        self.checkpoint.complete(line)
+
+    def _worker(self, tasks):
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            line, record = task
+            try:
+                success = self._ingest_record(record)
+            except Exception as e:
+                # 格式错误的消息等异常只让这一条记录失败，线程继续处理分区中的后续记录，
+                # 否则主线程会在该分区写满的队列上永久阻塞
+                print(f"    [-] 第 {line + 1} 行导入失败: {type(e).__name__}: {e}")
+                success = False
+            self._record_result(line, record, success)
+
+    def _report(self, start_time, final=False):
+        elapsed = time.time() - start_time
+        with self.stats_lock:
+            stats = dict(self.stats)
+        rate = stats["events"] / elapsed if elapsed else 0
+        prefix = "[+] 完成" if final else "[*] 进度"
+        print(f"{prefix}: {stats['records']} 条记录, {stats['events']} 个事件, "
+              f"失败 {stats['failed_records']} 条, {rate:.1f} events/sec")
+
+    def run(self, lines):
+        """导入 JSONL 行（可迭代对象），返回统计信息"""
+        queues = [queue.Queue(maxsize=QUEUE_SIZE) for _ in range(self.workers)]
+        threads = [threading.Thread(target=self._worker, args=(q,), daemon=True) for q in queues]
+        for thread in threads:
+            thread.start()
+
+        start_time = last_report = time.time()
+        try:
+            for line_number, line in enumerate(lines):
+                if line_number <= self.checkpoint.line:
+                    self.stats["skipped"] += 1
+                    continue
+                if not line.strip():
+                    self.checkpoint.complete(line_number)
+                    continue
+                try:
+                    record = json.loads(line)
+                    # 同一 actor 固定分配到同一个线程，保证其会话内的写入顺序
+                    partition = zlib.crc32(record["actor_id"].encode("utf-8")) % self.workers
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    print(f"    [-] 第 {line_number + 1} 行格式错误: {type(e).__name__}: {e}")
+                    self._record_result(line_number, line, False)
+                    continue
+                queues[partition].put((line_number, record))
+
+                if time.time() - last_report >= self.report_interval:
+                    self.checkpoint.save()
+                    self._report(start_time)
+                    last_report = time.time()
+        finally:
+            for q in queues:
+                q.put(None)
+            for thread in threads:
+                thread.join()
+            self.checkpoint.save()
+
+        self.stats["seconds"] = time.time() - start_time
+        self._report(start_time, final=True)
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AgentCore Memory 批量导入历史对话")
+    parser.add_argument("path", help="JSONL 文件，每行 {actor_id, session_id, messages}")
+    parser.add_argument("--memory-id", help="已有 Memory ID")
+    parser.add_argument("--memory-name", default="BulkIngestMemory", help="未指定 --memory-id 时创建或获取的 Memory")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--checkpoint", help="检查点文件（默认 <path>.checkpoint）")
+    parser.add_argument("--rate", type=float, help="每个 memory 每秒 create_event 上限")
+    parser.add_argument("--region", help="AWS 区域")
+    parser.add_argument("--profile", help="AWS 凭证 profile")
+    parser.add_argument("--fake", action="store_true", help="使用本地 FakeMemoryClient")
+    args = parser.parse_args()
+
+    print_header("AgentCore Memory 批量导入")
+    if args.fake:
+        from fake_memory_client import FakeMemoryClient
+        client = FakeMemoryClient(latency=0.02)
+    else:
+        client = get_memory_client(args.region, args.profile)
+    if args.rate:
+        get_rate_limiter().set_rate("create_event", args.rate)
+
+    # 命名空间保留 {actorId} 占位符，每个 actor 的长期记忆各自独立
+    memory_id = args.memory_id or get_long_term_memory(name=args.memory_name, actor_id="{actorId}", client=client,
+                                                        use_cache=not args.fake)
+    ingester = BulkIngester(
+        memory_id,
+        client=client,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint or args.path + ".checkpoint",
+        failures_path=args.path + ".failed.jsonl",
+    )
+    with open(args.path, encoding="utf-8") as f:
+        ingester.run(f)
+
+    if ingester.failed_lines:
+        print(f"[-] {len(ingester.failed_lines)} 条记录写入失败，已保存到 {ingester.failures_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,12 @@ Demo: 长期记忆演示
 
 运行: python demo_longterm_memory.py
 """
-import time
 from memory_utils import (
     get_memory_client,
     get_or_create_memory,
-    create_event_with_retry,
+    write_conversation,
+    wait_for_memory_records,
+    expected_record_counts,
     extract_content,
     SAMPLE_CONVERSATIONS_CN,
     DEFAULT_ACTOR_ID,
@@ -58,43 +59,27 @@ def main():
 
     # 3. 写入对话数据
     print_section("3. 写入对话数据")
+    namespaces = [f"/facts/{actor_id}", f"/preferences/{actor_id}"]
+    # 记录写入前的记录数，等待本次新增的记录而不是以前运行留下的
+    expected = expected_record_counts(client, memory_id, namespaces)
     print(f"写入 {len(SAMPLE_CONVERSATIONS_CN)} 轮对话...")
 
     for i, conv in enumerate(SAMPLE_CONVERSATIONS_CN, 1):
-        # 用户消息
-        success1 = create_event_with_retry(
-            client, memory_id, actor_id, session_id,
-            [(conv["user"], "USER")]
-        )
-
-        if success1:
-            time.sleep(0.5)
-            # 助手回复
-            success2 = create_event_with_retry(
-                client, memory_id, actor_id, session_id,
-                [(conv["assistant"], "ASSISTANT")]
-            )
-
-            if success2:
-                print(f"  [{i}] {conv['user'][:40]}...")
-            else:
-                print(f"  [{i}] 助手回复写入失败")
+        # 用户消息和助手回复作为一个事件写入
+        if write_conversation(client, memory_id, actor_id, session_id, conv["user"], conv["assistant"]):
+            print(f"  [{i}] {conv['user'][:40]}...")
         else:
-            print(f"  [{i}] 用户消息写入失败")
-
-        time.sleep(1)
+            print(f"  [{i}] 对话写入失败")
 
     print("\n[+] 对话写入完成")
 
     # 4. 等待长期记忆生成
     print_section("4. 等待长期记忆生成")
-    wait_time = 30
-    print(f"[*] AgentCore 需要时间从对话中提取长期记忆...")
-    print(f"[*] 等待 {wait_time} 秒...")
-
-    for i in range(wait_time, 0, -10):
-        print(f"    剩余 {i} 秒...")
-        time.sleep(10)
+    print("[*] AgentCore 需要时间从对话中提取长期记忆，轮询直到记录生成...")
+    try:
+        wait_for_memory_records(client, memory_id, namespaces, min_records=expected)
+    except TimeoutError as e:
+        print(f"    [!] {e}")
 
     # 5. 检索语义记忆
     print_section("5. 检索语义记忆 (Semantic Memory)")
@@ -4,11 +4,13 @@ Demo: 短期+长期记忆综合演示
 
 运行: python demo_memory_combined.py
 """
-import time
 from memory_utils import (
     get_memory_client,
     get_or_create_memory,
-    create_event_with_retry,
+    write_conversation,
+    get_last_k_turns,
+    wait_for_memory_records,
+    expected_record_counts,
     extract_content,
     DEFAULT_ACTOR_ID,
     DEFAULT_SESSION_ID,
@@ -68,20 +70,14 @@ def main():
         ("好的，我先从Pandas开始学习，谢谢！", "不客气！有问题随时问我，祝你学习顺利！")
     ]
 
+    # 记录写入前的记录数，等待本次新增的记录而不是以前运行留下的
+    longterm_namespaces = [f"/facts/{actor_id}", f"/preferences/{actor_id}"]
+    expected = expected_record_counts(client, memory_id, longterm_namespaces)
+
     print("写入对话...")
     for i, (user_msg, assistant_msg) in enumerate(conversations, 1):
-        success1 = create_event_with_retry(
-            client, memory_id, actor_id, session_id,
-            [(user_msg, "USER")]
-        )
-        if success1:
-            time.sleep(0.3)
-            create_event_with_retry(
-                client, memory_id, actor_id, session_id,
-                [(assistant_msg, "ASSISTANT")]
-            )
+        if write_conversation(client, memory_id, actor_id, session_id, user_msg, assistant_msg):
             print(f"  [{i}] User: {user_msg[:40]}...")
-        time.sleep(0.5)
 
     print("[+] 对话写入完成")
 
@@ -91,12 +87,8 @@ def main():
 
     print("\n使用 get_last_k_turns() 获取最近 3 轮:")
     try:
-        recent = client.get_last_k_turns(
-            memory_id=memory_id,
-            actor_id=actor_id,
-            session_id=session_id,
-            k=3
-        )
+        # 刚通过 write_conversation 写入的轮次直接从本地缓存返回
+        recent = get_last_k_turns(client, memory_id, actor_id, session_id, k=3)
         if recent:
             for i, turn in enumerate(recent, 1):
                 print(f"  {i}. {str(turn)[:70]}...")
@@ -118,12 +110,11 @@ def main():
 
     # 5. 等待长期记忆生成
     print_section("5. 等待长期记忆生成")
-    wait_time = 30
-    print(f"[*] 等待 {wait_time} 秒让 AgentCore 生成长期记忆...")
-
-    for i in range(wait_time, 0, -10):
-        print(f"    剩余 {i} 秒...")
-        time.sleep(10)
+    print("[*] 轮询直到 AgentCore 生成长期记忆...")
+    try:
+        wait_for_memory_records(client, memory_id, longterm_namespaces, min_records=expected)
+    except TimeoutError as e:
+        print(f"    [!] {e}")
 
     # 6. 检索长期记忆
     print_section("6. 检索长期记忆")
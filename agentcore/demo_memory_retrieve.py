@@ -8,12 +8,16 @@ import time
 from memory_utils import (
     get_memory_client,
     get_or_create_memory,
-    create_event_with_retry,
     extract_content,
+    iter_memory_records,
+    wait_for_memory_records,
+    expected_record_counts,
     DEFAULT_ACTOR_ID,
     print_header,
     print_section
 )
+from memory_buffer import EventBuffer
+from memory_retriever import HybridRetriever
 
 
 class RetrievalDemo:
@@ -24,6 +28,8 @@ class RetrievalDemo:
         self.memory_id = None
         self.actor_id = DEFAULT_ACTOR_ID
         self.session_id = f"retrieve-demo-{int(time.time())}"
+        self.longterm_namespaces = [f"/facts/{self.actor_id}", f"/preferences/{self.actor_id}"]
+        self.expected_records = 1  # write_sample_data 写入前更新为 {namespace: 现有记录数 + 1}
 
     def setup(self):
         """设置 Memory"""
@@ -62,15 +68,14 @@ class RetrievalDemo:
             ("ThinkPad确实是程序员的经典选择。", "ASSISTANT"),
         ]
 
+        # 记录写入前的记录数，等待本次新增的记录而不是以前运行留下的
+        self.expected_records = expected_record_counts(self.client, self.memory_id, self.longterm_namespaces)
+
         print(f"写入 {len(conversations)} 条消息...")
-        for msg, role in conversations:
-            create_event_with_retry(
-                self.client, self.memory_id,
-                self.actor_id, self.session_id,
-                [(msg, role)]
-            )
-            time.sleep(0.3)
-        print("[+] 数据写入完成")
+        with EventBuffer(self.client) as buffer:
+            for msg, role in conversations:
+                buffer.add(self.memory_id, self.actor_id, self.session_id, [(msg, role)])
+        print(f"[+] 数据写入完成: {buffer.stats['events']} 个事件, {buffer.stats['failed_messages']} 条失败")
 
     def demo_list_events(self):
         """演示 list_events"""
@@ -120,6 +125,15 @@ class RetrievalDemo:
         except Exception as e:
             print(f"[-] 失败: {e}")
 
+    def wait_for_longterm(self):
+        """轮询直到语义记忆和偏好记忆都已生成"""
+        print("[*] 等待长期记忆生成...")
+        try:
+            wait_for_memory_records(self.client, self.memory_id, self.longterm_namespaces,
+                                    min_records=self.expected_records)
+        except TimeoutError as e:
+            print(f"    [!] {e}")
+
     def demo_retrieve_memories(self, wait_for_longterm=False):
         """演示 retrieve_memories"""
         print("\n方法: retrieve_memories()")
@@ -127,42 +141,30 @@ class RetrievalDemo:
         print("-" * 40)
 
         if wait_for_longterm:
-            print("[*] 等待长期记忆生成...")
-            time.sleep(30)
+            self.wait_for_longterm()
 
         queries = ["笔记本电脑", "编程", "品牌偏好"]
 
-        for query in queries:
-            print(f"\n查询: '{query}'")
-            try:
-                # 搜索语义记忆
-                facts = self.client.retrieve_memories(
-                    memory_id=self.memory_id,
-                    namespace=f"/facts/{self.actor_id}",
-                    query=query
-                )
-
-                # 搜索偏好记忆
-                prefs = self.client.retrieve_memories(
-                    memory_id=self.memory_id,
-                    namespace=f"/preferences/{self.actor_id}",
-                    query=query
-                )
-
-                fact_count = len(facts) if facts else 0
-                pref_count = len(prefs) if prefs else 0
-
+        # 语义记忆和偏好记忆并发检索，合并去重后用 BM25 重排
+        with HybridRetriever(
+            self.memory_id,
+            namespaces=[f"/facts/{self.actor_id}", f"/preferences/{self.actor_id}"],
+            client=self.client
+        ) as retriever:
+            for query in queries:
+                print(f"\n查询: '{query}'")
+                results = retriever.search_namespaces(query)
+                for namespace, error in retriever.errors.items():
+                    print(f"  [-] {namespace} 失败: {error}")
+
+                fact_count = len(results.get(f"/facts/{self.actor_id}", []))
+                pref_count = len(results.get(f"/preferences/{self.actor_id}", []))
                 print(f"  语义记忆: {fact_count} 条, 偏好记忆: {pref_count} 条")
 
-                # 显示语义记忆结果（带 score）
-                if facts:
-                    for i, fact in enumerate(facts[:2], 1):
-                        content = extract_content(fact)
-                        score = fact.get('score', 0)
-                        print(f"  [{i}] score: {score:.4f} | {content[:40]}...")
-
-            except Exception as e:
-                print(f"  [-] 失败: {e}")
+                # 显示合并后的结果（服务端 score / BM25 / 最终分数）
+                for i, memory in enumerate(retriever.merge(query, results)[:3], 1):
+                    print(f"  [{i}] score: {memory.score:.4f} | bm25: {memory.bm25:.2f} | "
+                          f"final: {memory.final_score:.4f} | {memory.content[:40]}...")
 
     def demo_list_memory_records(self):
         """演示 list_memory_records"""
@@ -178,14 +180,17 @@ class RetrievalDemo:
         for namespace, name in namespaces:
             print(f"\n{name} ({namespace}):")
             try:
-                records = self.client.list_memory_records(
-                    memoryId=self.memory_id,
-                    namespace=namespace
-                )
+                # 跟随 nextToken 读完所有页，只保留前 2 条用于展示
+                records = []
+                total = 0
+                for record in iter_memory_records(self.client, self.memory_id, namespace):
+                    if total < 2:
+                        records.append(record)
+                    total += 1
 
                 if records:
-                    print(f"  [+] 找到 {len(records)} 条记忆")
-                    for i, record in enumerate(records[:2], 1):
+                    print(f"  [+] 找到 {total} 条记忆")
+                    for i, record in enumerate(records, 1):
                         content = extract_content(record)
                         score = record.get('score', 'N/A')
                         score_str = f"{score:.4f}" if isinstance(score, float) else score
@@ -251,9 +256,7 @@ def main():
 
     # 4. 长期记忆检索（需要等待）
     print_section("4. 长期记忆检索（需要等待生成）")
-    print("[*] 等待 30 秒让 AgentCore 生成长期记忆...")
-    time.sleep(30)
-    demo.demo_retrieve_memories()
+    demo.demo_retrieve_memories(wait_for_longterm=True)
     demo.demo_list_memory_records()
 
     # 5. 对比总结
@@ -8,13 +8,15 @@ import time
 from memory_utils import (
     get_memory_client,
     get_or_create_memory,
-    create_event_with_retry,
     extract_content,
+    wait_for_memory_records,
+    expected_record_counts,
     DEFAULT_ACTOR_ID,
     DEFAULT_SESSION_ID,
     print_header,
     print_section
 )
+from memory_buffer import EventBuffer
 
 
 class StrategyDemo:
@@ -25,6 +27,12 @@ class StrategyDemo:
         self.memory_id = None
         self.actor_id = DEFAULT_ACTOR_ID
         self.session_id = f"strategy-demo-{int(time.time())}"
+        self.longterm_namespaces = [
+            f"/facts/{self.actor_id}",
+            f"/preferences/{self.actor_id}",
+            f"/summaries/{self.actor_id}/{self.session_id}",
+        ]
+        self.expected_records = 1  # write_sample_conversations 写入前更新为 {namespace: 现有记录数 + 1}
 
     def setup(self):
         """创建包含所有策略的 Memory"""
@@ -83,15 +91,14 @@ class StrategyDemo:
             ("不客气！有其他问题随时问我。", "ASSISTANT"),
         ]
 
+        # 记录写入前的记录数，等待本次新增的记录而不是以前运行留下的
+        self.expected_records = expected_record_counts(self.client, self.memory_id, self.longterm_namespaces)
+
         print(f"写入 {len(conversations)} 条对话...")
-        for msg, role in conversations:
-            create_event_with_retry(
-                self.client, self.memory_id,
-                self.actor_id, self.session_id,
-                [(msg, role)]
-            )
-            time.sleep(0.3)
-        print("[+] 对话写入完成")
+        with EventBuffer(self.client) as buffer:
+            for msg, role in conversations:
+                buffer.add(self.memory_id, self.actor_id, self.session_id, [(msg, role)])
+        print(f"[+] 对话写入完成: {buffer.stats['events']} 个事件, {buffer.stats['failed_messages']} 条失败")
 
     def retrieve_by_strategy(self, strategy_name, namespace, queries):
         """按策略检索记忆"""
@@ -205,13 +212,12 @@ def main():
 
     # 3. 等待长期记忆生成
     print_section("3. 等待长期记忆生成")
-    wait_time = 60
-    print(f"[*] AgentCore 需要时间分析对话并提取不同类型的记忆...")
-    print(f"[*] 等待 {wait_time} 秒...")
-
-    for i in range(wait_time, 0, -15):
-        print(f"    剩余 {i} 秒...")
-        time.sleep(15)
+    print("[*] AgentCore 需要时间分析对话并提取不同类型的记忆，轮询直到各策略都有记录...")
+    try:
+        wait_for_memory_records(demo.client, demo.memory_id, demo.longterm_namespaces,
+                                min_records=demo.expected_records)
+    except TimeoutError as e:
+        print(f"    [!] {e}")
 
     # 4. 对比不同策略
     print_section("4. 对比不同策略的检索结果")
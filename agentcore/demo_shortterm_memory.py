@@ -4,17 +4,17 @@ Demo: 短期记忆演示
 
 运行: python demo_shortterm_memory.py
 """
-import time
 from memory_utils import (
     get_memory_client,
     get_short_term_memory,
-    create_event_with_retry,
+    get_last_k_turns,
     SAMPLE_MESSAGES,
     DEFAULT_ACTOR_ID,
     DEFAULT_SESSION_ID,
     print_header,
     print_section
 )
+from memory_buffer import EventBuffer
 
 
 def main():
@@ -36,33 +36,19 @@ def main():
     print_section("3. 写入短期记忆事件")
     print(f"写入 {len(SAMPLE_MESSAGES)} 条消息...")
 
-    success_count = 0
-    for i, msg in enumerate(SAMPLE_MESSAGES, 1):
-        success = create_event_with_retry(
-            client=client,
-            memory_id=memory_id,
-            actor_id=actor_id,
-            session_id=session_id,
-            messages=[(msg, "USER")]
-        )
-        if success:
-            success_count += 1
+    # 消息先进入写后缓冲，退出 with 时合并为多消息事件写入
+    with EventBuffer(client) as buffer:
+        for i, msg in enumerate(SAMPLE_MESSAGES, 1):
+            buffer.add(memory_id, actor_id, session_id, [(msg, "USER")])
             print(f"  [{i}] {msg[:50]}...")
-        else:
-            print(f"  [{i}] 写入失败: {msg[:30]}...")
-        time.sleep(0.5)
 
-    print(f"\n[+] 写入完成: {success_count}/{len(SAMPLE_MESSAGES)} 条成功")
+    success_count = buffer.stats["messages"] - buffer.stats["failed_messages"]
+    print(f"\n[+] 写入完成: {success_count}/{len(SAMPLE_MESSAGES)} 条成功, 共 {buffer.stats['events']} 个事件")
 
     # 4. 读取最近对话
     print_section("4. 读取最近 5 轮对话")
     try:
-        recent_turns = client.get_last_k_turns(
-            memory_id=memory_id,
-            actor_id=actor_id,
-            session_id=session_id,
-            k=5
-        )
+        recent_turns = get_last_k_turns(client, memory_id, actor_id, session_id, k=5)
 
         if recent_turns:
             print(f"[+] 找到 {len(recent_turns)} 条记录:")
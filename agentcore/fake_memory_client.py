@@ -0,0 +1,258 @@
+"""
+AgentCore MemoryClient 的本地内存实现
+用于离线运行批量导入、缓存和基准测试，不需要 AWS 凭证
+
+- 接口与 bedrock_agentcore.memory.MemoryClient 的常用方法一致
+- 可按 API 注入延迟和限流错误
+- 长期记忆提取在写入 extraction_delay 秒后完成，按策略命名空间生成记忆记录
+"""
+import itertools
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+
+class FakeMemoryClient:
+    """
+    内存中的 MemoryClient
+
+    Args:
+        latency: 每次调用的延迟（秒），可以是数字、{API 名: 秒数} 或 {API 名: callable() -> 秒数}
+        throttle_rate: 每次调用返回 ThrottledException 的概率
+        extraction_delay: 事件写入后生成长期记忆记录的延迟（秒），可以是数字或 {策略类型: 秒数}，
+            例如 {"summaryMemoryStrategy": 5}，未列出的策略没有延迟
+        seed: 随机种子
+    """
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, extraction_delay=0.0, seed=None, region_name=None):
+        self.region_name = region_name
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.extraction_delay = extraction_delay
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.memories = {}   # memory_id -> memory
+        self.events = {}     # (memory_id, actor_id, session_id) -> [event]
+        self.records = {}    # memory_id -> {namespace: [(available_at, record)]}
+        self._event_ids = itertools.count()
+
+    # -------------------- 延迟与限流 --------------------
+    def _call(self, api):
+        with self.lock:
+            self.calls[api] = self.calls.get(api, 0) + 1
+            throttled = self.throttle_rate and self.random.random() < self.throttle_rate
+        latency = self.latency.get(api, 0.0) if isinstance(self.latency, dict) else self.latency
+        latency = latency() if callable(latency) else latency
+        if latency:
+            time.sleep(latency)
+        if throttled:
+            raise ClientError({"Error": {"Code": "ThrottledException", "Message": "Rate exceeded"}}, api)
+
+    @staticmethod
+    def _not_found(api, message):
+        return ClientError({"Error": {"Code": "ResourceNotFoundException", "Message": message}}, api)
+
+    # -------------------- 控制面 --------------------
+    def create_memory_and_wait(self, name, strategies, description=None, event_expiry_days=90, **kwargs):
+        self._call("create_memory")
+        with self.lock:
+            if any(memory["name"] == name for memory in self.memories.values()):
+                raise ClientError({"Error": {"Code": "ValidationException",
+                                             "Message": f"Memory with name {name} already exists"}},
+                                  "CreateMemory")
+            memory_id = f"{name}-{uuid.uuid4().hex[:10]}"
+            self.memories[memory_id] = {
+                "id": memory_id,
+                "name": name,
+                "description": description,
+                "strategies": strategies or [],
+                "eventExpiryDuration": event_expiry_days,
+                "status": "ACTIVE",
+            }
+            self.records[memory_id] = {}
+            return dict(self.memories[memory_id])
+
+    create_memory = create_memory_and_wait
+
+    def list_memories(self, max_results=100):
+        self._call("list_memories")
+        with self.lock:
+            return [{"id": m["id"], "status": m["status"]} for m in list(self.memories.values())[:max_results]]
+
+    def get_memory(self, memoryId):
+        self._call("get_memory")
+        with self.lock:
+            if memoryId not in self.memories:
+                raise self._not_found("GetMemory", f"Memory {memoryId} not found")
+            return {"memory": dict(self.memories[memoryId])}
+
+    def delete_memory(self, memory_id):
+        self._call("delete_memory")
+        with self.lock:
+            self.memories.pop(memory_id, None)
+            self.records.pop(memory_id, None)
+
+    # -------------------- 短期记忆 --------------------
+    def create_event(self, memory_id, actor_id, session_id, messages, event_timestamp=None, **kwargs):
+        self._call("create_event")
+        with self.lock:
+            if memory_id not in self.memories:
+                raise self._not_found("CreateEvent", f"Memory {memory_id} not found")
+            event = {
+                "eventId": f"{next(self._event_ids):012d}",
+                "memoryId": memory_id,
+                "actorId": actor_id,
+                "sessionId": session_id,
+                "eventTimestamp": event_timestamp or datetime.now(timezone.utc),
+                "payload": [{"conversational": {"content": {"text": text}, "role": role}}
+                            for text, role in messages],
+            }
+            self.events.setdefault((memory_id, actor_id, session_id), []).append(event)
+            self._extract(memory_id, actor_id, session_id, messages)
+            return event
+
+    def list_events(self, memory_id, actor_id, session_id, max_results=100, **kwargs):
+        self._call("list_events")
+        with self.lock:
+            # 与服务端一致，最新的事件在前
+            return list(reversed(self.events.get((memory_id, actor_id, session_id), [])))[:max_results]
+
+    @property
+    def gmdp_client(self):
+        """与 MemoryClient.gmdp_client 对应的分页数据面接口"""
+        return _FakeDataPlane(self)
+
+    def get_last_k_turns(self, memory_id, actor_id, session_id, k=5, **kwargs):
+        """
+        与 MemoryClient.get_last_k_turns 相同：从最新的事件开始按 USER 消息切分轮次，
+        返回最近 k 轮（最新一轮在前，轮内消息为时间正序）
+        """
+        self._call("get_last_k_turns")
+        with self.lock:
+            events = list(reversed(self.events.get((memory_id, actor_id, session_id), [])))
+        turns, current = [], []
+        for event in events:
+            if len(turns) >= k:
+                break
+            for message in event["payload"]:
+                message = message["conversational"]
+                if message["role"] == "USER" and current:
+                    turns.append(current)
+                    current = []
+                current.append(message)
+        if current and len(turns) < k:
+            turns.append(current)
+        return turns[:k]
+
+    # -------------------- 长期记忆 --------------------
+    def _namespaces(self, memory_id, actor_id, session_id):
+        """返回 [(策略类型, 命名空间)]"""
+        namespaces = []
+        for strategy in self.memories[memory_id]["strategies"]:
+            for strategy_type, config in strategy.items():
+                for namespace in config.get("namespaces", []):
+                    namespace = namespace.replace("{actorId}", actor_id).replace("{sessionId}", session_id)
+                    namespaces.append((strategy_type, namespace))
+        return namespaces
+
+    def _extraction_delay(self, strategy_type):
+        if isinstance(self.extraction_delay, dict):
+            return self.extraction_delay.get(strategy_type, 0.0)
+        return self.extraction_delay
+
+    def _extract(self, memory_id, actor_id, session_id, messages):
+        """模拟长期记忆提取：每条用户消息在每个策略命名空间下生成一条记录（调用方持有锁）"""
+        now = time.time()
+        for strategy_type, namespace in self._namespaces(memory_id, actor_id, session_id):
+            available_at = now + self._extraction_delay(strategy_type)
+            for text, role in messages:
+                if role != "USER":
+                    continue
+                self.records[memory_id].setdefault(namespace, []).append((available_at, {
+                    "memoryRecordId": f"mem-{uuid.uuid4().hex[:16]}",
+                    "content": {"text": text},
+                    "namespaces": [namespace],
+                    "createdAt": datetime.now(timezone.utc),
+                }))
+
+    def _visible_records(self, memory_id, namespace):
+        now = time.time()
+        with self.lock:
+            return [record for ns, records in self.records.get(memory_id, {}).items() if ns.startswith(namespace)
+                    for available_at, record in records if available_at <= now]
+
+    def _search(self, memory_id, namespace, query, top_k):
+        """按查询与记录的词重叠度打分"""
+        query_terms = set(_terms(query))
+        results = []
+        for record in self._visible_records(memory_id, namespace):
+            terms = set(_terms(record["content"]["text"]))
+            score = len(query_terms & terms) / (len(query_terms) or 1)
+            if score > 0:
+                results.append(dict(record, score=score))
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:top_k]
+
+    def retrieve_memories(self, memory_id, namespace, query, actor_id=None, top_k=3, **kwargs):
+        """与 SDK 的 MemoryClient.retrieve_memories 一致：ClientError 被吞掉并返回 []"""
+        try:
+            self._call("retrieve_memories")
+        except ClientError:
+            return []
+        return self._search(memory_id, namespace, query, top_k)
+
+    def retrieve_memory_records(self, memoryId, namespace, searchCriteria, **kwargs):
+        """与 boto3 bedrock-agentcore 数据面接口一致，返回 {memoryRecordSummaries}，错误会抛出"""
+        self._call("retrieve_memory_records")
+        if memoryId not in self.memories:
+            raise self._not_found("RetrieveMemoryRecords", f"Memory {memoryId} not found")
+        return {"memoryRecordSummaries": self._search(memoryId, namespace, searchCriteria["searchQuery"],
+                                                      searchCriteria.get("topK", 10))}
+
+    def list_memory_records(self, memoryId, namespace, maxResults=100, nextToken=None, **kwargs):
+        """与 boto3 bedrock-agentcore 数据面接口一致，返回 {memoryRecordSummaries, nextToken}"""
+        self._call("list_memory_records")
+        records = self._visible_records(memoryId, namespace)
+        start = int(nextToken or 0)
+        response = {"memoryRecordSummaries": records[start:start + maxResults]}
+        if start + maxResults < len(records):
+            response["nextToken"] = str(start + maxResults)
+        return response
+
+
+class _FakeDataPlane:
+    """boto3 bedrock-agentcore 数据面接口的分页版本"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def list_events(self, memoryId, actorId, sessionId, maxResults=100, includePayloads=True, nextToken=None,
+                    **kwargs):
+        self.client._call("list_events")
+        with self.client.lock:
+            events = list(reversed(self.client.events.get((memoryId, actorId, sessionId), [])))
+        start = int(nextToken or 0)
+        page = events[start:start + maxResults]
+        if not includePayloads:
+            page = [{k: v for k, v in event.items() if k != "payload"} for event in page]
+        response = {"events": page}
+        if start + maxResults < len(events):
+            response["nextToken"] = str(start + maxResults)
+        return response
+
+    def list_memory_records(self, **kwargs):
+        return self.client.list_memory_records(**kwargs)
+
+    def retrieve_memory_records(self, **kwargs):
+        return self.client.retrieve_memory_records(**kwargs)
+
+
+def _terms(text):
+    """英文按单词、中文按单字切分"""
+    return re.findall(r"[a-z0-9]+|[\u4e00-\u9fff]", text.lower())
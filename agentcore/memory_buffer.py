@@ -0,0 +1,153 @@
+"""
+AgentCore Memory 写后缓冲
+把同一 (memory_id, actor_id, session_id) 的消息合并为多消息事件，由后台线程按条数 / 时间阈值批量写入
+"""
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from memory_utils import create_event_with_retry, get_memory_client
+
+
+# ============================================================
+# 默认配置
+# ============================================================
+DEFAULT_MAX_MESSAGES = 20      # 单个事件最多合并的消息数
+DEFAULT_FLUSH_INTERVAL = 1.0   # 消息在缓冲区中最长停留时间（秒）
+DEFAULT_MAX_WORKERS = 4
+
+
+class EventBuffer:
+    """
+    写后事件缓冲
+
+    - add() 只把消息放入缓冲区并立即返回，不等待网络
+    - 某个会话缓冲的消息数达到 max_messages，或最早一条消息超过 flush_interval 秒时写入
+    - 同一会话同一时刻最多一个写入在进行，消息顺序与 add() 顺序一致；不同会话并发写入
+    - flush() 等待所有缓冲消息写完；close() 和进程退出时都会自动 flush
+
+    Args:
+        client: MemoryClient 实例（可选，默认使用单例）
+        max_messages: 单个事件最多合并的消息数
+        flush_interval: 消息最长缓冲时间（秒）
+        max_workers: 并发写入的会话数
+    """
+
+    def __init__(self, client=None, max_messages=DEFAULT_MAX_MESSAGES, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        self.client = client or get_memory_client()
+        self.max_messages = max_messages
+        self.flush_interval = flush_interval
+        self.stats = {"messages": 0, "events": 0, "failed_messages": 0}
+        self.failed = []  # [(memory_id, actor_id, session_id, messages)]
+
+        self._buffers = {}     # key -> [首条消息时间, [(内容, 角色), ...]]，dict 保持插入顺序
+        self._in_flight = set()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._inline = False   # 进程退出时在调用线程中直接写入
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._thread = threading.Thread(target=self._run, name="memory-event-buffer", daemon=True)
+        self._thread.start()
+        atexit.register(self._close_at_exit)
+
+    def add(self, memory_id, actor_id, session_id, messages):
+        """缓冲一条或多条消息，格式 [("内容", "USER"/"ASSISTANT")]"""
+        if self._closed:
+            raise RuntimeError("EventBuffer 已关闭")
+        key = (memory_id, actor_id, session_id)
+        with self._condition:
+            buffer = self._buffers.setdefault(key, [time.monotonic(), []])
+            buffer[1].extend(messages)
+            self.stats["messages"] += len(messages)
+            if len(buffer[1]) >= self.max_messages:
+                self._condition.notify_all()
+
+    def _ready_keys(self, force):
+        """返回可以写入的会话（调用方持有锁）"""
+        now = time.monotonic()
+        return [key for key, (first_time, messages) in self._buffers.items()
+                if key not in self._in_flight and
+                (force or len(messages) >= self.max_messages or now - first_time >= self.flush_interval)]
+
+    def _write(self, key, messages):
+        for start in range(0, len(messages), self.max_messages):
+            batch = messages[start:start + self.max_messages]
+            success = create_event_with_retry(self.client, *key, batch)  # 同时更新本地轮次缓存
+            with self._condition:
+                if success:
+                    self.stats["events"] += 1
+                else:
+                    self.stats["failed_messages"] += len(batch)
+                    self.failed.append(key + (batch,))
+        with self._condition:
+            self._in_flight.discard(key)
+            self._condition.notify_all()
+
+    def _dispatch(self, force=False):
+        """取出可写入会话的全部缓冲消息并提交写入（调用方持有锁）"""
+        for key in self._ready_keys(force):
+            _, messages = self._buffers.pop(key)
+            self._in_flight.add(key)
+            if not self._inline:
+                try:
+                    self._executor.submit(self._write, key, messages)
+                    continue
+                except RuntimeError:
+                    # 解释器退出期间线程池拒绝新任务（例如在其他 atexit 回调中调用 close()）
+                    self._inline = True
+            # Condition 基于 RLock，_write 可在持有锁时重入
+            self._write(key, messages)
+
+    def _run(self):
+        with self._condition:
+            while not self._closed:
+                self._dispatch()
+                # 等到最早一条缓冲消息到期，或被 add() / 写入完成唤醒
+                oldest = min((first_time for key, (first_time, _) in self._buffers.items()
+                              if key not in self._in_flight), default=None)
+                timeout = self.flush_interval if oldest is None else \
+                    max(oldest + self.flush_interval - time.monotonic(), 0.01)
+                self._condition.wait(timeout)
+
+    def flush(self, timeout=None):
+        """立即写入所有缓冲消息并等待完成，超时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._buffers or self._in_flight:
+                self._dispatch(force=True)
+                if not (self._buffers or self._in_flight):
+                    break  # 直接写入时已在 _dispatch 中完成
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self):
+        """写完剩余消息后停止后台线程"""
+        if self._closed:
+            return
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._executor.shutdown()
+        atexit.unregister(self._close_at_exit)
+
+    def _close_at_exit(self):
+        """
+        atexit 回调：concurrent.futures 的退出钩子先于 atexit 执行，线程池已不能可靠执行新任务，
+        因此剩余消息在当前线程中直接写入
+        """
+        with self._condition:
+            self._inline = True
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
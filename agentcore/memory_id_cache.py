@@ -0,0 +1,114 @@
+"""
+AgentCore Memory 名称 -> ID 持久化缓存
+进程冷启动时直接从本地文件取得 Memory ID，省去 create_memory 尝试和 list_memories 全量扫描
+
+- 缓存文件默认位于临时目录（Lambda 中为 /tmp，同一执行环境的后续冷启动可复用），
+  可通过环境变量 AGENTCORE_MEMORY_ID_CACHE 指定路径
+- 条目超过 TTL 后重新解析
+- 条目按区域和凭证 profile 区分
+- Memory 被删除（调用返回 ResourceNotFoundException）时按 ID 使条目失效
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+# ============================================================
+# 默认配置
+# ============================================================
+DEFAULT_CACHE_PATH = os.environ.get(
+    "AGENTCORE_MEMORY_ID_CACHE",
+    os.path.join(tempfile.gettempdir(), "agentcore_memory_ids.json"),
+)
+DEFAULT_TTL = 24 * 3600  # 秒
+
+
+class MemoryIdCache:
+    """
+    按 (region, profile, name) 缓存 Memory ID，写入时原子替换缓存文件
+
+    同一区域下不同 profile（可能是不同账号）的同名 Memory 各自独立
+
+    Args:
+        path: 缓存文件路径，None 表示只在进程内缓存
+        ttl: 条目有效期（秒）
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = None  # 首次访问时从文件加载
+
+    @staticmethod
+    def _key(region, profile, name):
+        return f"{region or ''}/{profile or ''}/{name}"
+
+    def _load(self):
+        """加载缓存文件（调用方持有锁）；文件不存在或损坏时视为空缓存"""
+        if self.entries is None:
+            self.entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        self.entries = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self.entries
+
+    def _save(self):
+        """写入缓存文件（调用方持有锁）；写入失败不影响调用方"""
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False) as f:
+                json.dump(self.entries, f)
+            os.replace(f.name, self.path)
+        except OSError:
+            pass
+
+    def get(self, name, region=None, profile=None):
+        """返回未过期的 Memory ID，否则返回 None"""
+        with self.lock:
+            entry = self._load().get(self._key(region, profile, name))
+            if entry is None or time.time() - entry["updated_at"] > self.ttl:
+                return None
+            return entry["memory_id"]
+
+    def _reload(self):
+        """修改前重新读取文件，保留其他进程写入的条目（调用方持有锁）"""
+        self.entries = None
+        return self._load()
+
+    def put(self, name, memory_id, region=None, profile=None):
+        with self.lock:
+            self._reload()[self._key(region, profile, name)] = {"memory_id": memory_id, "updated_at": time.time()}
+            self._save()
+
+    def invalidate(self, name=None, memory_id=None, region=None, profile=None):
+        """按名称或 Memory ID 删除条目"""
+        with self.lock:
+            entries = self._reload()
+            keys = [key for key, entry in entries.items()
+                    if (name is not None and key == self._key(region, profile, name))
+                    or (memory_id is not None and entry["memory_id"] == memory_id)]
+            for key in keys:
+                del entries[key]
+            if keys:
+                self._save()
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self._save()
+
+
+_default_cache = MemoryIdCache()
+
+
+def get_memory_id_cache():
+    """进程内共享的 Memory ID 缓存"""
+    return _default_cache
@@ -0,0 +1,153 @@
+"""
+AgentCore Memory 混合检索
+并发检索多个命名空间，按分数合并、去重，并可用本地 BM25 重排
+"""
+import math
+import re
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from memory_utils import extract_content, get_memory_client, retrieve_memories
+
+
+# ============================================================
+# 默认配置
+# ============================================================
+DEFAULT_TOP_K = 5
+DEFAULT_ALPHA = 0.6              # 最终分数中服务端分数的权重，其余为 BM25
+DEFAULT_DEDUPE_THRESHOLD = 0.85  # 词集合 Jaccard 相似度超过该值视为重复
+
+RetrievedMemory = namedtuple("RetrievedMemory", ["namespace", "content", "score", "bm25", "final_score", "record"])
+
+
+# ============================================================
+# 分词与 BM25
+# ============================================================
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+
+
+def tokenize(text):
+    """英文按单词、中文按单字和相邻双字切分"""
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if run.isascii():
+            tokens.append(run)
+        else:
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def bm25_scores(query, documents, k1=1.5, b=0.75):
+    """对返回的候选文本计算 BM25 分数（候选集即语料）"""
+    docs = [Counter(tokenize(doc)) for doc in documents]
+    if not docs:
+        return []
+    lengths = [sum(doc.values()) for doc in docs]
+    avg_length = sum(lengths) / len(docs) or 1
+    doc_freq = Counter(term for doc in docs for term in doc)
+
+    scores = []
+    for doc, length in zip(docs, lengths):
+        score = 0.0
+        for term in set(tokenize(query)):
+            tf = doc.get(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(docs) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+        scores.append(score)
+    return scores
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# ============================================================
+# 混合检索
+# ============================================================
+class HybridRetriever:
+    """
+    多命名空间并发检索
+
+    重试耗尽或不可重试的命名空间不参与合并，异常记录在 self.errors[namespace]
+
+    Args:
+        memory_id: Memory ID
+        namespaces: 命名空间列表，可包含 {actorId} 占位符
+        client: MemoryClient 实例（可选，默认使用单例）
+        top_k: 最终返回条数，每个命名空间也取 top_k 条
+        rerank: 是否用 BM25 与服务端分数加权重排
+        alpha: 服务端分数权重
+        dedupe_threshold: 近似重复判定阈值
+    """
+
+    def __init__(self, memory_id, namespaces, client=None, top_k=DEFAULT_TOP_K, rerank=True,
+                 alpha=DEFAULT_ALPHA, dedupe_threshold=DEFAULT_DEDUPE_THRESHOLD):
+        self.client = client or get_memory_client()
+        self.memory_id = memory_id
+        self.namespaces = list(namespaces)
+        self.top_k = top_k
+        self.rerank = rerank
+        self.alpha = alpha
+        self.dedupe_threshold = dedupe_threshold
+        self.errors = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.namespaces), 1))
+
+    def _search(self, namespace, query):
+        try:
+            return namespace, retrieve_memories(self.client, self.memory_id, namespace, query, self.top_k)
+        except Exception as e:
+            self.errors[namespace] = e
+            return namespace, []
+
+    def search_namespaces(self, query, actor_id=None):
+        """并发检索所有命名空间，返回 {namespace: records}"""
+        namespaces = [ns.replace("{actorId}", actor_id) if actor_id else ns for ns in self.namespaces]
+        self.errors = {}
+        return dict(self._executor.map(lambda ns: self._search(ns, query), namespaces))
+
+    def merge(self, query, results):
+        """按分数合并各命名空间结果，去掉重复记录，并按需重排"""
+        candidates = []
+        for namespace, records in results.items():
+            for record in records:
+                candidates.append((namespace, extract_content(record), float(record.get("score") or 0), record))
+        candidates.sort(key=lambda c: c[2], reverse=True)
+
+        # 分数高的先保留：同一 memoryRecordId 或词集合高度相似的记录只留一条
+        kept, seen_ids, kept_tokens = [], set(), []
+        for candidate in candidates:
+            record_id = candidate[3].get("memoryRecordId")
+            tokens = set(tokenize(candidate[1]))
+            if record_id in seen_ids or any(_jaccard(tokens, t) >= self.dedupe_threshold for t in kept_tokens):
+                continue
+            if record_id:
+                seen_ids.add(record_id)
+            kept.append(candidate)
+            kept_tokens.append(tokens)
+
+        bm25 = bm25_scores(query, [c[1] for c in kept]) if self.rerank else [0.0] * len(kept)
+        max_bm25 = max(bm25, default=0) or 1
+        memories = []
+        for (namespace, content, score, record), lexical in zip(kept, bm25):
+            final_score = self.alpha * score + (1 - self.alpha) * lexical / max_bm25 if self.rerank else score
+            memories.append(RetrievedMemory(namespace, content, score, lexical, final_score, record))
+        memories.sort(key=lambda m: m.final_score, reverse=True)
+        return memories[:self.top_k]
+
+    def retrieve(self, query, actor_id=None):
+        """检索并返回合并后的 RetrievedMemory 列表（按 final_score 降序）"""
+        return self.merge(query, self.search_namespaces(query, actor_id))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -2,10 +2,20 @@
 AgentCore Memory 公共工具模块
 提供共享的配置、工具函数和示例数据
 """
+import asyncio
+import os
+import threading
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+import botocore.session
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from bedrock_agentcore.memory import MemoryClient
+from memory_id_cache import get_memory_id_cache
+from rate_limiter import BACKOFF_POLICIES, Backoff, error_code, get_rate_limiter
+from turn_cache import get_turn_cache
 
 
 # ============================================================
@@ -19,35 +29,133 @@ DEFAULT_SESSION_ID = "agent-session"
 # ============================================================
 # 客户端管理
 # ============================================================
-_client_instance = None
+DEFAULT_MAX_POOL_CONNECTIONS = 50  # 每个 boto3 客户端的 HTTP 连接池上限（botocore 默认 10）
 
-def get_memory_client(region=None):
-    """获取 MemoryClient 单例"""
-    global _client_instance
-    if _client_instance is None:
-        _client_instance = MemoryClient(region_name=region or DEFAULT_REGION)
-    return _client_instance
+
+class MemoryClientPool:
+    """
+    按 (region, profile) 懒创建 MemoryClient（线程安全）
+
+    同一区域和凭证配置共享一个客户端；不同区域各自独立，不会被首次创建的区域覆盖
+
+    Args:
+        max_pool_connections: 每个底层 boto3 客户端的连接池上限，应不小于并发调用的线程数
+        factory: 自定义创建函数 factory(region, profile) -> client（可选，用于注入 FakeMemoryClient 等）
+    """
+
+    def __init__(self, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS, factory=None):
+        self.max_pool_connections = max_pool_connections
+        self.factory = factory or self._create
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def _create(self, region, profile):
+        # MemoryClient 内部创建控制面/数据面客户端时会合并 session 的默认配置
+        botocore_session = botocore.session.Session(profile=profile)
+        botocore_session.set_default_client_config(Config(max_pool_connections=self.max_pool_connections))
+        session = boto3.Session(botocore_session=botocore_session, region_name=region)
+        client = MemoryClient(region_name=region, boto3_session=session)
+        client.profile_name = profile
+        return client
+
+    def get(self, region=None, profile=None):
+        key = (region or DEFAULT_REGION, profile)
+        client = self.clients.get(key)
+        if client is not None:
+            return client
+        # 在锁外创建（加载凭证、创建 boto3 客户端较慢），不阻塞其他区域的 get()；
+        # 并发创建同一 key 时以先插入的为准
+        client = self.factory(*key)
+        with self.lock:
+            return self.clients.setdefault(key, client)
+
+    def evict(self, region=None, profile=None):
+        """移除客户端，下次 get() 时重新创建（例如凭证过期后）"""
+        with self.lock:
+            self.clients.pop((region or DEFAULT_REGION, profile), None)
+
+    def health_check(self, region=None, profile=None, evict=True):
+        """
+        用一次 list_memories 调用检查客户端是否可用
+
+        Returns:
+            dict: {"region", "profile", "healthy", "latency_ms", "error"}；
+            evict=True 时不健康的客户端会被移除
+        """
+        region = region or DEFAULT_REGION
+        start = time.time()
+        try:
+            self.get(region, profile).list_memories(max_results=1)
+            error = None
+        except Exception as e:
+            error = f"{error_code(e) or type(e).__name__}: {e}"
+            if evict:
+                self.evict(region, profile)
+        return {
+            "region": region,
+            "profile": profile,
+            "healthy": error is None,
+            "latency_ms": (time.time() - start) * 1000,
+            "error": error,
+        }
+
+    def health_check_all(self, evict=True):
+        """检查池中所有客户端"""
+        with self.lock:
+            keys = list(self.clients)
+        return [self.health_check(region, profile, evict=evict) for region, profile in keys]
+
+    def clear(self):
+        with self.lock:
+            self.clients.clear()
+
+
+_client_pool = MemoryClientPool()
+
+
+def get_client_pool():
+    """进程内共享的 MemoryClient 池"""
+    return _client_pool
+
+
+def get_memory_client(region=None, profile=None):
+    """获取指定区域（和凭证 profile）的 MemoryClient，同一组合在进程内复用"""
+    return _client_pool.get(region, profile)
 
 
 def reset_client():
-    """重置客户端（用于测试）"""
-    global _client_instance
-    _client_instance = None
+    """清空客户端池（用于测试）"""
+    _client_pool.clear()
 
 
 # ============================================================
 # Memory 创建与获取
 # ============================================================
-def get_or_create_memory(name, description, strategies=None, event_expiry_days=90, client=None):
+def _find_memory_id(client, name, max_results=1000):
+    """在 list_memories 结果中查找名称对应的 Memory ID（ID 格式为 <name>-<后缀>）"""
+    memories = client.list_memories(max_results=max_results)
+    return next((m['id'] for m in memories if m['id'].startswith(f"{name}-")), None)
+
+
+def _client_profile(client):
+    """客户端使用的凭证 profile（由 MemoryClientPool 记录，否则取 AWS_PROFILE），用于区分 ID 缓存条目"""
+    return getattr(client, "profile_name", None) or os.environ.get("AWS_PROFILE")
+
+
+def get_or_create_memory(name, description, strategies=None, event_expiry_days=90, client=None, use_cache=True):
     """
     创建或获取已存在的 Memory
 
+    先查本地 Memory ID 缓存，未命中时先查找已有 Memory，都没有才创建，
+    因此已存在的 Memory 在冷启动时不会再触发一次失败的 create 调用
+
     Args:
         name: Memory 名称
         description: Memory 描述
         strategies: 长期记忆策略列表（可选）
         event_expiry_days: 事件过期天数
         client: MemoryClient 实例（可选，默认使用单例）
+        use_cache: 是否使用持久化的名称 -> ID 缓存（只对真实的 MemoryClient 生效）
 
     Returns:
         memory_id: Memory ID
@@ -55,47 +163,62 @@ def get_or_create_memory(name, description, strategies=None, event_expiry_days=9
     if client is None:
         client = get_memory_client()
 
-    memory_id = None
-
-    try:
-        print(f"\n[*] 创建 Memory: {name}")
-        memory = client.create_memory_and_wait(
-            name=name,
-            description=description,
-            strategies=strategies or [],
-            event_expiry_days=event_expiry_days,
-        )
-        memory_id = memory["id"]
-        print(f"[+] Memory 创建成功，ID: {memory_id}")
+    cache = get_memory_id_cache()
+    region, profile = getattr(client, "region_name", None), _client_profile(client)
+    # FakeMemoryClient 等本地客户端的 ID 在进程结束后即失效，不能写入持久化缓存
+    use_cache = use_cache and isinstance(client, MemoryClient) and region is not None
+    if use_cache:
+        memory_id = cache.get(name, region, profile)
+        if memory_id:
+            print(f"[+] 使用缓存的 Memory ID: {memory_id}")
+            return memory_id
+
+    memory_id = _find_memory_id(client, name)
+    if memory_id:
+        print(f"[+] 使用已有 Memory ID: {memory_id}")
+    else:
+        try:
+            print(f"\n[*] 创建 Memory: {name}")
+            memory = client.create_memory_and_wait(
+                name=name,
+                description=description,
+                strategies=strategies or [],
+                event_expiry_days=event_expiry_days,
+            )
+            memory_id = memory["id"]
+            print(f"[+] Memory 创建成功，ID: {memory_id}")
 
-    except ClientError as e:
-        if e.response['Error']['Code'] == 'ValidationException' and "already exists" in str(e):
-            print(f"[!] Memory 已存在，尝试获取已有 ID")
-            memories = client.list_memories()
-            memory_id = next((m['id'] for m in memories if m['id'].startswith(name)), None)
+        except ClientError as e:
+            # 查找之后被其他进程并发创建
+            if e.response['Error']['Code'] == 'ValidationException' and "already exists" in str(e):
+                print(f"[!] Memory 已存在，尝试获取已有 ID")
+                memory_id = _find_memory_id(client, name)
 
-            if memory_id:
-                print(f"[+] 使用已有 Memory ID: {memory_id}")
+                if memory_id:
+                    print(f"[+] 使用已有 Memory ID: {memory_id}")
+                else:
+                    raise RuntimeError(f"找不到已存在的 Memory: {name}")
             else:
-                raise RuntimeError(f"找不到已存在的 Memory: {name}")
-        else:
-            raise e
+                raise e
 
+    if use_cache:
+        cache.put(name, memory_id, region, profile)
     return memory_id
 
 
-def get_short_term_memory(name="ShortTermMemory", client=None):
+def get_short_term_memory(name="ShortTermMemory", client=None, use_cache=True):
     """创建或获取短期记忆（无策略）"""
     return get_or_create_memory(
         name=name,
         description="短期记忆 - 存储原始对话事件",
         strategies=[],
         event_expiry_days=21,
-        client=client
+        client=client,
+        use_cache=use_cache
     )
 
 
-def get_long_term_memory(name="LongTermMemory", actor_id=None, client=None):
+def get_long_term_memory(name="LongTermMemory", actor_id=None, client=None, use_cache=True):
     """创建或获取长期记忆（带语义策略）"""
     actor = actor_id or DEFAULT_ACTOR_ID
     return get_or_create_memory(
@@ -116,17 +239,83 @@ def get_long_term_memory(name="LongTermMemory", actor_id=None, client=None):
             }
         ],
         event_expiry_days=365,
-        client=client
+        client=client,
+        use_cache=use_cache
     )
 
 
+# ============================================================
+# 限流与重试
+# ============================================================
+def _invalidate_if_not_found(error, memory_id):
+    """Memory 已被删除时使 ID 缓存中指向它的条目失效，下次 get_or_create_memory 重新解析"""
+    if memory_id and error_code(error) == "ResourceNotFoundException":
+        get_memory_id_cache().invalidate(memory_id=memory_id)
+
+
+def call_with_retry(func, api, max_retries=5, limiter=None, verbose=False, backoff=None, **kwargs):
+    """
+    限流后调用 func(**kwargs)，可重试错误按错误码做去相关抖动退避
+
+    Args:
+        func: 要调用的客户端方法
+        api: API 名，用于选择令牌桶（kwargs 中的 memory_id / memoryId 用于按 memory 限流）
+        max_retries: 最大重试次数
+        limiter: RateLimiter 实例（可选，默认使用共享限流器）
+        verbose: 是否打印重试信息
+        backoff: Backoff 实例（可选，默认按错误码做去相关抖动退避）
+
+    Returns:
+        func 的返回值；重试次数耗尽或不可重试时抛出最后一次的异常
+        （ResourceNotFoundException 同时使该 memory_id 的 ID 缓存条目失效）
+    """
+    limiter = limiter or get_rate_limiter()
+    memory_id = kwargs.get("memory_id", kwargs.get("memoryId"))
+    backoff = backoff or Backoff()
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire(api, memory_id)
+        try:
+            return func(**kwargs)
+        except Exception as e:
+            _invalidate_if_not_found(e, memory_id)
+            delay = backoff.next_delay(e)
+            if delay is None or attempt == max_retries:
+                raise
+            if verbose:
+                print(f"    [!] {error_code(e)}，等待 {delay:.1f} 秒后重试...（第{attempt+1}次）")
+            time.sleep(delay)
+
+
+async def acall_with_retry(func, api, max_retries=5, limiter=None, **kwargs):
+    """call_with_retry 的 asyncio 版本，阻塞调用在默认线程池中执行"""
+    limiter = limiter or get_rate_limiter()
+    memory_id = kwargs.get("memory_id", kwargs.get("memoryId"))
+    backoff = Backoff()
+
+    for attempt in range(max_retries + 1):
+        await limiter.acquire_async(api, memory_id)
+        try:
+            return await asyncio.to_thread(func, **kwargs)
+        except Exception as e:
+            _invalidate_if_not_found(e, memory_id)
+            delay = backoff.next_delay(e)
+            if delay is None or attempt == max_retries:
+                raise
+            await asyncio.sleep(delay)
+
+
 # ============================================================
 # 事件写入
 # ============================================================
 def create_event_with_retry(client, memory_id, actor_id, session_id, messages,
-                            max_retries=5, use_exponential_backoff=True):
+                            max_retries=5, use_exponential_backoff=True, limiter=None):
     """
-    带重试机制的事件写入
+    带限流和重试机制的事件写入
+
+    所有写入路径（write_conversation、EventBuffer、BulkIngester）都经过这里：写入成功后记入本地轮次缓存，
+    失败时使该会话的缓存失效（超时等情况下服务端可能已写入）。直接调用 client.create_event 不会更新缓存，
+    之后的 get_last_k_turns 可能返回过时结果，需要时用 get_turn_cache().invalidate() 清除
 
     Args:
         client: MemoryClient 实例
@@ -134,44 +323,38 @@ def create_event_with_retry(client, memory_id, actor_id, session_id, messages,
         actor_id: 用户 ID
         session_id: 会话 ID
         messages: 消息列表，格式 [("内容", "USER"/"ASSISTANT")]
-        max_retries: 最大重试次数
-        use_exponential_backoff: 是否使用指数退避
+        max_retries: 最大尝试次数（包含首次调用）
+        use_exponential_backoff: 是否使用指数退避，False 时每次按错误码的基础间隔固定等待
+        limiter: RateLimiter 实例（可选，默认使用共享限流器）
 
     Returns:
         bool: 是否成功
     """
-    delay = 1
-
-    for attempt in range(max_retries):
-        try:
-            client.create_event(
-                memory_id=memory_id,
-                actor_id=actor_id,
-                session_id=session_id,
-                messages=messages
-            )
-            return True
-
-        except Exception as e:
-            if "ThrottledException" in str(e):
-                if attempt < max_retries - 1:
-                    print(f"    [!] 限流，等待 {delay} 秒后重试...（第{attempt+1}次）")
-                    time.sleep(delay)
-                    if use_exponential_backoff:
-                        delay *= 2
-                else:
-                    print(f"    [-] 重试次数耗尽，写入失败")
-                    return False
-            else:
-                print(f"    [-] 写入事件失败: {e}")
-                return False
-
-    return False
+    try:
+        call_with_retry(
+            client.create_event, "create_event",
+            max_retries=max(max_retries - 1, 0), limiter=limiter, verbose=True,
+            backoff=Backoff(exponential=use_exponential_backoff),
+            memory_id=memory_id,
+            actor_id=actor_id,
+            session_id=session_id,
+            messages=messages
+        )
+        # 记入本地轮次缓存，之后的 get_last_k_turns 可直接本地返回
+        get_turn_cache().record(memory_id, actor_id, session_id, messages)
+        return True
+    except Exception as e:
+        get_turn_cache().invalidate(memory_id, actor_id, session_id)
+        if error_code(e) in BACKOFF_POLICIES:
+            print(f"    [-] 重试次数耗尽，写入失败")
+        else:
+            print(f"    [-] 写入事件失败: {e}")
+        return False
 
 
 def write_conversation(client, memory_id, actor_id, session_id, user_msg, assistant_msg=None):
     """
-    写入一轮对话
+    写入一轮对话（用户消息和助手回复合并为一个事件），成功后同时记入本地轮次缓存
 
     Args:
         client: MemoryClient 实例
@@ -184,24 +367,11 @@ def write_conversation(client, memory_id, actor_id, session_id, user_msg, assist
     Returns:
         bool: 是否成功
     """
-    # 写入用户消息
-    success = create_event_with_retry(
-        client, memory_id, actor_id, session_id,
-        [(user_msg, "USER")]
-    )
-
-    if not success:
-        return False
-
-    # 写入助手回复
+    messages = [(user_msg, "USER")]
     if assistant_msg:
-        time.sleep(0.5)
-        success = create_event_with_retry(
-            client, memory_id, actor_id, session_id,
-            [(assistant_msg, "ASSISTANT")]
-        )
+        messages.append((assistant_msg, "ASSISTANT"))
 
-    return success
+    return create_event_with_retry(client, memory_id, actor_id, session_id, messages)
 
 
 # ============================================================
@@ -217,25 +387,242 @@ def extract_content(memory_record):
     return str(memory_record)
 
 
-def count_events(client, memory_id, actor_id, session_id, max_results=100):
+def retrieve_memories(client, memory_id, namespace, query, top_k=3, limiter=None):
+    """
+    带限流和重试的语义检索
+
+    直接调用数据面 retrieve_memory_records：SDK 的 client.retrieve_memories() 会吞掉 ClientError 并返回 []，
+    限流和服务错误无法触发重试，也会被误当作"没有结果"
+    """
+    response = call_with_retry(
+        client.retrieve_memory_records, "retrieve_memory_records", limiter=limiter,
+        memoryId=memory_id,
+        namespace=namespace,
+        searchCriteria={"searchQuery": query, "topK": top_k},
+    )
+    return response.get("memoryRecordSummaries", [])
+
+
+def get_last_k_turns(client, memory_id, actor_id, session_id, k=5, use_cache=True):
+    """
+    获取最近 k 轮对话（与 MemoryClient.get_last_k_turns 一致，最新一轮在前）
+
+    本进程通过 create_event_with_retry 写入的轮次已覆盖请求窗口时直接返回缓存，
+    否则（未命中或缓存过期）调用服务端并用结果填充缓存
     """
-    统计事件总数
+    cache = get_turn_cache()
+    if use_cache:
+        turns = cache.get_last_k_turns(memory_id, actor_id, session_id, k)
+        if turns is not None:
+            return turns
+
+    turns = call_with_retry(
+        client.get_last_k_turns, "get_last_k_turns",
+        memory_id=memory_id,
+        actor_id=actor_id,
+        session_id=session_id,
+        k=k
+    ) or []
+    cache.seed(memory_id, actor_id, session_id, turns, k)
+    return turns
+
+
+# ============================================================
+# 分页遍历
+# ============================================================
+DEFAULT_PAGE_SIZE = 100
+
 
-    注意：当前 SDK 可能不支持分页，此函数返回单次查询的结果数
+def iter_pages(fetch_page, items_key, prefetch=True):
     """
+    按 nextToken 逐页遍历，产出每页的条目列表
+
+    Args:
+        fetch_page: fetch_page(next_token) -> 响应 dict
+        items_key: 响应中条目列表的键
+        prefetch: 调用方处理当前页时在后台线程中预取下一页
+    """
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
     try:
-        events = client.list_events(
-            memory_id=memory_id,
-            actor_id=actor_id,
-            session_id=session_id,
-            max_results=max_results
-        )
-        return len(events) if events else 0
+        response = fetch_page(None)
+        while True:
+            next_token = response.get("nextToken")
+            future = executor.submit(fetch_page, next_token) if next_token and executor else None
+            yield response.get(items_key, [])
+            if not next_token:
+                return
+            response = future.result() if future else fetch_page(next_token)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _event_pages(client, memory_id, actor_id, session_id, page_size, include_payloads, prefetch):
+    # MemoryClient.list_events 会在内部把所有页读完后才返回，这里直接调用数据面接口逐页读取
+    data_plane = getattr(client, "gmdp_client", None)
+    if data_plane is None:
+        return iter([call_with_retry(client.list_events, "list_events", memory_id=memory_id, actor_id=actor_id,
+                                     session_id=session_id, max_results=10 ** 9) or []])
+
+    def fetch_page(next_token):
+        params = {
+            "memoryId": memory_id,
+            "actorId": actor_id,
+            "sessionId": session_id,
+            "maxResults": page_size,
+            "includePayloads": include_payloads,
+        }
+        if next_token:
+            params["nextToken"] = next_token
+        return call_with_retry(data_plane.list_events, "list_events", **params)
+
+    return iter_pages(fetch_page, "events", prefetch)
+
+
+def iter_events(client, memory_id, actor_id, session_id, page_size=DEFAULT_PAGE_SIZE,
+                include_payloads=True, prefetch=True):
+    """逐条遍历会话的全部事件（生成器，与服务端相同最新的事件在前，按页读取并预取下一页）"""
+    for page in _event_pages(client, memory_id, actor_id, session_id, page_size, include_payloads, prefetch):
+        yield from page
+
+
+def iter_memory_records(client, memory_id, namespace, page_size=DEFAULT_PAGE_SIZE, prefetch=True):
+    """逐条遍历命名空间下的全部长期记忆记录（生成器，按页读取并预取下一页）"""
+    def fetch_page(next_token):
+        params = {"memoryId": memory_id, "namespace": namespace, "maxResults": page_size}
+        if next_token:
+            params["nextToken"] = next_token
+        return call_with_retry(client.list_memory_records, "list_memory_records", **params)
+
+    for page in iter_pages(fetch_page, "memoryRecordSummaries", prefetch):
+        yield from page
+
+
+def count_events(client, memory_id, actor_id, session_id, max_results=None):
+    """
+    统计事件总数（跟随 nextToken 读完所有页）
+
+    只统计数量时不请求事件内容，每页只返回元数据；max_results 可限制最多统计的条数
+    """
+    try:
+        count = 0
+        for page in _event_pages(client, memory_id, actor_id, session_id, DEFAULT_PAGE_SIZE,
+                                 include_payloads=False, prefetch=False):
+            count += len(page)
+            if max_results is not None and count >= max_results:
+                return max_results
+        return count
     except Exception as e:
         print(f"[-] 统计事件失败: {e}")
         return 0
 
 
+def count_memory_records(client, memory_id, namespace):
+    """统计命名空间下的长期记忆记录总数"""
+    return sum(1 for _ in iter_memory_records(client, memory_id, namespace, prefetch=False))
+
+
+def expected_record_counts(client, memory_id, namespaces, new_records=1):
+    """
+    在写入对话前调用：返回 {namespace: 现有记录数 + new_records}，作为 wait_for_memory_records 的 min_records
+
+    重复运行时命名空间中已有上次留下的记录，只按 min_records=1 等待会立即返回
+    """
+    return {namespace: count_memory_records(client, memory_id, namespace) + new_records
+            for namespace in namespaces}
+
+
+# ============================================================
+# 等待长期记忆提取
+# ============================================================
+DEFAULT_WAIT_TIMEOUT = 180
+
+
+def _records_ready(records, namespace, min_records):
+    expected = min_records.get(namespace, 1) if isinstance(min_records, dict) else min_records
+    return len(records) >= expected
+
+
+def _wait_delays(initial_delay, max_delay, timeout):
+    """产出每次轮询前的等待秒数（指数退避），超过 timeout 后停止"""
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        yield min(delay, remaining)
+        delay = min(delay * 2, max_delay)
+
+
+def wait_for_memory_records(client, memory_id, namespaces, min_records=1, predicate=None,
+                            timeout=DEFAULT_WAIT_TIMEOUT, initial_delay=2, max_delay=15, verbose=True):
+    """
+    轮询 list_memory_records，直到每个命名空间都有足够的长期记忆记录
+
+    Args:
+        client: MemoryClient 实例
+        memory_id: Memory ID
+        namespaces: 命名空间列表
+        min_records: 每个命名空间需要的最少记录数（int，或 {namespace: 数量}）
+        predicate: 可选的内容判断 predicate(namespace, records) -> bool，满足数量后还需满足该条件
+        timeout: 最长等待秒数
+        initial_delay / max_delay: 轮询间隔从 initial_delay 开始翻倍，最大 max_delay
+
+    Returns:
+        {namespace: records}
+
+    Raises:
+        TimeoutError: 超时仍未满足条件
+    """
+    ready = {}
+    start_time = time.monotonic()
+    delays = _wait_delays(initial_delay, max_delay, timeout)
+
+    while True:
+        for namespace in namespaces:
+            if namespace in ready:
+                continue
+            records = list(iter_memory_records(client, memory_id, namespace))
+            if _records_ready(records, namespace, min_records) and (predicate is None or predicate(namespace, records)):
+                ready[namespace] = records
+                if verbose:
+                    print(f"    [+] {namespace}: {len(records)} 条记录 ({time.monotonic() - start_time:.1f} 秒)")
+
+        if len(ready) == len(namespaces):
+            return ready
+
+        delay = next(delays, None)
+        if delay is None:
+            pending = [ns for ns in namespaces if ns not in ready]
+            raise TimeoutError(f"等待 {timeout} 秒后仍未生成长期记忆: {pending}")
+        time.sleep(delay)
+
+
+async def wait_for_memory_records_async(client, memory_id, namespaces, min_records=1, predicate=None,
+                                        timeout=DEFAULT_WAIT_TIMEOUT, initial_delay=2, max_delay=15):
+    """wait_for_memory_records 的 asyncio 版本，各命名空间并发查询"""
+    ready = {}
+    delays = _wait_delays(initial_delay, max_delay, timeout)
+
+    def list_records(namespace):
+        return namespace, list(iter_memory_records(client, memory_id, namespace))
+
+    while True:
+        pending = [ns for ns in namespaces if ns not in ready]
+        for namespace, records in await asyncio.gather(*(asyncio.to_thread(list_records, ns) for ns in pending)):
+            if _records_ready(records, namespace, min_records) and (predicate is None or predicate(namespace, records)):
+                ready[namespace] = records
+
+        if len(ready) == len(namespaces):
+            return ready
+
+        delay = next(delays, None)
+        if delay is None:
+            raise TimeoutError(f"等待 {timeout} 秒后仍未生成长期记忆: {[ns for ns in namespaces if ns not in ready]}")
+        await asyncio.sleep(delay)
+
+
 # ============================================================
 # 示例数据
 # ============================================================
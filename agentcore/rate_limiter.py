@@ -0,0 +1,159 @@
+"""
+AgentCore Memory 限流与退避
+令牌桶按 (API, memory_id) 限制请求速率，退避按 botocore 错误码选择参数并使用去相关抖动
+同一个限流器可同时在多线程和 asyncio 代码中使用
+"""
+import asyncio
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+
+# ============================================================
+# 默认配置
+# ============================================================
+DEFAULT_RATES = {               # 每个 memory 每秒请求数
+    "create_event": 20,
+    "retrieve_memory_records": 20,
+    "list_events": 20,
+    "list_memory_records": 20,
+}
+DEFAULT_RATE = 20
+
+# 错误码 -> (基础延迟, 最大延迟)；不在表中的错误不重试
+BACKOFF_POLICIES = {
+    "ThrottledException": (0.5, 20),
+    "ThrottlingException": (0.5, 20),
+    "TooManyRequestsException": (0.5, 20),
+    "ServiceQuotaExceededException": (1.0, 30),
+    "ServiceUnavailableException": (0.2, 10),
+    "InternalServerException": (0.2, 5),
+}
+
+
+def error_code(error):
+    """提取 botocore 错误码，非 ClientError 返回 None"""
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code")
+    return None
+
+
+# ============================================================
+# 令牌桶
+# ============================================================
+class TokenBucket:
+    """
+    令牌桶（线程安全）
+
+    reserve() 在锁内预占一个令牌并返回需要等待的秒数，等待在锁外进行，
+    因此同步调用用 time.sleep、异步调用用 asyncio.sleep 都不会阻塞其他调用方
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class RateLimiter:
+    """
+    按 (API, memory_id) 懒创建令牌桶
+
+    Args:
+        rates: {API 名: 每秒请求数}，未列出的 API 使用 default_rate
+        default_rate: 默认速率，None 表示不限流
+        per_memory: 是否每个 memory 单独限流（否则同一 API 共享一个桶）
+    """
+
+    def __init__(self, rates=None, default_rate=DEFAULT_RATE, per_memory=True):
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self.per_memory = per_memory
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def set_rate(self, api, rate):
+        """修改某个 API 的速率（对之后新建的桶生效，已有的桶同时更新）"""
+        with self._lock:
+            self.rates[api] = rate
+            for (bucket_api, _), bucket in self._buckets.items():
+                if bucket_api == api:
+                    bucket.rate = bucket.capacity = rate
+
+    def bucket(self, api, memory_id=None):
+        rate = self.rates.get(api, self.default_rate)
+        if not rate:
+            return None
+        key = (api, memory_id if self.per_memory else None)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(rate)
+            return self._buckets[key]
+
+    def acquire(self, api, memory_id=None):
+        bucket = self.bucket(api, memory_id)
+        if bucket:
+            bucket.acquire()
+
+    async def acquire_async(self, api, memory_id=None):
+        bucket = self.bucket(api, memory_id)
+        if bucket:
+            await bucket.acquire_async()
+
+
+_default_limiter = RateLimiter()
+
+
+def get_rate_limiter():
+    """进程内共享的限流器"""
+    return _default_limiter
+
+
+# ============================================================
+# 退避
+# ============================================================
+class Backoff:
+    """
+    去相关抖动退避: delay = min(cap, uniform(base, previous * 3))
+
+    base / cap 按错误码从 BACKOFF_POLICIES 中选择，不可重试的错误 next_delay() 返回 None；
+    exponential=False 时每次固定等待 base 秒
+    """
+
+    def __init__(self, policies=None, exponential=True):
+        self.policies = policies or BACKOFF_POLICIES
+        self.exponential = exponential
+        self.previous = {}
+
+    def next_delay(self, error):
+        code = error_code(error)
+        if code not in self.policies:
+            return None
+        base, cap = self.policies[code]
+        if not self.exponential:
+            return base
+        delay = min(cap, random.uniform(base, self.previous.get(code, base) * 3))
+        self.previous[code] = delay
+        return delay
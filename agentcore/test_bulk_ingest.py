@@ -0,0 +1,31 @@
+import json
+
+import bulk_ingest
+from bulk_ingest import BulkIngester
+from fake_memory_client import FakeMemoryClient
+from memory_utils import get_long_term_memory
+
+
+def test_malformed_records_fail_without_stopping_workers(tmp_path, monkeypatch):
+    client = FakeMemoryClient()
+    memory_id = get_long_term_memory("Bulk", actor_id="u", client=client, use_cache=False)
+    good = {"actor_id": "u1", "session_id": "s1", "messages": [["你好", "USER"], ["你好！", "ASSISTANT"]]}
+    bad_message = {"actor_id": "u1", "session_id": "s1", "messages": [["缺少角色"]]}
+    lines = [json.dumps(good), json.dumps(bad_message), "{不是 JSON", json.dumps(good)]
+    # 队列长度为 1：工作线程一旦退出，主线程就会在 put() 上阻塞
+    lines += [json.dumps(good)] * 5
+    monkeypatch.setattr(bulk_ingest, "QUEUE_SIZE", 1)
+
+    ingester = BulkIngester(memory_id, client=client, workers=1,
+                            checkpoint_path=str(tmp_path / "ckpt.json"),
+                            failures_path=str(tmp_path / "failed.jsonl"))
+    stats = ingester.run(lines)
+
+    assert stats["records"] == len(lines)
+    assert stats["failed_records"] == 2
+    assert sorted(ingester.failed_lines) == [1, 2]
+    assert stats["events"] == len(lines) - 2
+    assert ingester.checkpoint.line == len(lines) - 1
+    with open(tmp_path / "failed.jsonl", encoding="utf-8") as f:
+        failed = f.read().splitlines()
+    assert sorted(failed) == sorted([json.dumps(bad_message, ensure_ascii=False), "{不是 JSON"])
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from fake_memory_client import FakeMemoryClient
+from memory_buffer import EventBuffer
+
+
+def test_flush_writes_all_sessions_in_order():
+    client = FakeMemoryClient()
+    client.create_memory_and_wait(name="m", strategies=[])
+    memory_id = next(iter(client.memories))
+    with EventBuffer(client, flush_interval=60) as buffer:
+        for i in range(5):
+            buffer.add(memory_id, "actor", "session", [(f"message {i}", "USER")])
+    events = client.events[(memory_id, "actor", "session")]
+    texts = [m["conversational"]["content"]["text"] for e in events for m in e["payload"]]
+    assert texts == [f"message {i}" for i in range(5)]
+
+
+def test_exit_without_close_writes_buffered_events():
+    script = textwrap.dedent("""
+        import atexit
+        from fake_memory_client import FakeMemoryClient
+        from memory_buffer import EventBuffer
+
+        client = FakeMemoryClient()
+        memory_id = client.create_memory_and_wait(name="m", strategies=[])["id"]
+        # 先注册的 atexit 回调最后执行，此时 EventBuffer 已在退出时写入
+        atexit.register(lambda: print("EVENTS", sum(len(e) for e in client.events.values())))
+        buffer = EventBuffer(client, flush_interval=60)
+        for i in range(5):
+            buffer.add(memory_id, "actor", f"session-{i}", [(f"message {i}", "USER")])
+    """)
+    result = subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).parent,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert "EVENTS 5" in result.stdout, result.stdout + result.stderr
@@ -0,0 +1,27 @@
+from fake_memory_client import FakeMemoryClient
+from memory_id_cache import MemoryIdCache
+import memory_utils
+
+
+def test_entries_are_scoped_by_region_and_profile(tmp_path):
+    cache = MemoryIdCache(path=str(tmp_path / "ids.json"))
+    cache.put("Demo", "Demo-a", "us-west-2", "account-a")
+    cache.put("Demo", "Demo-b", "us-west-2", "account-b")
+    reloaded = MemoryIdCache(path=str(tmp_path / "ids.json"))
+    assert reloaded.get("Demo", "us-west-2", "account-a") == "Demo-a"
+    assert reloaded.get("Demo", "us-west-2", "account-b") == "Demo-b"
+    assert reloaded.get("Demo", "us-east-1", "account-a") is None
+
+    reloaded.invalidate(memory_id="Demo-a")
+    assert reloaded.get("Demo", "us-west-2", "account-a") is None
+    assert reloaded.get("Demo", "us-west-2", "account-b") == "Demo-b"
+
+
+def test_fake_client_ids_are_not_persisted(tmp_path, monkeypatch):
+    cache = MemoryIdCache(path=str(tmp_path / "ids.json"))
+    monkeypatch.setattr(memory_utils, "get_memory_id_cache", lambda: cache)
+    for _ in range(2):
+        client = FakeMemoryClient(region_name="us-west-2")
+        memory_id = memory_utils.get_short_term_memory("Demo", client=client)
+        assert memory_id in client.memories
+    assert not (tmp_path / "ids.json").exists()
@@ -0,0 +1,139 @@
+import pytest
+from botocore.exceptions import ClientError
+
+import memory_utils
+from fake_memory_client import FakeMemoryClient
+from memory_retriever import HybridRetriever
+
+
+class FailingRetrieveClient(FakeMemoryClient):
+    """retrieve_memory_records 按命名空间依次抛出预设的错误码"""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures  # namespace -> [错误码, ...]
+
+    def retrieve_memory_records(self, memoryId, namespace, searchCriteria, **kwargs):
+        codes = self.failures.get(namespace)
+        if codes:
+            self.calls["failed_retrieve"] = self.calls.get("failed_retrieve", 0) + 1
+            raise ClientError({"Error": {"Code": codes.pop(0), "Message": "injected"}}, "RetrieveMemoryRecords")
+        return super().retrieve_memory_records(memoryId, namespace, searchCriteria, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff_sleep(monkeypatch):
+    monkeypatch.setattr(memory_utils.time, "sleep", lambda seconds: None)
+
+
+def _memory_with_facts(client):
+    memory_id = memory_utils.get_long_term_memory("Retrieve", actor_id="u", client=client, use_cache=False)
+    memory_utils.write_conversation(client, memory_id, "u", "s", "I like python", "ok")
+    return memory_id
+
+
+def test_retrieve_memories_retries_throttling():
+    client = FailingRetrieveClient({"/facts/u": ["ThrottlingException", "ThrottlingException"]})
+    memory_id = _memory_with_facts(client)
+    results = memory_utils.retrieve_memories(client, memory_id, "/facts/u", "python")
+    assert client.calls["failed_retrieve"] == 2
+    assert [memory_utils.extract_content(r) for r in results] == ["I like python"]
+
+
+def test_retrieve_memories_raises_non_retryable_errors():
+    client = FailingRetrieveClient({"/facts/u": ["AccessDeniedException"]})
+    memory_id = _memory_with_facts(client)
+    with pytest.raises(ClientError):
+        memory_utils.retrieve_memories(client, memory_id, "/facts/u", "python")
+
+
+def test_hybrid_retriever_reports_failed_namespaces():
+    client = FailingRetrieveClient({"/preferences/u": ["AccessDeniedException"]})
+    memory_id = _memory_with_facts(client)
+    retriever = HybridRetriever(memory_id, ["/facts/u", "/preferences/u"], client=client)
+    try:
+        results = retriever.retrieve("python")
+    finally:
+        retriever.close()
+    assert list(retriever.errors) == ["/preferences/u"]
+    assert [r.namespace for r in results] == ["/facts/u"]
+
+
+def test_wait_uses_baseline_from_previous_runs():
+    client = FakeMemoryClient()
+    memory_id = _memory_with_facts(client)  # 以前运行留下的记录
+
+    expected = memory_utils.expected_record_counts(client, memory_id, ["/facts/u"])
+    assert expected == {"/facts/u": 2}
+    with pytest.raises(TimeoutError):
+        memory_utils.wait_for_memory_records(client, memory_id, ["/facts/u"], min_records=expected,
+                                             timeout=0.01, verbose=False)
+
+    memory_utils.write_conversation(client, memory_id, "u", "s2", "I use vim", "ok")
+    ready = memory_utils.wait_for_memory_records(client, memory_id, ["/facts/u"], min_records=expected,
+                                                 verbose=False)
+    assert len(ready["/facts/u"]) == 2
+
+
+def test_client_pool_creates_outside_lock_and_keeps_first_client():
+    created = []
+
+    def factory(region, profile):
+        assert not pool.lock.locked()
+        created.append(FakeMemoryClient(region_name=region))
+        return created[-1]
+
+    pool = memory_utils.MemoryClientPool(factory=factory)
+    first = pool.get("us-west-2")
+    assert pool.get("us-west-2") is first
+    assert pool.get("us-east-1") is not first
+    assert len(created) == 2
+
+
+def test_every_write_path_updates_turn_cache():
+    client = FakeMemoryClient()
+    memory_id = memory_utils.get_short_term_memory("Turns", client=client, use_cache=False)
+    cache = memory_utils.get_turn_cache()
+    cache.clear()
+
+    assert memory_utils.create_event_with_retry(client, memory_id, "u", "bulk", [("hi", "USER"), ("hey", "ASSISTANT")])
+    calls = dict(client.calls)
+    turns = memory_utils.get_last_k_turns(client, memory_id, "u", "bulk", k=1)
+    assert [m["content"]["text"] for m in turns[0]] == ["hi", "hey"]
+    assert client.calls == calls  # 直接从本地缓存返回
+
+    # 写入失败（服务端可能已写入）时清除该会话的缓存
+    cache.record("missing", "u", "bulk", [("x", "USER")])
+    assert not memory_utils.create_event_with_retry(client, "missing", "u", "bulk", [("y", "USER")], max_retries=1)
+    assert cache.get_last_k_turns("missing", "u", "bulk", 1) is None
+
+
+def test_turn_cache_hit_matches_service_order():
+    client = FakeMemoryClient()
+    memory_id = memory_utils.get_short_term_memory("Order", client=client, use_cache=False)
+    memory_utils.get_turn_cache().clear()
+    for i in range(3):
+        assert memory_utils.create_event_with_retry(client, memory_id, "u", "s", [(f"q{i}", "USER"), (f"a{i}", "ASSISTANT")])
+
+    miss = memory_utils.get_last_k_turns(client, memory_id, "u", "s", k=2, use_cache=False)
+    hit = memory_utils.get_last_k_turns(client, memory_id, "u", "s", k=2)
+    assert hit == miss
+    assert [turn[0]["content"]["text"] for turn in hit] == ["q2", "q1"]  # 最新一轮在前
+
+    # 由服务端结果填充缓存后再写入一轮，命中结果仍与服务端一致
+    memory_utils.get_turn_cache().clear()
+    memory_utils.get_last_k_turns(client, memory_id, "u", "s", k=5)
+    assert memory_utils.create_event_with_retry(client, memory_id, "u", "s", [("q3", "USER"), ("a3", "ASSISTANT")])
+    calls = dict(client.calls)
+    hit = memory_utils.get_last_k_turns(client, memory_id, "u", "s", k=3)
+    assert client.calls == calls
+    assert hit == memory_utils.get_last_k_turns(client, memory_id, "u", "s", k=3, use_cache=False)
+
+
+def test_create_event_keeps_attempt_count_and_backoff_keyword():
+    client = FakeMemoryClient()
+    memory_id = memory_utils.get_short_term_memory("Attempts", client=client, use_cache=False)
+    client.throttle_rate = 1.0
+    assert not memory_utils.create_event_with_retry(client, memory_id, "u", "s", [("hi", "USER")],
+                                                    max_retries=3, use_exponential_backoff=False)
+    assert client.calls["create_event"] == 3
@@ -0,0 +1,130 @@
+"""
+AgentCore Memory 本地对话轮次缓存
+按会话保存最近写入的轮次，get_last_k_turns 在缓存覆盖请求窗口时直接本地返回，省去一次网络往返
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+# ============================================================
+# 默认配置
+# ============================================================
+DEFAULT_TURNS_PER_SESSION = 20
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_TTL = 300  # 秒，超过该时间未更新的会话可能已被其他进程写入，视为过期
+
+
+class Turn:
+    """一轮对话：以 USER 消息开始，后跟若干 ASSISTANT 消息"""
+
+    __slots__ = ("messages",)
+
+    def __init__(self):
+        self.messages = []
+
+    def add(self, text, role):
+        # 与 get_last_k_turns 返回的消息格式一致
+        self.messages.append({"content": {"text": text}, "role": role})
+
+
+class SessionTurns:
+    """单个会话的环形缓冲区，按时间正序保存（最新一轮在末尾）"""
+
+    __slots__ = ("turns", "complete", "updated_at")
+
+    def __init__(self, capacity):
+        self.turns = deque(maxlen=capacity)
+        self.complete = False  # True 表示缓冲区包含该会话的全部轮次（会话总轮数不超过容量）
+        self.updated_at = time.monotonic()
+
+
+class TurnCache:
+    """
+    按 (memory_id, actor_id, session_id) 缓存最近的对话轮次
+
+    Args:
+        turns_per_session: 每个会话最多缓存的轮次数
+        max_sessions: 最多缓存的会话数（最近最少使用淘汰）
+        ttl: 会话超过该秒数未更新即视为过期
+    """
+
+    def __init__(self, turns_per_session=DEFAULT_TURNS_PER_SESSION, max_sessions=DEFAULT_MAX_SESSIONS,
+                 ttl=DEFAULT_TTL):
+        self.turns_per_session = turns_per_session
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "stale": 0}
+
+    def _session(self, key):
+        """获取或创建会话缓冲区（调用方持有锁）"""
+        session = self.sessions.get(key)
+        if session is None:
+            session = self.sessions[key] = SessionTurns(self.turns_per_session)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        self.sessions.move_to_end(key)
+        return session
+
+    def record(self, memory_id, actor_id, session_id, messages):
+        """记录已成功写入的消息，格式 [("内容", "USER"/"ASSISTANT")]"""
+        with self.lock:
+            session = self._session((memory_id, actor_id, session_id))
+            for text, role in messages:
+                if role == "USER" or not session.turns:
+                    if len(session.turns) == session.turns.maxlen:
+                        session.complete = False
+                    session.turns.append(Turn())
+                session.turns[-1].add(text, role)
+            session.updated_at = time.monotonic()
+
+    def seed(self, memory_id, actor_id, session_id, turns, requested_k):
+        """
+        用服务端返回的轮次填充缓存；返回的轮次少于 requested_k 说明已是会话全部内容
+
+        turns 为 MemoryClient.get_last_k_turns 的返回值（最新一轮在前），缓存内部按时间正序保存
+        """
+        with self.lock:
+            session = self._session((memory_id, actor_id, session_id))
+            session.turns.clear()
+            for messages in reversed(turns[:self.turns_per_session]):
+                turn = Turn()
+                turn.messages = list(messages)
+                session.turns.append(turn)
+            session.complete = len(turns) < requested_k and len(turns) <= self.turns_per_session
+            session.updated_at = time.monotonic()
+
+    def get_last_k_turns(self, memory_id, actor_id, session_id, k):
+        """缓存覆盖最近 k 轮时返回轮次列表（与 MemoryClient.get_last_k_turns 一致，最新一轮在前），否则返回 None"""
+        key = (memory_id, actor_id, session_id)
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is not None and time.monotonic() - session.updated_at > self.ttl:
+                del self.sessions[key]
+                self.metrics["stale"] += 1
+                session = None
+            if session is None or (len(session.turns) < k and not session.complete):
+                self.metrics["misses"] += 1
+                return None
+            self.sessions.move_to_end(key)
+            self.metrics["hits"] += 1
+            turns = list(session.turns)[-k:] if k else []
+            return [list(turn.messages) for turn in reversed(turns)]
+
+    def invalidate(self, memory_id, actor_id, session_id):
+        with self.lock:
+            self.sessions.pop((memory_id, actor_id, session_id), None)
+
+    def clear(self):
+        with self.lock:
+            self.sessions.clear()
+
+
+_default_cache = TurnCache()
+
+
+def get_turn_cache():
+    """进程内共享的轮次缓存"""
+    return _default_cache
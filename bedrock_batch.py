@@ -2,28 +2,41 @@
 
 import boto3
 
-bedrock = boto3.client(service_name="bedrock")
+ROLE_ARN = "arn:aws:iam::123456789012:role/MyBatchInferenceRole"
+MODEL_ID = "amazon.titan-text-express-v1"
+INPUT_S3_URI = "s3://input-bucket/input/abc.jsonl"
+OUTPUT_S3_URI = "s3://output-bucket/output/"
 
-inputDataConfig=({
-    "s3InputDataConfig": { 
-        "s3Uri": "s3://input-bucket/input/abc.jsonl"
-    }
-})
+# https://docs.aws.amazon.com/zh_cn/bedrock/latest/userguide/batch-inference-supported.html
 
-outputDataConfig=({
-    "s3OutputDataConfig": {
-        "s3Uri": "s3://output-bucket/output/" 
-    }
-})
 
-# https://docs.aws.amazon.com/zh_cn/bedrock/latest/userguide/batch-inference-supported.html
+def create_batch_job(bedrock, job_name, input_s3_uri=INPUT_S3_URI, output_s3_uri=OUTPUT_S3_URI,
+                     model_id=MODEL_ID, role_arn=ROLE_ARN):
+    """提交一个批量推理任务，返回 jobArn"""
+    inputDataConfig=({
+        "s3InputDataConfig": {
+            "s3Uri": input_s3_uri
+        }
+    })
+
+    outputDataConfig=({
+        "s3OutputDataConfig": {
+            "s3Uri": output_s3_uri
+        }
+    })
+
+    response = bedrock.create_model_invocation_job(
+        roleArn=role_arn,
+        modelId=model_id,
+        jobName=job_name,
+        inputDataConfig=inputDataConfig,
+        outputDataConfig=outputDataConfig
+    )
+
+    return response.get('jobArn')
 
-response = bedrock.create_model_invocation_job(
-    roleArn="arn:aws:iam::123456789012:role/MyBatchInferenceRole",  
-    modelId="amazon.titan-text-express-v1",
-    jobName="my-batch-job",
-    inputDataConfig=inputDataConfig,
-    outputDataConfig=outputDataConfig
-)
 
-jobArn = response.get('jobArn')
+if __name__ == "__main__":
+    bedrock = boto3.client(service_name="bedrock")
+    jobArn = create_batch_job(bedrock, "my-batch-job")
+    print(jobArn)
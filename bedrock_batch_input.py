@@ -0,0 +1,209 @@
+"""
+文件名: bedrock_batch_input.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+为 Bedrock 批量推理（bedrock_batch.py）生成 JSONL 输入文件。
+
+功能：
+    - 接收任意可迭代的 prompt（可以是生成器，记录数不受内存限制）
+    - 逐条转换为 {"recordId": ..., "modelInput": {...}} 并流式写入分片文件
+    - 按记录数 / 字节数切分分片（默认遵循每个文件 50,000 条、1GB 的服务限制）
+    - 可选 gzip 压缩（用于归档或传输；提交批量推理任务时需使用未压缩的 .jsonl）
+    - 输出到本地目录或 S3（含 S3 兼容存储 / moto），S3 分片先写入临时文件再分段上传
+
+使用示例：
+    prompts = (line.strip() for line in open("questions.txt"))
+    shards = write_batch_input(prompts, "s3://input-bucket/input/", model_id="anthropic.claude-3-haiku-20240307-v1:0")
+"""
+
+import gzip
+import json
+import os
+import tempfile
+
+import boto3
+
+DEFAULT_RECORDS_PER_SHARD = 50000
+DEFAULT_MAX_SHARD_BYTES = 1024 ** 3
+DEFAULT_MAX_TOKENS = 1000
+
+
+# ============================================================
+# 记录构建
+# ============================================================
+def build_model_input(prompt, model_id, max_tokens=DEFAULT_MAX_TOKENS, temperature=None):
+    """根据模型系列构建 modelInput（与 invoke_model 的 body 格式一致）"""
+    if isinstance(prompt, dict):
+        return prompt
+
+    if "anthropic" in model_id:
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
+        }
+        if temperature is not None:
+            body["temperature"] = temperature
+        return body
+
+    if "nova" in model_id:
+        config = {"maxTokens": max_tokens}
+        if temperature is not None:
+            config["temperature"] = temperature
+        return {
+            "messages": [{"role": "user", "content": [{"text": prompt}]}],
+            "inferenceConfig": config,
+        }
+
+    if "titan" in model_id:
+        config = {"maxTokenCount": max_tokens}
+        if temperature is not None:
+            config["temperature"] = temperature
+        return {"inputText": prompt, "textGenerationConfig": config}
+
+    body = {"prompt": prompt, "max_tokens": max_tokens}
+    if temperature is not None:
+        body["temperature"] = temperature
+    return body
+
+
+RECORD_ID_WIDTH = 11  # Bedrock 批量推理要求 recordId 为 11 位字母数字
+
+
+def make_record_id(index):
+    """
+    生成 11 位定长数字 recordId，字典序与 index 顺序一致
+
+    Raises:
+        ValueError: index 超出 11 位能表示的范围（10^11 条记录）
+    """
+    if not 0 <= index < 10 ** RECORD_ID_WIDTH:
+        raise ValueError(f"index {index} 超出 {RECORD_ID_WIDTH} 位 recordId 的范围")
+    return f"{index:0{RECORD_ID_WIDTH}d}"
+
+
+def iter_records(prompts, model_id, **input_kwargs):
+    """
+    把 prompt 流转换为批量推理记录流
+
+    prompts 的元素可以是：
+        - 字符串：自动生成 recordId
+        - (record_id, prompt) 元组
+        - 已包含 recordId / modelInput 的字典
+    """
+    for index, item in enumerate(prompts):
+        if isinstance(item, dict) and "modelInput" in item:
+            yield {"recordId": item.get("recordId") or make_record_id(index), "modelInput": item["modelInput"]}
+        elif isinstance(item, tuple):
+            record_id, prompt = item
+            yield {"recordId": record_id, "modelInput": build_model_input(prompt, model_id, **input_kwargs)}
+        else:
+            yield {"recordId": make_record_id(index), "modelInput": build_model_input(item, model_id, **input_kwargs)}
+
+
+# ============================================================
+# 输出目标
+# ============================================================
+class LocalTarget:
+    """本地目录输出"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def open_shard(self, name):
+        return open(os.path.join(self.directory, name), "wb")
+
+    def commit_shard(self, f, name):
+        f.close()
+        return os.path.join(self.directory, name)
+
+
+class S3Target:
+    """S3 输出，分片先写入本地临时文件，关闭后通过 upload_file 分段上传并删除"""
+
+    def __init__(self, uri, s3_client=None):
+        bucket, _, prefix = uri[len("s3://"):].partition("/")
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/") + "/" if prefix else ""
+        self.s3 = s3_client or boto3.client("s3")
+
+    def open_shard(self, name):
+        return tempfile.NamedTemporaryFile(suffix="-" + name, delete=False)
+
+    def commit_shard(self, f, name):
+        f.close()
+        key = self.prefix + name
+        try:
+            self.s3.upload_file(f.name, self.bucket, key)
+        finally:
+            os.remove(f.name)
+        return f"s3://{self.bucket}/{key}"
+
+
+def open_target(uri, s3_client=None):
+    """根据 uri 创建输出目标（s3://... 或本地目录）"""
+    if uri.startswith("s3://"):
+        return S3Target(uri, s3_client=s3_client)
+    return LocalTarget(uri)
+
+
+# ============================================================
+# 分片写入
+# ============================================================
+def write_batch_input(prompts, target, model_id, records_per_shard=DEFAULT_RECORDS_PER_SHARD,
+                      max_shard_bytes=DEFAULT_MAX_SHARD_BYTES, compress=False,
+                      shard_prefix="batch-input", s3_client=None, **input_kwargs):
+    """
+    把 prompt 流写成批量推理 JSONL 分片
+
+    Args:
+        prompts: 可迭代的 prompt（见 iter_records）
+        target: 本地目录或 s3://bucket/prefix/，也可以是 LocalTarget / S3Target 实例
+        model_id: 模型 ID，决定 modelInput 的格式
+        records_per_shard: 每个分片的最大记录数
+        max_shard_bytes: 每个分片的最大字节数（未压缩）
+        compress: 是否 gzip 压缩分片
+        input_kwargs: 透传给 build_model_input 的参数（max_tokens, temperature）
+
+    Returns:
+        list: 每个分片的 {"uri": ..., "records": ..., "bytes": ...}
+    """
+    if isinstance(target, str):
+        target = open_target(target, s3_client=s3_client)
+
+    extension = ".jsonl.gz" if compress else ".jsonl"
+    shards = []
+    f = raw = name = None
+    shard_records = shard_bytes = 0
+
+    def close_shard():
+        if compress:
+            f.close()
+        uri = target.commit_shard(raw, name)
+        shards.append({"uri": uri, "records": shard_records, "bytes": shard_bytes})
+        print(f"[+] 分片写入完成: {uri} ({shard_records} 条)")
+
+    for record in iter_records(prompts, model_id, **input_kwargs):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+        if f is not None and (shard_records >= records_per_shard or shard_bytes + len(line) > max_shard_bytes):
+            close_shard()
+            f = None
+
+        if f is None:
+            name = f"{shard_prefix}-{len(shards):05d}{extension}"
+            raw = target.open_shard(name)
+            f = gzip.GzipFile(fileobj=raw, mode="wb") if compress else raw
+            shard_records = shard_bytes = 0
+
+        f.write(line)
+        shard_records += 1
+        shard_bytes += len(line)
+
+    if f is not None:
+        close_shard()
+
+    return shards
@@ -0,0 +1,226 @@
+"""
+文件名: bedrock_batch_output.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+读取 Bedrock 批量推理任务的输出（*.jsonl.out），并按 recordId 关联回原始输入记录。
+
+功能：
+    - 逐行流式读取输出分片（本地目录或 S3），内存占用与输出大小无关
+    - 多个分片通过线程池并行读取，结果经有界队列汇总
+    - 输入记录建立 SQLite 磁盘索引（recordId -> 原始行），关联时不需要把输入全部放进内存
+    - 产出 BatchResult 结果，失败记录（含 error 字段或无法解析的行）单独收集到 failures
+
+使用示例：
+    index = InputIndex("input-index.db")
+    index.build(["s3://input-bucket/input/batch-input-00000.jsonl"])
+    reader = BatchOutputReader("s3://output-bucket/output/", input_index=index)
+    for result in reader:
+        print(result.record_id, result.model_output)
+    print(f"失败 {len(reader.failures)} 条")
+"""
+
+import gzip
+import json
+import os
+import queue
+import sqlite3
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+OUTPUT_SUFFIX = ".jsonl.out"
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 1000
+
+BatchResult = namedtuple("BatchResult", ["record_id", "model_input", "model_output", "input_record", "shard"])
+BatchFailure = namedtuple("BatchFailure", ["record_id", "error", "shard", "line"])
+
+_END = object()
+
+
+# ============================================================
+# 分片读取
+# ============================================================
+def _split_s3_uri(uri):
+    bucket, _, key = uri[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def iter_lines(uri, s3_client=None):
+    """逐行读取本地或 S3 上的 JSONL 文件（支持 .gz）"""
+    if uri.startswith("s3://"):
+        bucket, key = _split_s3_uri(uri)
+        body = (s3_client or boto3.client("s3")).get_object(Bucket=bucket, Key=key)["Body"]
+        stream = gzip.GzipFile(fileobj=body) if key.endswith(".gz") else body
+        if hasattr(stream, "iter_lines") and not key.endswith(".gz"):
+            lines = stream.iter_lines()
+        else:
+            lines = stream
+    else:
+        opener = gzip.open if uri.endswith(".gz") else open
+        lines = opener(uri, "rb")
+
+    try:
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield line.decode("utf-8")
+    finally:
+        if hasattr(lines, "close"):
+            lines.close()
+
+
+def list_output_shards(output_uri, s3_client=None, suffix=OUTPUT_SUFFIX):
+    """列出输出前缀下所有输出分片（包含任务 ID 子目录）"""
+    if output_uri.startswith("s3://"):
+        s3 = s3_client or boto3.client("s3")
+        bucket, prefix = _split_s3_uri(output_uri)
+        shards = []
+        for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith(suffix):
+                    shards.append(f"s3://{bucket}/{obj['Key']}")
+        return sorted(shards)
+
+    shards = []
+    for root, _, files in os.walk(output_uri):
+        shards.extend(os.path.join(root, name) for name in files if name.endswith(suffix))
+    return sorted(shards)
+
+
+# ============================================================
+# 输入索引
+# ============================================================
+class InputIndex:
+    """
+    recordId -> 原始输入行的 SQLite 磁盘索引
+
+    Args:
+        path: 索引文件路径，已存在时直接复用
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS records (record_id TEXT PRIMARY KEY, line TEXT)")
+
+    def build(self, input_uris, s3_client=None, batch_size=10000):
+        """流式读取输入分片并写入索引，返回索引记录数"""
+        count = 0
+        batch = []
+        for uri in input_uris:
+            for line in iter_lines(uri, s3_client):
+                batch.append((json.loads(line)["recordId"], line))
+                if len(batch) >= batch_size:
+                    count += self._insert(batch)
+                    batch = []
+        if batch:
+            count += self._insert(batch)
+        return count
+
+    def _insert(self, rows):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO records VALUES (?, ?)", rows)
+        return len(rows)
+
+    def get(self, record_id):
+        row = self.conn.execute("SELECT line FROM records WHERE record_id = ?", (record_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+# ============================================================
+# 输出读取
+# ============================================================
+class BatchOutputReader:
+    """
+    并行流式读取批量推理输出
+
+    Args:
+        output_uri: 输出前缀（本地目录或 s3://bucket/prefix/），或输出分片列表
+        input_index: InputIndex 实例（可选），用于关联原始输入记录
+        max_workers: 并行读取的分片数
+        queue_size: 汇总队列长度，限制读取线程领先消费者的行数
+    """
+
+    def __init__(self, output_uri, input_index=None, max_workers=DEFAULT_MAX_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, s3_client=None):
+        self.s3 = s3_client or (boto3.client("s3") if _uses_s3(output_uri) else None)
+        if isinstance(output_uri, (list, tuple)):
+            self.shards = list(output_uri)
+        else:
+            self.shards = list_output_shards(output_uri, self.s3)
+        self.input_index = input_index
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.failures = []
+        self.succeeded = 0
+
+    def _read_shard(self, shard, results, stop):
+        try:
+            for line in iter_lines(shard, self.s3):
+                if stop.is_set():
+                    return
+                results.put((shard, line))
+        except Exception as e:
+            results.put((shard, e))
+        finally:
+            results.put((shard, _END))
+
+    def _parse(self, shard, line):
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            return BatchFailure(None, f"无法解析: {e}", shard, line)
+
+        record_id = record.get("recordId")
+        if "error" in record or "modelOutput" not in record:
+            return BatchFailure(record_id, record.get("error", "缺少 modelOutput"), shard, line)
+
+        input_record = self.input_index.get(record_id) if self.input_index else None
+        return BatchResult(record_id, record.get("modelInput"), record["modelOutput"], input_record, shard)
+
+    def __iter__(self):
+        results = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        remaining = len(self.shards)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        for shard in self.shards:
+            executor.submit(self._read_shard, shard, results, stop)
+
+        try:
+            while remaining:
+                shard, item = results.get()
+                if item is _END:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    self.failures.append(BatchFailure(None, f"读取分片失败: {item}", shard, None))
+                else:
+                    parsed = self._parse(shard, item)
+                    if isinstance(parsed, BatchFailure):
+                        self.failures.append(parsed)
+                    else:
+                        self.succeeded += 1
+                        yield parsed
+        finally:
+            # 提前停止迭代时通知读取线程退出，并清空队列避免其阻塞在 put 上
+            stop.set()
+            while remaining:
+                if results.get()[1] is _END:
+                    remaining -= 1
+            executor.shutdown(wait=True)
+
+
+def _uses_s3(output_uri):
+    uris = output_uri if isinstance(output_uri, (list, tuple)) else [output_uri]
+    return any(uri.startswith("s3://") for uri in uris)
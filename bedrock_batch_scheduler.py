@@ -0,0 +1,297 @@
+"""
+文件名: bedrock_batch_scheduler.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+批量推理多任务调度器：把大规模工作负载拆分成多个批量推理任务，在并发任务配额内提交、
+轮询状态、重新提交失败的分片，并统计各模型的吞吐量（records/hour）。
+
+功能：
+    - 通过 bedrock_batch_input.write_batch_input 把 prompt 流切分为输入分片，每个分片一个任务
+    - 同时运行的任务数不超过 max_concurrent_jobs；遇到配额 / 限流错误时暂停提交，下一轮再试
+    - get_model_invocation_job 的轮询间隔在无状态变化时指数增长，有变化时重置
+    - Failed / Stopped / Expired 的分片最多重新提交 max_resubmits 次
+    - 提交和轮询遇到限流 / 临时错误时保留任务当前状态，本轮停止调用并加倍轮询间隔；
+      只有不可重试的轮询错误才会抛出
+
+使用示例：
+    python bedrock_batch_scheduler.py --stub          # 使用本地模拟客户端
+"""
+
+import argparse
+import time
+from collections import deque
+
+import boto3
+from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+from bedrock_batch import MODEL_ID, OUTPUT_S3_URI, ROLE_ARN, create_batch_job
+from bedrock_batch_input import DEFAULT_RECORDS_PER_SHARD, write_batch_input
+
+DEFAULT_MAX_CONCURRENT_JOBS = 10
+DEFAULT_POLL_INTERVAL = 60
+DEFAULT_MAX_POLL_INTERVAL = 600
+DEFAULT_MAX_RESUBMITS = 2
+
+SUCCEEDED_STATUSES = ("Completed", "PartiallyCompleted")
+FAILED_STATUSES = ("Failed", "Stopped", "Expired")
+RETRYABLE_SUBMIT_ERRORS = ("ServiceQuotaExceededException", "ThrottlingException", "TooManyRequestsException")
+RETRYABLE_ERRORS = RETRYABLE_SUBMIT_ERRORS + ("InternalServerException", "ServiceUnavailableException")
+
+
+def is_retryable(error):
+    """限流、配额和临时服务 / 网络错误可以稍后重试"""
+    if isinstance(error, ClientError):
+        return error.response["Error"]["Code"] in RETRYABLE_ERRORS
+    return isinstance(error, (ConnectionError, HTTPClientError))
+
+
+class BatchJob:
+    """一个输入分片对应的批量推理任务"""
+
+    def __init__(self, name, input_s3_uri, records, model_id, output_s3_uri):
+        self.name = name
+        self.input_s3_uri = input_s3_uri
+        self.records = records
+        self.model_id = model_id
+        self.output_s3_uri = output_s3_uri
+        self.attempts = 0
+        self.job_arn = None
+        self.status = "Pending"
+        self.message = None
+        self.submitted_at = None
+        self.finished_at = None
+
+
+class BatchJobScheduler:
+    """
+    批量推理任务调度器
+
+    Args:
+        bedrock: bedrock 控制面客户端（可以是 bedrock_batch_stub.StubBedrockBatchClient）
+        role_arn: 批量推理服务角色
+        max_concurrent_jobs: 同时运行的任务数上限（账号配额）
+        poll_interval: 初始轮询间隔（秒）
+        max_poll_interval: 最大轮询间隔（秒）
+        max_resubmits: 每个分片失败后的最大重新提交次数
+    """
+
+    def __init__(self, bedrock=None, role_arn=ROLE_ARN, max_concurrent_jobs=DEFAULT_MAX_CONCURRENT_JOBS,
+                 poll_interval=DEFAULT_POLL_INTERVAL, max_poll_interval=DEFAULT_MAX_POLL_INTERVAL,
+                 max_resubmits=DEFAULT_MAX_RESUBMITS):
+        self.bedrock = bedrock or boto3.client(service_name="bedrock")
+        self.role_arn = role_arn
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_resubmits = max_resubmits
+        self.jobs = []
+
+    # ------------------------------------------------------------
+    # 拆分工作负载
+    # ------------------------------------------------------------
+    def add_job(self, input_s3_uri, records, model_id=MODEL_ID, output_s3_uri=OUTPUT_S3_URI, name=None):
+        """添加一个已存在的输入分片"""
+        job = BatchJob(name or f"batch-{len(self.jobs):05d}", input_s3_uri, records, model_id, output_s3_uri)
+        self.jobs.append(job)
+        return job
+
+    def add_workload(self, prompts, input_s3_prefix, model_id=MODEL_ID, output_s3_uri=OUTPUT_S3_URI,
+                     records_per_shard=DEFAULT_RECORDS_PER_SHARD, job_name_prefix="batch", s3_client=None,
+                     **input_kwargs):
+        """把 prompt 流写成输入分片，每个分片添加为一个任务"""
+        shards = write_batch_input(prompts, input_s3_prefix, model_id, records_per_shard=records_per_shard,
+                                   shard_prefix=job_name_prefix, s3_client=s3_client, **input_kwargs)
+        for shard in shards:
+            self.add_job(shard["uri"], shard["records"], model_id, output_s3_uri,
+                         name=f"{job_name_prefix}-{len(self.jobs):05d}")
+        return shards
+
+    # ------------------------------------------------------------
+    # 提交与轮询
+    # ------------------------------------------------------------
+    def _submit(self, job):
+        """提交任务；配额 / 限流 / 临时错误时返回 False，其他错误标记失败并返回 None"""
+        job.attempts += 1
+        try:
+            job.job_arn = create_batch_job(
+                self.bedrock,
+                job_name=f"{job.name}-{job.attempts}",
+                input_s3_uri=job.input_s3_uri,
+                output_s3_uri=job.output_s3_uri,
+                model_id=job.model_id,
+                role_arn=self.role_arn,
+            )
+        except (ClientError, ConnectionError, HTTPClientError) as e:
+            job.attempts -= 1
+            if is_retryable(e):
+                return False
+            job.status = "SubmitFailed"
+            job.message = str(e)
+            print(f"[-] 提交失败 {job.name}: {e}")
+            return None
+
+        job.status = "Submitted"
+        job.submitted_at = job.submitted_at or time.time()
+        print(f"[+] 已提交 {job.name}（第 {job.attempts} 次）: {job.job_arn}")
+        return True
+
+    def _poll(self, job):
+        """查询任务状态，返回状态是否发生变化；限流 / 临时错误时保留原状态并返回 None"""
+        try:
+            response = self.bedrock.get_model_invocation_job(jobIdentifier=job.job_arn)
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            print(f"[!] 查询 {job.name} 状态失败，稍后重试: {e}")
+            return None
+        status = response["status"]
+        if status == job.status:
+            return False
+
+        job.status = status
+        job.message = response.get("message")
+        if status in SUCCEEDED_STATUSES or status in FAILED_STATUSES:
+            end_time = response.get("endTime")
+            job.finished_at = end_time.timestamp() if end_time else time.time()
+        print(f"[*] {job.name}: {status}" + (f" ({job.message})" if job.message else ""))
+        return True
+
+    def run(self):
+        """提交并跟踪全部任务，直到全部结束，返回统计报告"""
+        pending = deque(job for job in self.jobs if job.status == "Pending")
+        active = []
+        interval = self.poll_interval
+        start_time = time.time()
+
+        while pending or active:
+            changed = False
+            throttled = False
+
+            # 在配额内提交新任务
+            while pending and len(active) < self.max_concurrent_jobs:
+                job = pending[0]
+                submitted = self._submit(job)
+                if submitted is False:
+                    print(f"[!] 达到任务配额或被限流，{len(active)} 个任务运行中，稍后继续提交")
+                    throttled = True
+                    break
+                pending.popleft()
+                if submitted:
+                    active.append(job)
+                    changed = True
+
+            if not active and not pending:
+                break
+
+            # 等待后轮询运行中的任务
+            time.sleep(interval)
+            for job in list(active):
+                polled = self._poll(job)
+                if polled is None:
+                    # 被限流时本轮不再轮询其余任务；该任务移到队尾，避免一直排在前面的任务阻塞其他任务
+                    active.remove(job)
+                    active.append(job)
+                    throttled = True
+                    break
+                if not polled:
+                    continue
+                changed = True
+                if job.status in SUCCEEDED_STATUSES:
+                    active.remove(job)
+                elif job.status in FAILED_STATUSES:
+                    active.remove(job)
+                    if job.attempts <= self.max_resubmits:
+                        print(f"[!] {job.name} {job.status}，重新提交")
+                        job.status = "Pending"
+                        pending.append(job)
+
+            if throttled or not changed:
+                interval = min(interval * 2, self.max_poll_interval)
+            else:
+                interval = self.poll_interval
+
+        return self.report(time.time() - start_time)
+
+    # ------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------
+    def report(self, wall_time=None):
+        """按模型汇总任务结果和吞吐量"""
+        models = {}
+        for job in self.jobs:
+            stats = models.setdefault(job.model_id, {
+                "jobs": 0, "succeeded": 0, "failed": 0, "resubmits": 0,
+                "records": 0, "first_submit": None, "last_finish": None,
+            })
+            stats["jobs"] += 1
+            stats["resubmits"] += max(job.attempts - 1, 0)
+            if job.status in SUCCEEDED_STATUSES:
+                stats["succeeded"] += 1
+                stats["records"] += job.records
+                stats["last_finish"] = max(filter(None, (stats["last_finish"], job.finished_at)))
+            else:
+                stats["failed"] += 1
+            if job.submitted_at:
+                stats["first_submit"] = min(filter(None, (stats["first_submit"], job.submitted_at)))
+
+        for stats in models.values():
+            first, last = stats.pop("first_submit"), stats.pop("last_finish")
+            hours = (last - first) / 3600 if first and last and last > first else None
+            stats["records_per_hour"] = stats["records"] / hours if hours else 0
+
+        return {
+            "wall_time": wall_time,
+            "models": models,
+            "failed_jobs": [
+                {"name": job.name, "status": job.status, "message": job.message, "input": job.input_s3_uri}
+                for job in self.jobs if job.status not in SUCCEEDED_STATUSES
+            ],
+        }
+
+
+def print_report(report):
+    """打印调度结果"""
+    print("\n批量推理调度结果：")
+    if report["wall_time"] is not None:
+        print(f"总耗时: {report['wall_time']:.1f} 秒")
+    for model_id, stats in report["models"].items():
+        print(f"\n模型: {model_id}")
+        print(f"  任务: {stats['jobs']} (成功 {stats['succeeded']}, 失败 {stats['failed']}, "
+              f"重新提交 {stats['resubmits']} 次)")
+        print(f"  记录数: {stats['records']}, 吞吐量: {stats['records_per_hour']:.0f} records/hour")
+    for job in report["failed_jobs"]:
+        print(f"[-] {job['name']} {job['status']}: {job['message']} ({job['input']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bedrock 批量推理多任务调度")
+    parser.add_argument("--input-prefix", default="s3://input-bucket/input/", help="输入分片的 S3 前缀")
+    parser.add_argument("--output", default=OUTPUT_S3_URI, help="输出 S3 前缀")
+    parser.add_argument("--model-id", default=MODEL_ID)
+    parser.add_argument("--records", type=int, default=10000, help="示例工作负载的记录数")
+    parser.add_argument("--records-per-shard", type=int, default=1000)
+    parser.add_argument("--max-concurrent-jobs", type=int, default=DEFAULT_MAX_CONCURRENT_JOBS)
+    parser.add_argument("--stub", action="store_true", help="使用本地模拟客户端，输入分片写入本地目录")
+    args = parser.parse_args()
+
+    if args.stub:
+        from bedrock_batch_stub import StubBedrockBatchClient
+        bedrock = StubBedrockBatchClient(job_duration=2, max_concurrent_jobs=args.max_concurrent_jobs,
+                                         failure_rate=0.1, seed=0)
+        scheduler = BatchJobScheduler(bedrock, max_concurrent_jobs=args.max_concurrent_jobs + 2,
+                                      poll_interval=0.5, max_poll_interval=2)
+        input_prefix = "batch-input-stub"
+    else:
+        scheduler = BatchJobScheduler(max_concurrent_jobs=args.max_concurrent_jobs)
+        input_prefix = args.input_prefix
+
+    prompts = (f"请用一句话介绍编号 {i} 的城市" for i in range(args.records))
+    scheduler.add_workload(prompts, input_prefix, model_id=args.model_id, output_s3_uri=args.output,
+                           records_per_shard=args.records_per_shard)
+    print_report(scheduler.run())
+
+
+if __name__ == "__main__":
+    main()
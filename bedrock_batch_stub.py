@@ -0,0 +1,108 @@
+"""
+文件名: bedrock_batch_stub.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+本地模拟的 Bedrock 控制面客户端，实现批量推理相关的
+create_model_invocation_job / get_model_invocation_job / stop_model_invocation_job，
+用于离线调试批量任务调度逻辑。
+
+功能：
+    - 任务按 Submitted -> InProgress -> Completed 推进，耗时可配置
+    - 超过并发任务配额时抛出 ServiceQuotaExceededException
+    - 可按概率或指定任务名让任务失败，用于验证重新提交逻辑
+"""
+
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+ACTIVE_STATUSES = ("Submitted", "Validating", "Scheduled", "InProgress")
+
+
+class StubBedrockBatchClient:
+    """
+    模拟 bedrock 控制面的批量推理接口
+
+    Args:
+        job_duration: 每个任务从提交到完成的耗时（秒）
+        max_concurrent_jobs: 并发任务配额
+        failure_rate: 任务失败概率
+        fail_job_names: 必定失败的任务名集合
+        throttle_rate: 每次 API 调用返回 ThrottlingException 的概率
+    """
+
+    def __init__(self, job_duration=2.0, max_concurrent_jobs=10, failure_rate=0.0,
+                 fail_job_names=None, seed=None, throttle_rate=0.0):
+        self.job_duration = job_duration
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.failure_rate = failure_rate
+        self.fail_job_names = set(fail_job_names or ())
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def _status(self, job):
+        if job["status"] not in ACTIVE_STATUSES:
+            return job["status"]
+        elapsed = time.time() - job["_started"]
+        if elapsed >= self.job_duration:
+            job["status"] = "Failed" if job["_fail"] else "Completed"
+            job["endTime"] = datetime.now(timezone.utc)
+            if job["_fail"]:
+                job["message"] = "模拟任务失败"
+        elif elapsed >= self.job_duration / 4:
+            job["status"] = "InProgress"
+        return job["status"]
+
+    def _maybe_throttle(self, operation):
+        """调用方持有锁"""
+        if self.throttle_rate and self.random.random() < self.throttle_rate:
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, operation)
+
+    def create_model_invocation_job(self, jobName, roleArn, modelId, inputDataConfig,
+                                    outputDataConfig, **kwargs):
+        with self.lock:
+            self._maybe_throttle("CreateModelInvocationJob")
+            active = sum(1 for job in self.jobs.values() if self._status(job) in ACTIVE_STATUSES)
+            if active >= self.max_concurrent_jobs:
+                raise ClientError(
+                    {"Error": {"Code": "ServiceQuotaExceededException",
+                               "Message": "超过并发批量推理任务配额"}},
+                    "CreateModelInvocationJob",
+                )
+            job_arn = f"arn:aws:bedrock:us-east-1:123456789012:model-invocation-job/{uuid.uuid4().hex[:12]}"
+            self.jobs[job_arn] = {
+                "jobArn": job_arn,
+                "jobName": jobName,
+                "modelId": modelId,
+                "roleArn": roleArn,
+                "inputDataConfig": inputDataConfig,
+                "outputDataConfig": outputDataConfig,
+                "status": "Submitted",
+                "submitTime": datetime.now(timezone.utc),
+                "_started": time.time(),
+                "_fail": jobName in self.fail_job_names or self.random.random() < self.failure_rate,
+            }
+            return {"jobArn": job_arn}
+
+    def get_model_invocation_job(self, jobIdentifier):
+        with self.lock:
+            self._maybe_throttle("GetModelInvocationJob")
+            job = self.jobs[jobIdentifier]
+            self._status(job)
+            return {k: v for k, v in job.items() if not k.startswith("_")}
+
+    def stop_model_invocation_job(self, jobIdentifier):
+        with self.lock:
+            job = self.jobs[jobIdentifier]
+            if self._status(job) in ACTIVE_STATUSES:
+                job["status"] = "Stopped"
+                job["endTime"] = datetime.now(timezone.utc)
+            return {}
@@ -0,0 +1,168 @@
+"""
+文件名: bedrock_dispatcher.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+离线工作负载调度：根据请求数量、预估 tokens 和截止时间，自动选择按需并发调用（invoke_model）
+或批量推理任务（bedrock_batch.py），批量推理价格更低，也不会占用交互流量的按需 TPM 配额。
+
+决策规则：
+    1. 请求数少于批量推理的最小记录数 -> 按需
+    2. 截止时间晚于批量任务的预期完成时间 -> 批量
+    3. 按需调用在分配的 TPM / RPM 预算内能在截止时间前完成 -> 按需
+    4. 两者都无法满足 -> 按需（尽快完成），并给出提示
+
+按需调用用令牌桶把请求速率限制在 TPM / RPM 预算内，不会挤占交互流量的配额。
+
+使用示例：
+    result = dispatch(prompts, deadline_seconds=6 * 3600, model_id="anthropic.claude-3-haiku-20240307-v1:0",
+                      input_s3_prefix="s3://input-bucket/input/")
+"""
+
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+from bedrock_batch import OUTPUT_S3_URI
+from bedrock_batch_input import DEFAULT_MAX_TOKENS, iter_records
+from bedrock_batch_scheduler import BatchJobScheduler
+
+ON_DEMAND = "on_demand"
+BATCH = "batch"
+
+BATCH_MIN_RECORDS = 100
+DEFAULT_BATCH_TURNAROUND = 24 * 3600   # 批量任务通常在 24 小时内完成
+DEFAULT_TPM_BUDGET = 100000            # 分配给离线任务的按需 tokens/分钟（其余留给交互流量）
+DEFAULT_RPM_BUDGET = 200
+DEFAULT_CONCURRENCY = 16
+CHARS_PER_TOKEN = 3
+
+Decision = namedtuple("Decision", ["mode", "reason", "requests", "estimated_tokens", "on_demand_seconds"])
+
+
+def estimate_tokens(record, max_tokens=DEFAULT_MAX_TOKENS):
+    """粗略估算单条记录的 tokens（输入按字符数折算 + 最大输出）"""
+    model_input = record["modelInput"]
+    return len(json.dumps(model_input, ensure_ascii=False)) // CHARS_PER_TOKEN + max_tokens
+
+
+def choose_mode(records, deadline_seconds, max_tokens=DEFAULT_MAX_TOKENS,
+                batch_turnaround=DEFAULT_BATCH_TURNAROUND, tpm_budget=DEFAULT_TPM_BUDGET,
+                rpm_budget=DEFAULT_RPM_BUDGET):
+    """根据请求量、预估 tokens 和截止时间选择执行方式"""
+    count = len(records)
+    tokens = sum(estimate_tokens(record, max_tokens) for record in records)
+    on_demand_seconds = max(tokens / tpm_budget, count / rpm_budget) * 60
+
+    def decision(mode, reason):
+        return Decision(mode, reason, count, tokens, on_demand_seconds)
+
+    if count < BATCH_MIN_RECORDS:
+        return decision(ON_DEMAND, f"请求数 {count} 少于批量推理最小记录数 {BATCH_MIN_RECORDS}")
+    if deadline_seconds >= batch_turnaround:
+        return decision(BATCH, f"截止时间 {deadline_seconds / 3600:.1f} 小时，可等待批量任务完成")
+    if on_demand_seconds <= deadline_seconds:
+        return decision(ON_DEMAND, f"按需调用预计 {on_demand_seconds / 60:.1f} 分钟完成，早于截止时间")
+    return decision(ON_DEMAND, f"按需调用预计 {on_demand_seconds / 60:.1f} 分钟，批量任务也无法在截止时间前完成，"
+                               f"尽快执行")
+
+
+class TokenBucket:
+    """
+    令牌桶（线程安全）
+
+    reserve() 在锁内预占令牌并返回需要等待的秒数，等待在锁外进行，不阻塞其他线程预占
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+def run_on_demand(records, model_id, runtime_client=None, concurrency=DEFAULT_CONCURRENCY,
+                  tpm_budget=DEFAULT_TPM_BUDGET, rpm_budget=DEFAULT_RPM_BUDGET, max_tokens=DEFAULT_MAX_TOKENS):
+    """
+    并发调用 invoke_model，结果格式与批量推理输出一致
+
+    每个请求发出前按预估 tokens 从 TPM / RPM 两个令牌桶预占额度，整体速率不超过 choose_mode 使用的预算
+
+    Returns:
+        list: [{"recordId": ..., "modelOutput": {...}}] 或 [{"recordId": ..., "error": "..."}]，顺序与输入一致
+    """
+    # 连接池与并发线程数一致，避免线程排队等待连接
+    runtime_client = runtime_client or boto3.client(
+        service_name="bedrock-runtime",
+        config=Config(max_pool_connections=concurrency, retries={"mode": "adaptive"}),
+    )
+    request_bucket = TokenBucket(rpm_budget / 60)
+    token_bucket = TokenBucket(tpm_budget / 60)
+
+    def invoke(record):
+        delay = max(request_bucket.reserve(), token_bucket.reserve(estimate_tokens(record, max_tokens)))
+        if delay:
+            time.sleep(delay)
+        try:
+            response = runtime_client.invoke_model(
+                body=json.dumps(record["modelInput"]),
+                modelId=model_id,
+                contentType="application/json",
+                accept="application/json",
+            )
+            return {"recordId": record["recordId"], "modelOutput": json.loads(response["body"].read())}
+        except Exception as e:
+            return {"recordId": record["recordId"], "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(invoke, records))
+
+
+def dispatch(requests, deadline_seconds, model_id, input_s3_prefix=None, output_s3_uri=OUTPUT_S3_URI,
+             runtime_client=None, bedrock=None, scheduler=None, concurrency=DEFAULT_CONCURRENCY,
+             max_tokens=DEFAULT_MAX_TOKENS, **decision_kwargs):
+    """
+    自动选择按需或批量方式执行一组请求
+
+    Args:
+        requests: prompt 列表（元素格式同 bedrock_batch_input.iter_records）
+        deadline_seconds: 距截止时间的秒数
+        model_id: 模型 ID
+        input_s3_prefix: 批量模式下输入分片的 S3 前缀
+        output_s3_uri: 批量模式下的输出 S3 前缀
+        runtime_client / bedrock / scheduler: 可注入的客户端，便于离线调试
+        decision_kwargs: 透传给 choose_mode（batch_turnaround, tpm_budget, rpm_budget）
+
+    Returns:
+        dict: {"decision": Decision, "results": [...]}（按需）或 {"decision": Decision, "report": {...}}（批量）
+    """
+    records = list(iter_records(requests, model_id, max_tokens=max_tokens))
+    decision = choose_mode(records, deadline_seconds, max_tokens=max_tokens, **decision_kwargs)
+    print(f"[*] 执行方式: {decision.mode}（{decision.reason}）")
+
+    if decision.mode == ON_DEMAND:
+        budgets = {key: decision_kwargs[key] for key in ("tpm_budget", "rpm_budget") if key in decision_kwargs}
+        return {"decision": decision,
+                "results": run_on_demand(records, model_id, runtime_client, concurrency,
+                                         max_tokens=max_tokens, **budgets)}
+
+    if input_s3_prefix is None:
+        raise ValueError("批量模式需要 input_s3_prefix")
+    scheduler = scheduler or BatchJobScheduler(bedrock)
+    scheduler.add_workload(records, input_s3_prefix, model_id=model_id, output_s3_uri=output_s3_uri)
+    return {"decision": decision, "report": scheduler.run(), "output_s3_uri": output_s3_uri}
@@ -0,0 +1,81 @@
+"""
+语义缓存查找延迟基准测试
+
+用随机向量预热 SemanticCache 到指定条目数（不调用 Nova MME），
+分别测量暴力检索和 IVF 近似检索的查找延迟与命中率。
+
+运行:
+    python benchmark_semantic_cache.py
+    python benchmark_semantic_cache.py --sizes 10000 100000 1000000 --dimension 256
+"""
+import argparse
+import time
+
+import numpy as np
+
+from nova_semantic_cache import SemanticCache
+
+
+def percentile_ms(latencies, p):
+    return float(np.percentile(latencies, p)) * 1000
+
+
+def run_benchmark(size, dimension, queries, ann, nprobe, seed=0):
+    """预热 size 个条目后测量 queries 次查找"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((size, dimension), dtype=np.float32)
+
+    cache = SemanticCache(
+        embed_fn=lambda text: None,
+        threshold=0.9,
+        capacity=size,
+        dimension=dimension,
+        ann_threshold=1 if ann else size + 1,
+        nprobe=nprobe,
+    )
+    start = time.perf_counter()
+    cache.warm(range(size), range(size), vectors)
+    build_time = time.perf_counter() - start
+
+    # 查询为已缓存向量加少量噪声，模拟近似重复的提问
+    targets = rng.integers(0, size, queries)
+    noisy = vectors[targets] + 0.05 * rng.standard_normal((queries, dimension), dtype=np.float32)
+
+    latencies = []
+    hits = 0
+    for target, query in zip(targets, noisy):
+        start = time.perf_counter()
+        response, _, _ = cache.lookup(None, vector=query)
+        latencies.append(time.perf_counter() - start)
+        hits += response == target
+
+    return {
+        "size": size,
+        "index": "ivf" if ann else "brute-force",
+        "build_s": build_time,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p99_ms": percentile_ms(latencies, 99),
+        "recall": hits / queries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="语义缓存查找延迟基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dimension", type=int, default=256, help="嵌入维度 (256/384/1024/3072)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"维度: {args.dimension}, 每组查询: {args.queries}\n")
+    print(f"{'条目数':>10} | {'索引':<12} | {'构建(s)':>8} | {'p50(ms)':>8} | {'p99(ms)':>8} | {'召回率':>6}")
+    print("-" * 70)
+    for size in args.sizes:
+        for ann in (False, True):
+            r = run_benchmark(size, args.dimension, args.queries, ann, args.nprobe)
+            print(f"{r['size']:>10} | {r['index']:<12} | {r['build_s']:>8.2f} | "
+                  f"{r['p50_ms']:>8.3f} | {r['p99_ms']:>8.3f} | {r['recall']:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Nova Multimodal Embeddings 批量嵌入流水线
+
+流式读取文档 -> 切块 -> 在有界并发窗口内并发调用嵌入 -> 写入 float32 .npy 向量文件 + id 对照文件
+
+- 文档以生成器方式读取，内存占用与语料大小无关
+- 在途请求数不超过 max_in_flight，限流时指数退避（带抖动）重试
+- 重试只在应用层进行（客户端关闭 botocore 重试，避免两层重试叠加），重试次数计入统计
+- 向量按完成顺序追加写入 vectors.npy，第 i 行对应 ids.jsonl 的第 i 行
+
+运行:
+    python nova_embedding_pipeline.py corpus.jsonl output/ --max-in-flight 32
+    （corpus.jsonl 每行 {"id": ..., "text": ...}；也可以传入 .txt 文件所在目录）
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from botocore.exceptions import ClientError
+
+from nova_embeddings import (
+    DEFAULT_DIMENSION,
+    MODEL_ID,
+    NpyAppender,
+    build_text_request,
+    get_client,
+    invoke_embedding,
+)
+
+
+DEFAULT_CHUNK_CHARS = 2000
+DEFAULT_OVERLAP_CHARS = 200
+DEFAULT_MAX_IN_FLIGHT = 32
+DEFAULT_MAX_RETRIES = 8
+RETRYABLE_ERRORS = ("ThrottlingException", "ServiceUnavailableException", "ModelNotReadyException",
+                    "TooManyRequestsException")
+
+
+# ============================================================
+# 文档读取与切块
+# ============================================================
+def iter_documents(source):
+    """从 JSONL 文件或 .txt 目录流式读取 (doc_id, text)"""
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if name.endswith(".txt"):
+                    path = os.path.join(root, name)
+                    with open(path, encoding="utf-8") as f:
+                        yield os.path.relpath(path, source), f.read()
+        return
+
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["id"], record["text"]
+
+
+def chunk_text(text, chunk_chars=DEFAULT_CHUNK_CHARS, overlap_chars=DEFAULT_OVERLAP_CHARS):
+    """按字符数切块，相邻块重叠 overlap_chars 个字符，产出 (起始位置, 文本)"""
+    step = max(chunk_chars - overlap_chars, 1)
+    for start in range(0, max(len(text) - overlap_chars, 1), step):
+        yield start, text[start:start + chunk_chars]
+
+
+def iter_chunks(documents, chunk_chars=DEFAULT_CHUNK_CHARS, overlap_chars=DEFAULT_OVERLAP_CHARS):
+    """产出 ({"id", "chunk", "start"}, 文本)"""
+    for doc_id, text in documents:
+        for i, (start, chunk) in enumerate(chunk_text(text, chunk_chars, overlap_chars)):
+            if chunk.strip():
+                yield {"id": doc_id, "chunk": i, "start": start}, chunk
+
+
+# ============================================================
+# 嵌入调用
+# ============================================================
+def is_retryable(error):
+    return isinstance(error, ClientError) and error.response["Error"]["Code"] in RETRYABLE_ERRORS
+
+
+def call_with_retry(func, max_retries=DEFAULT_MAX_RETRIES, base_delay=0.5, max_delay=20, on_retry=None, **kwargs):
+    """
+    调用 func(**kwargs)，可重试错误按带抖动的指数退避重试
+
+    客户端应使用 get_client(max_attempts=1) 关闭 botocore 自身的重试，否则每次调用会在 botocore 内部
+    再重试多次；on_retry(error) 在每次重试前调用，用于统计
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return func(**kwargs)
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            if on_retry is not None:
+                on_retry(e)
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+
+def embed_with_retry(client, request_body, model_id=MODEL_ID, max_retries=DEFAULT_MAX_RETRIES,
+                     base_delay=0.5, max_delay=20, on_retry=None):
+    """调用嵌入接口，限流时按带抖动的指数退避重试"""
+    return call_with_retry(invoke_embedding, max_retries, base_delay, max_delay, on_retry,
+                           client=client, request_body=request_body, model_id=model_id)
+
+
+class EmbeddingPipeline:
+    """
+    有界并发的嵌入流水线
+
+    Args:
+        output_dir: 输出目录，写入 vectors.npy / ids.jsonl / failures.jsonl
+        client: bedrock-runtime 客户端（默认使用关闭 botocore 重试、连接池与并发数一致的共享客户端）
+        dimension: 嵌入维度
+        max_in_flight: 最大在途请求数
+    """
+
+    def __init__(self, output_dir, client=None, dimension=DEFAULT_DIMENSION,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT, purpose="GENERIC_INDEX", model_id=MODEL_ID):
+        self.output_dir = output_dir
+        self.client = client or get_client(max_pool_connections=max_in_flight, max_attempts=1)
+        self.dimension = dimension
+        self.max_in_flight = max_in_flight
+        self.purpose = purpose
+        self.model_id = model_id
+        self.stats = {"chunks": 0, "failed": 0, "retries": 0, "seconds": 0.0}
+        self.stats_lock = threading.Lock()
+
+    def _count_retry(self, error):
+        with self.stats_lock:
+            self.stats["retries"] += 1
+
+    def _embed(self, text):
+        request = build_text_request(text, self.dimension, self.purpose)
+        return embed_with_retry(self.client, request, self.model_id, on_retry=self._count_retry)[0]["embedding"]
+
+    def run(self, chunks):
+        """
+        处理 (元数据, 文本) 流，返回统计信息
+
+        提交新请求前先等待至少一个在途请求完成，保证在途数量和内存占用有上界
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        start_time = time.time()
+
+        with NpyAppender(os.path.join(self.output_dir, "vectors.npy"), self.dimension) as vectors, \
+                open(os.path.join(self.output_dir, "ids.jsonl"), "w", encoding="utf-8") as ids, \
+                open(os.path.join(self.output_dir, "failures.jsonl"), "w", encoding="utf-8") as failures, \
+                ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+
+            in_flight = {}
+
+            def drain():
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    meta = in_flight.pop(future)
+                    try:
+                        vectors.append(future.result())
+                        ids.write(json.dumps(meta, ensure_ascii=False) + "\n")
+                        self.stats["chunks"] += 1
+                    except Exception as e:
+                        failures.write(json.dumps(dict(meta, error=str(e)), ensure_ascii=False) + "\n")
+                        self.stats["failed"] += 1
+
+            for meta, text in chunks:
+                if len(in_flight) >= self.max_in_flight:
+                    drain()
+                in_flight[executor.submit(self._embed, text)] = meta
+
+            while in_flight:
+                drain()
+
+        self.stats["seconds"] = time.time() - start_time
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nova MME 批量嵌入流水线")
+    parser.add_argument("source", help="JSONL 文件（每行 {id, text}）或 .txt 文件目录")
+    parser.add_argument("output_dir")
+    parser.add_argument("--dimension", type=int, default=DEFAULT_DIMENSION)
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS)
+    parser.add_argument("--overlap-chars", type=int, default=DEFAULT_OVERLAP_CHARS)
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    pipeline = EmbeddingPipeline(args.output_dir, dimension=args.dimension, max_in_flight=args.max_in_flight)
+    chunks = iter_chunks(iter_documents(args.source), args.chunk_chars, args.overlap_chars)
+    stats = pipeline.run(chunks)
+
+    rate = stats["chunks"] / stats["seconds"] if stats["seconds"] else 0
+    print(f"\n✅ 完成: {stats['chunks']} 个分块, 失败 {stats['failed']} 个, 重试 {stats['retries']} 次, "
+          f"耗时 {stats['seconds']:.1f} 秒 ({rate:.1f} 块/秒)")
+    print(f"   向量: {os.path.join(args.output_dir, 'vectors.npy')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Amazon Nova Multimodal Embeddings (MME) 公共工具模块
+提供请求构建、单次嵌入调用和响应解析
+"""
+import base64
+import json
+import os
+import threading
+
+import boto3
+import numpy as np
+from botocore.config import Config
+
+
+# ============================================================
+# 默认配置
+# ============================================================
+MODEL_ID = "amazon.nova-embedding-v1:0"
+REGION = "us-east-1"  # Nova MME 目前仅在 us-east-1 可用
+DEFAULT_DIMENSION = 1024
+SUPPORTED_DIMENSIONS = (256, 384, 1024, 3072)
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_MAX_ATTEMPTS = 5
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(region_name=REGION, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+               max_attempts=DEFAULT_MAX_ATTEMPTS, endpoint_url=None):
+    """
+    获取（并缓存）Nova MME 使用的 bedrock-runtime 客户端
+
+    Args:
+        region_name: 区域，默认 us-east-1
+        max_pool_connections: 连接池大小，应不小于并发请求数
+        max_attempts: botocore 总尝试次数（含首次调用），1 表示由调用方自行重试
+        endpoint_url: 自定义 endpoint，默认读取环境变量 BEDROCK_ENDPOINT_URL
+    """
+    endpoint_url = endpoint_url or os.environ.get("BEDROCK_ENDPOINT_URL")
+    key = (region_name, max_pool_connections, max_attempts, endpoint_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = boto3.client(
+                "bedrock-runtime",
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                config=Config(
+                    max_pool_connections=max_pool_connections,
+                    tcp_keepalive=True,
+                    retries={"mode": "adaptive", "total_max_attempts": max_attempts},
+                ),
+            )
+        return client
+
+
+# ============================================================
+# 请求与响应
+# ============================================================
+def build_text_request(text, dimension=DEFAULT_DIMENSION, purpose="GENERIC_INDEX", truncation_mode="END"):
+    """构建文本 SINGLE_EMBEDDING 请求"""
+    return {
+        "taskType": "SINGLE_EMBEDDING",
+        "singleEmbeddingParams": {
+            "embeddingPurpose": purpose,
+            "embeddingDimension": dimension,
+            "text": {
+                "truncationMode": truncation_mode,
+                "value": text
+            },
+        },
+    }
+
+
+def build_media_request(media_type, source, format, dimension=DEFAULT_DIMENSION, purpose="GENERIC_INDEX",
+                        embedding_mode="AUDIO_VIDEO_COMBINED"):
+    """
+    构建图片 / 音频 / 视频 SINGLE_EMBEDDING 请求
+
+    Args:
+        media_type: image / audio / video
+        source: 媒体字节（请求中做 base64 编码）或 s3:// URI
+        format: 媒体格式，如 png / wav / mp4
+        embedding_mode: 仅视频使用
+    """
+    if isinstance(source, str) and source.startswith("s3://"):
+        media_source = {"s3Location": {"uri": source}}
+    else:
+        media_source = {"bytes": base64.b64encode(source).decode("ascii")}
+    media = {"format": format, "source": media_source}
+    if media_type == "video":
+        media["embeddingMode"] = embedding_mode
+    return {
+        "taskType": "SINGLE_EMBEDDING",
+        "singleEmbeddingParams": {
+            "embeddingPurpose": purpose,
+            "embeddingDimension": dimension,
+            media_type: media,
+        },
+    }
+
+
+def invoke_embedding(client, request_body, model_id=MODEL_ID):
+    """调用模型并返回响应中的 embeddings 列表"""
+    response = client.invoke_model(
+        body=json.dumps(request_body),
+        modelId=model_id,
+        accept="application/json",
+        contentType="application/json",
+    )
+    return json.loads(response.get("body").read())["embeddings"]
+
+
+def embed_text(text, client=None, dimension=DEFAULT_DIMENSION, purpose="GENERIC_INDEX", model_id=MODEL_ID):
+    """嵌入一段文本，返回 float32 向量"""
+    client = client or get_client()
+    embeddings = invoke_embedding(client, build_text_request(text, dimension, purpose), model_id)
+    return np.asarray(embeddings[0]["embedding"], dtype=np.float32)
+
+
+def normalize(vectors):
+    """L2 归一化（支持单个向量或矩阵），归一化后内积即余弦相似度"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+# ============================================================
+# 向量文件
+# ============================================================
+NPY_HEADER_SIZE = 128
+
+
+class NpyAppender:
+    """
+    以追加方式写 float32 .npy 文件，写入过程中不需要知道总行数
+
+    头部预留固定长度，flush() / close() 时回填实际行数，
+    结果是标准 .npy 文件，可用 np.load(path, mmap_mode="r") 按内存映射读取
+
+    resume=True 时若文件已存在则从头部记录的行数之后继续追加（只支持本类写出的文件）；
+    写入行后、回填头部前中断留下的未计数数据会被截掉
+    """
+
+    def __init__(self, path, dimension, dtype=np.float32, resume=False):
+        self.path = path
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        if resume and os.path.exists(path):
+            self.file = open(path, "r+b")
+            self._read_header()
+            # 头部行数之后的数据未被计数（可能只写了半行），截掉后从该位置继续写，保证行对齐
+            end = NPY_HEADER_SIZE + self.rows * self.dimension * self.dtype.itemsize
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file = open(path, "wb")
+            self._write_header()
+
+    def _read_header(self):
+        if np.lib.format.read_magic(self.file) != (1, 0):
+            raise ValueError(f"{self.path} 不是 NpyAppender 写出的文件")
+        shape, _, dtype = np.lib.format.read_array_header_1_0(self.file)
+        if self.file.tell() != NPY_HEADER_SIZE or len(shape) != 2:
+            raise ValueError(f"{self.path} 不是 NpyAppender 写出的文件")
+        if shape[1] != self.dimension or dtype != self.dtype:
+            raise ValueError(f"{self.path} 的维度/类型为 {shape[1]}/{dtype}，"
+                             f"与 {self.dimension}/{self.dtype} 不一致")
+        self.rows = shape[0]
+
+    def _write_header(self):
+        header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d, %d), }" % (
+            self.dtype.str, self.rows, self.dimension)
+        header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + "\n"
+        self.file.seek(0)
+        self.file.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1"))
+
+    def append(self, vectors):
+        """追加一行或多行向量，返回第一行的行号"""
+        vectors = np.asarray(vectors, dtype=self.dtype).reshape(-1, self.dimension)
+        first = self.rows
+        self.file.seek(0, 2)
+        self.file.write(vectors.tobytes())
+        self.rows += len(vectors)
+        return first
+
+    def flush(self):
+        """回填当前行数并刷盘，之后可以按内存映射读取已写入的部分"""
+        self._write_header()
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self._write_header()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
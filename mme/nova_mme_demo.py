@@ -4,15 +4,15 @@ Amazon Nova Multimodal Embeddings (MME) 基础演示
 """
 
 import json
-import boto3
+
+from nova_embeddings import get_client
 
 
 def main():
     """最基本的 Nova MME 使用示例"""
     
     # 1. 创建 Bedrock Runtime 客户端
-    bedrock_runtime = boto3.client(
-        service_name="bedrock-runtime",
+    bedrock_runtime = get_client(
         region_name="us-east-1",  # Nova MME 目前仅在 us-east-1 可用
     )
     
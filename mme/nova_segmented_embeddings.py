@@ -0,0 +1,279 @@
+"""
+Nova Multimodal Embeddings 长输入分段嵌入
+
+SINGLE_EMBEDDING 配合 truncationMode=END 会丢掉长输入的尾部，这里先分段再嵌入：
+
+- 长文本: 按字符切成重叠的段，并发调用 SINGLE_EMBEDDING
+- WAV 音频: 从磁盘按帧流式读取，切成重叠的短片段，每次只对当前片段做 base64 编码
+- 其他音视频: 用 upload_file 流式上传到 S3，调用异步 SEGMENTED_EMBEDDING 由服务端分段，
+  完成后从输出前缀读取各段向量
+- pool() 把各段向量按长度加权平均为一个文档级向量
+
+运行:
+    python nova_segmented_embeddings.py long.txt
+    python nova_segmented_embeddings.py meeting.wav --segment-seconds 20
+    python nova_segmented_embeddings.py demo.mp4 --s3-prefix s3://my-bucket/nova-mme/
+"""
+import argparse
+import io
+import json
+import os
+import time
+import uuid
+import wave
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import numpy as np
+
+from nova_embedding_pipeline import (
+    DEFAULT_CHUNK_CHARS,
+    DEFAULT_OVERLAP_CHARS,
+    call_with_retry,
+    chunk_text,
+    embed_with_retry,
+)
+from nova_embeddings import (
+    DEFAULT_DIMENSION,
+    MODEL_ID,
+    REGION,
+    build_media_request,
+    build_text_request,
+    get_client,
+    normalize,
+)
+
+
+DEFAULT_SEGMENT_SECONDS = 30       # 同步接口单段音视频时长上限
+DEFAULT_OVERLAP_SECONDS = 2
+DEFAULT_MAX_WORKERS = 8
+ASYNC_POLL_INTERVAL = 10
+
+# start: 文本为字符位置，音视频为秒；length: 字符数或秒数
+Segment = namedtuple("Segment", ["index", "start", "length", "vector"])
+
+MEDIA_FORMATS = {
+    ".wav": ("audio", "wav"), ".mp3": ("audio", "mp3"), ".ogg": ("audio", "ogg"),
+    ".mp4": ("video", "mp4"), ".mov": ("video", "mov"), ".mkv": ("video", "mkv"),
+    ".webm": ("video", "webm"),
+}
+
+
+# ============================================================
+# 分段
+# ============================================================
+def iter_wav_segments(path, segment_seconds=DEFAULT_SEGMENT_SECONDS, overlap_seconds=DEFAULT_OVERLAP_SECONDS):
+    """
+    按时长切分 WAV 文件，产出 (起始秒, 时长秒, 片段 WAV 字节)
+
+    逐段从磁盘读取帧，内存中最多同时保留一个片段
+    """
+    with wave.open(path, "rb") as source:
+        params = source.getparams()
+        rate = params.framerate
+        segment_frames = int(segment_seconds * rate)
+        step_frames = max(int((segment_seconds - overlap_seconds) * rate), 1)
+
+        for start in range(0, max(params.nframes - int(overlap_seconds * rate), 1), step_frames):
+            source.setpos(start)
+            frames = source.readframes(min(segment_frames, params.nframes - start))
+            buffer = io.BytesIO()
+            with wave.open(buffer, "wb") as segment:
+                segment.setparams(params)
+                segment.writeframes(frames)
+            yield start / rate, len(frames) / (params.sampwidth * params.nchannels) / rate, buffer.getvalue()
+
+
+def pool(segments, weighted=True):
+    """把各段向量平均为文档级向量（默认按段长度加权），结果已归一化"""
+    if not segments:
+        return None
+    vectors = normalize([segment.vector for segment in segments])
+    weights = np.array([segment.length for segment in segments], dtype=np.float32) if weighted else None
+    return normalize(np.average(vectors, axis=0, weights=weights))
+
+
+# ============================================================
+# 分段嵌入
+# ============================================================
+class SegmentedEmbedder:
+    """
+    先分段再并发嵌入
+
+    Args:
+        client: bedrock-runtime 客户端（默认使用关闭 botocore 重试的共享客户端，重试由 call_with_retry 负责）
+        dimension: 嵌入维度
+        max_workers: 最大并发请求数
+        purpose: embeddingPurpose
+        s3_client: 异步分段嵌入上传媒体和读取结果使用的 S3 客户端
+    """
+
+    def __init__(self, client=None, dimension=DEFAULT_DIMENSION, max_workers=DEFAULT_MAX_WORKERS,
+                 purpose="GENERIC_INDEX", model_id=MODEL_ID, s3_client=None):
+        self.client = client or get_client(max_pool_connections=max_workers, max_attempts=1)
+        self.dimension = dimension
+        self.max_workers = max_workers
+        self.purpose = purpose
+        self.model_id = model_id
+        self.s3_client = s3_client
+
+    def _embed_segments(self, segments):
+        """
+        并发嵌入 (起始位置, 长度, 请求体) 流，按原顺序返回 Segment 列表
+
+        在途请求不超过 max_workers，分段生成器不会被一次性读完
+        """
+        def embed(request):
+            return np.asarray(embed_with_retry(self.client, request, self.model_id)[0]["embedding"],
+                              dtype=np.float32)
+
+        pending = deque()
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for start, length, request in segments:
+                if len(pending) >= self.max_workers:
+                    pending.popleft().result()
+                future = executor.submit(embed, request)
+                pending.append(future)
+                results.append((start, length, future))
+        return [Segment(i, start, length, future.result()) for i, (start, length, future) in enumerate(results)]
+
+    def embed_text(self, text, chunk_chars=DEFAULT_CHUNK_CHARS, overlap_chars=DEFAULT_OVERLAP_CHARS):
+        """长文本分段嵌入，返回 Segment 列表"""
+        return self._embed_segments(
+            (start, len(chunk), build_text_request(chunk, self.dimension, self.purpose, truncation_mode="NONE"))
+            for start, chunk in chunk_text(text, chunk_chars, overlap_chars)
+        )
+
+    def embed_wav(self, path, segment_seconds=DEFAULT_SEGMENT_SECONDS, overlap_seconds=DEFAULT_OVERLAP_SECONDS):
+        """WAV 音频分段嵌入，返回 Segment 列表"""
+        return self._embed_segments(
+            (start, duration, build_media_request("audio", data, "wav", self.dimension, self.purpose))
+            for start, duration, data in iter_wav_segments(path, segment_seconds, overlap_seconds)
+        )
+
+    # -------------------- 异步分段 --------------------
+    def _s3(self):
+        if self.s3_client is None:
+            self.s3_client = boto3.client("s3", region_name=REGION)
+        return self.s3_client
+
+    def upload(self, path, s3_prefix):
+        """流式上传本地文件（大文件自动分片上传），返回 s3:// URI"""
+        bucket, _, prefix = s3_prefix[len("s3://"):].partition("/")
+        key = f"{prefix.rstrip('/')}/input/{uuid.uuid4().hex}/{os.path.basename(path)}".lstrip("/")
+        self._s3().upload_file(path, bucket, key)
+        return f"s3://{bucket}/{key}"
+
+    def start_async(self, media_type, source_uri, format, output_uri, segment_seconds=DEFAULT_SEGMENT_SECONDS):
+        """提交 SEGMENTED_EMBEDDING 异步任务，返回 invocationArn"""
+        media = {
+            "format": format,
+            "source": {"s3Location": {"uri": source_uri}},
+            "segmentationConfig": {"durationSeconds": segment_seconds},
+        }
+        if media_type == "video":
+            media["embeddingMode"] = "AUDIO_VIDEO_COMBINED"
+        response = call_with_retry(
+            self.client.start_async_invoke,
+            modelId=self.model_id,
+            modelInput={
+                "taskType": "SEGMENTED_EMBEDDING",
+                "segmentedEmbeddingParams": {
+                    "embeddingPurpose": self.purpose,
+                    "embeddingDimension": self.dimension,
+                    media_type: media,
+                },
+            },
+            outputDataConfig={"s3OutputDataConfig": {"s3Uri": output_uri}},
+        )
+        return response["invocationArn"]
+
+    def wait_async(self, invocation_arn, poll_interval=ASYNC_POLL_INTERVAL, timeout=3600):
+        """轮询异步任务直到完成，返回结果所在的 S3 前缀"""
+        deadline = time.time() + timeout
+        while True:
+            job = call_with_retry(self.client.get_async_invoke, invocationArn=invocation_arn)
+            if job["status"] == "Completed":
+                return job["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"]
+            if job["status"] == "Failed":
+                raise RuntimeError(f"异步嵌入任务失败: {job.get('failureMessage')}")
+            if time.time() > deadline:
+                raise TimeoutError(f"异步嵌入任务超时: {invocation_arn}")
+            time.sleep(poll_interval)
+
+    def _iter_output_lines(self, output_uri):
+        """按键名顺序逐行读取 S3 输出前缀下所有 .jsonl 文件"""
+        s3 = self._s3()
+        bucket, _, prefix = output_uri[len("s3://"):].partition("/")
+        keys = []
+        for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+            keys.extend(obj["Key"] for obj in page.get("Contents", []) if obj["Key"].endswith(".jsonl"))
+        for key in sorted(keys):
+            body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+            try:
+                for line in body.iter_lines():
+                    if line.strip():
+                        yield line.decode("utf-8")
+            finally:
+                body.close()
+
+    def read_async_output(self, output_uri):
+        """读取异步任务输出前缀下所有 JSONL 中的分段向量，返回 Segment 列表"""
+        segments = []
+        for line in self._iter_output_lines(output_uri):
+            record = json.loads(line)
+            if "embedding" not in record:
+                continue
+            meta = record.get("segmentMetadata", {})
+            start = meta.get("segmentStartSeconds", meta.get("segmentStartCharPosition", 0))
+            end = meta.get("segmentEndSeconds", meta.get("segmentEndCharPosition", start))
+            segments.append((meta.get("segmentIndex", len(segments)), start, end - start,
+                             np.asarray(record["embedding"], dtype=np.float32)))
+        return [Segment(*segment) for segment in sorted(segments, key=lambda s: s[0])]
+
+    def embed_media(self, path, s3_prefix, segment_seconds=DEFAULT_SEGMENT_SECONDS, **wait_kwargs):
+        """上传本地音视频并用异步 SEGMENTED_EMBEDDING 分段嵌入，返回 Segment 列表"""
+        media_type, format = MEDIA_FORMATS[os.path.splitext(path)[1].lower()]
+        source_uri = self.upload(path, s3_prefix)
+        output_uri = source_uri.rsplit("/input/", 1)[0] + "/output/"
+        invocation_arn = self.start_async(media_type, source_uri, format, output_uri, segment_seconds)
+        return self.read_async_output(self.wait_async(invocation_arn, **wait_kwargs))
+
+    def embed_file(self, path, s3_prefix=None, segment_seconds=DEFAULT_SEGMENT_SECONDS, **kwargs):
+        """按扩展名选择分段方式：文本和 WAV 在本地分段，其他音视频走异步接口（需要 s3_prefix）"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in MEDIA_FORMATS:
+            with open(path, encoding="utf-8") as f:
+                return self.embed_text(f.read(), **kwargs)
+        if extension == ".wav" and not s3_prefix:
+            return self.embed_wav(path, segment_seconds, **kwargs)
+        if not s3_prefix:
+            raise ValueError(f"{extension} 文件需要通过 S3 异步分段嵌入，请提供 s3_prefix")
+        return self.embed_media(path, s3_prefix, segment_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nova MME 长输入分段嵌入")
+    parser.add_argument("path", help="文本文件或音视频文件")
+    parser.add_argument("--dimension", type=int, default=DEFAULT_DIMENSION)
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--segment-seconds", type=int, default=DEFAULT_SEGMENT_SECONDS)
+    parser.add_argument("--s3-prefix", help="异步分段嵌入使用的 S3 前缀，如 s3://my-bucket/nova-mme/")
+    args = parser.parse_args()
+
+    embedder = SegmentedEmbedder(dimension=args.dimension, max_workers=args.max_workers)
+    start_time = time.time()
+    segments = embedder.embed_file(args.path, args.s3_prefix, args.segment_seconds)
+    document_vector = pool(segments)
+
+    print(f"\n✅ {len(segments)} 个分段，耗时 {time.time() - start_time:.1f} 秒")
+    for segment in segments[:5]:
+        print(f"   #{segment.index}: start={segment.start:g} length={segment.length:g}")
+    if document_vector is not None:
+        print(f"   文档向量维度: {len(document_vector)}，前 5 个值: {np.round(document_vector[:5], 4).tolist()}")
+
+
+if __name__ == "__main__":
+    main()
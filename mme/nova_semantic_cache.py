@@ -0,0 +1,265 @@
+"""
+基于 Nova Multimodal Embeddings 的语义响应缓存
+
+对输入 prompt 做嵌入，在本地向量索引中查找最相似的已缓存 prompt，
+相似度超过阈值时直接返回缓存的回复，用于处理大量近似重复的用户提问。
+
+- 条目数较少时使用 NumPy 暴力检索（精确）
+- 超过 ann_threshold 后训练 IVF（k-means 粗量化）索引，只检索最近的 nprobe 个簇；
+  每个簇维护自己的槽位数组，检索开销只与被探查簇的大小有关
+- 每个条目有 TTL，容量满时按最近最少使用淘汰
+
+使用示例:
+    cache = SemanticCache(threshold=0.9)
+    answer = cache.get_or_compute(prompt, lambda p: call_model(p))
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from nova_embeddings import DEFAULT_DIMENSION, embed_text, get_client, normalize
+
+
+DEFAULT_CAPACITY = 100000
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_TTL = 24 * 3600
+DEFAULT_ANN_THRESHOLD = 50000
+DEFAULT_NPROBE = 8
+KMEANS_SAMPLE = 50000
+KMEANS_ITERATIONS = 10
+
+
+# ============================================================
+# 向量索引
+# ============================================================
+def kmeans(vectors, n_clusters, iterations=KMEANS_ITERATIONS, seed=0):
+    """球面 k-means（向量已归一化，按内积分配）"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        # 按簇排序后用 reduceat 一次性求各簇向量和，空簇保留原质心
+        order = np.argsort(assign, kind="stable")
+        clusters, starts = np.unique(assign[order], return_index=True)
+        centroids[clusters] = np.add.reduceat(vectors[order], starts, axis=0)
+        centroids = normalize(centroids)
+    return centroids
+
+
+class SemanticIndex:
+    """
+    固定容量的余弦相似度索引，支持增删
+
+    训练 IVF 后，每个簇的槽位保存在 cluster_slots[c][:cluster_sizes[c]]，
+    position[slot] 为槽位在所属簇数组中的下标，删除时与簇内最后一个槽位交换，O(1) 完成
+
+    Args:
+        dimension: 向量维度
+        capacity: 最大条目数（向量矩阵预先分配）
+        ann_threshold: 条目数超过该值后切换为 IVF 近似检索
+        nprobe: IVF 检索时探查的簇数
+    """
+
+    def __init__(self, dimension=DEFAULT_DIMENSION, capacity=DEFAULT_CAPACITY,
+                 ann_threshold=DEFAULT_ANN_THRESHOLD, nprobe=DEFAULT_NPROBE):
+        self.dimension = dimension
+        self.capacity = capacity
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.assign = np.full(capacity, -1, dtype=np.int32)
+        self.free = list(range(capacity - 1, -1, -1))
+        self.centroids = None
+        self.trained_size = 0
+        self.position = np.full(capacity, -1, dtype=np.int64)
+        self.cluster_slots = []
+        self.cluster_sizes = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return self.capacity - len(self.free)
+
+    def add(self, vector):
+        """添加向量，返回槽位号"""
+        slot = self.free.pop()
+        self.vectors[slot] = normalize(vector)
+        self.valid[slot] = True
+        if self.centroids is not None:
+            self._assign_clusters(np.array([slot]), np.array([np.argmax(self.centroids @ self.vectors[slot])]))
+        if len(self) >= self.ann_threshold and len(self) >= 2 * self.trained_size:
+            self.train()
+        return slot
+
+    def add_batch(self, vectors):
+        """批量添加向量（用于预热和压测），返回槽位数组"""
+        vectors = normalize(vectors)
+        slots = np.array([self.free.pop() for _ in range(len(vectors))], dtype=np.int64)
+        self.vectors[slots] = vectors
+        self.valid[slots] = True
+        if self.centroids is not None:
+            self._assign_clusters(slots, np.argmax(vectors @ self.centroids.T, axis=1))
+        if len(self) >= self.ann_threshold and len(self) >= 2 * self.trained_size:
+            self.train()
+        return slots
+
+    def remove(self, slot):
+        cluster = self.assign[slot]
+        if cluster >= 0:
+            members = self.cluster_slots[cluster]
+            last = self.cluster_sizes[cluster] - 1
+            moved = members[last]
+            members[self.position[slot]] = moved
+            self.position[moved] = self.position[slot]
+            self.cluster_sizes[cluster] = last
+            self.position[slot] = -1
+        self.valid[slot] = False
+        self.assign[slot] = -1
+        self.free.append(slot)
+
+    def _assign_clusters(self, slots, clusters):
+        """把槽位追加到对应簇的槽位数组末尾（数组容量不足时按 2 倍扩容）"""
+        self.assign[slots] = clusters
+        order = np.argsort(clusters, kind="stable")
+        unique, starts = np.unique(clusters[order], return_index=True)
+        for cluster, chunk in zip(unique, np.split(slots[order], starts[1:])):
+            size = self.cluster_sizes[cluster]
+            members = self.cluster_slots[cluster]
+            if size + len(chunk) > len(members):
+                members = np.resize(members, max(2 * len(members), size + len(chunk)))
+                self.cluster_slots[cluster] = members
+            members[size:size + len(chunk)] = chunk
+            self.position[chunk] = np.arange(size, size + len(chunk))
+            self.cluster_sizes[cluster] = size + len(chunk)
+
+    def train(self):
+        """在当前向量上训练 IVF 粗量化器并重新分配所有条目"""
+        slots = np.flatnonzero(self.valid)
+        rng = np.random.default_rng(0)
+        sample = slots if len(slots) <= KMEANS_SAMPLE else rng.choice(slots, KMEANS_SAMPLE, replace=False)
+        n_clusters = max(1, min(int(4 * np.sqrt(len(slots))), len(sample) // 4))
+        self.centroids = kmeans(self.vectors[sample], n_clusters)
+        self.cluster_slots = [np.zeros(0, dtype=np.int64) for _ in range(n_clusters)]
+        self.cluster_sizes = np.zeros(n_clusters, dtype=np.int64)
+        for start in range(0, len(slots), 65536):
+            chunk = slots[start:start + 65536]
+            self._assign_clusters(chunk, np.argmax(self.vectors[chunk] @ self.centroids.T, axis=1))
+        self.trained_size = len(slots)
+
+    def search(self, vector, k=1):
+        """返回 (槽位数组, 相似度数组)，按相似度降序"""
+        query = normalize(vector)
+        if self.centroids is None:
+            candidates = np.flatnonzero(self.valid)
+        else:
+            probes = np.argpartition(-(self.centroids @ query), min(self.nprobe, len(self.centroids)) - 1)
+            # 只拼接被探查簇的槽位数组，不扫描整个容量
+            candidates = np.concatenate([self.cluster_slots[c][:self.cluster_sizes[c]]
+                                         for c in probes[:self.nprobe]])
+        if len(candidates) == 0:
+            return candidates, np.zeros(0, dtype=np.float32)
+
+        scores = self.vectors[candidates] @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return candidates[top], scores[top]
+
+
+# ============================================================
+# 语义缓存
+# ============================================================
+class SemanticCache:
+    """
+    语义响应缓存
+
+    Args:
+        embed_fn: 文本 -> 向量的函数，默认调用 Nova MME
+        threshold: 命中所需的最小余弦相似度
+        capacity: 最大缓存条目数
+        ttl: 条目过期时间（秒）
+        dimension: 嵌入维度
+    """
+
+    def __init__(self, embed_fn=None, threshold=DEFAULT_THRESHOLD, capacity=DEFAULT_CAPACITY,
+                 ttl=DEFAULT_TTL, dimension=DEFAULT_DIMENSION, **index_kwargs):
+        if embed_fn is None:
+            client = get_client()
+            embed_fn = lambda text: embed_text(text, client=client, dimension=dimension)
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.index = SemanticIndex(dimension, capacity, **index_kwargs)
+        self.entries = OrderedDict()   # slot -> (prompt, response, created_at)，按最近使用排序
+        self.lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def _remove(self, slot):
+        del self.entries[slot]
+        self.index.remove(slot)
+
+    def lookup(self, prompt, vector=None):
+        """
+        查找语义相近的缓存回复
+
+        Returns:
+            (response, score, vector)，未命中时 response 为 None；vector 可在 put 时复用，避免重复嵌入
+        """
+        if vector is None:
+            vector = self.embed_fn(prompt)
+        with self.lock:
+            slots, scores = self.index.search(vector, k=1)
+            if len(slots) and scores[0] >= self.threshold:
+                slot = int(slots[0])
+                _, response, created_at = self.entries[slot]
+                if time.time() - created_at <= self.ttl:
+                    self.entries.move_to_end(slot)
+                    self.metrics["hits"] += 1
+                    return response, float(scores[0]), vector
+                self._remove(slot)
+                self.metrics["expired"] += 1
+            self.metrics["misses"] += 1
+            return None, float(scores[0]) if len(scores) else 0.0, vector
+
+    def put(self, prompt, response, vector=None):
+        if vector is None:
+            vector = self.embed_fn(prompt)
+        with self.lock:
+            if len(self.index) >= self.index.capacity:
+                self._evict()
+            slot = self.index.add(vector)
+            self.entries[slot] = (prompt, response, time.time())
+
+    def warm(self, prompts, responses, vectors):
+        """批量写入已嵌入的条目（用于预热和压测）"""
+        now = time.time()
+        with self.lock:
+            slots = self.index.add_batch(vectors)
+            for slot, prompt, response in zip(slots, prompts, responses):
+                self.entries[int(slot)] = (prompt, response, now)
+
+    def _evict(self):
+        """先清理过期条目，仍然满时淘汰最近最少使用的条目"""
+        now = time.time()
+        expired = [slot for slot, (_, _, created_at) in self.entries.items() if now - created_at > self.ttl]
+        for slot in expired:
+            self._remove(slot)
+        self.metrics["expired"] += len(expired)
+        if not expired:
+            slot = next(iter(self.entries))
+            self._remove(slot)
+            self.metrics["evictions"] += 1
+
+    def get_or_compute(self, prompt, compute_fn):
+        """命中则返回缓存回复，否则调用 compute_fn(prompt) 并写入缓存"""
+        response, _, vector = self.lookup(prompt)
+        if response is None:
+            response = compute_fn(prompt)
+            self.put(prompt, response, vector=vector)
+        return response
+
+    def stats(self):
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return dict(self.metrics, size=len(self.entries),
+                    hit_ratio=self.metrics["hits"] / lookups if lookups else 0)
@@ -0,0 +1,323 @@
+"""
+基于 Nova Multimodal Embeddings 的本地向量存储
+
+向量追加写入目录下的 .npy 文件，检索时按内存映射读取，适合几十万到几百万条的中等规模集合，
+不需要外部向量数据库。
+
+- 存储类型: float32 / float16 / int8（每行一个缩放系数的对称量化）
+- 降维变体: 额外保存截断到较小维度（如 256）并重新归一化的副本，
+  先在小维度上粗筛 k * rerank 个候选，再用完整向量精排
+- 元数据过滤: 等值 / 取值列表 / 自定义函数，只对满足条件的行计算相似度
+- 余弦 top-k: 分块矩阵乘 + argpartition
+
+目录结构:
+    store.json        维度、存储类型、降维变体
+    vectors.npy       完整维度向量
+    vectors-256.npy   降维变体（可选）
+    scales.npy        int8 量化缩放系数（仅 int8）
+    metadata.jsonl    第 i 行对应第 i 个向量
+
+运行:
+    python nova_vector_store.py import store/ output/vectors.npy output/ids.jsonl --dtype int8 --variants 256
+    python nova_vector_store.py query store/ "如何选择 Bedrock 还是 SageMaker" --k 5
+"""
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+
+from nova_embeddings import (
+    DEFAULT_DIMENSION,
+    NPY_HEADER_SIZE,
+    SUPPORTED_DIMENSIONS,
+    NpyAppender,
+    embed_text,
+    get_client,
+    normalize,
+)
+
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+SEARCH_BLOCK_ROWS = 8192
+DEFAULT_RERANK = 10
+
+
+# ============================================================
+# 量化与检索工具
+# ============================================================
+def reduce_dimension(vectors, dimension):
+    """截断到前 dimension 维并重新归一化（Nova MME 的小维度嵌入是大维度嵌入的前缀近似）"""
+    return normalize(np.asarray(vectors)[..., :dimension])
+
+
+def quantize_int8(vectors):
+    """逐行对称量化为 int8，返回 (量化矩阵, 缩放系数)，反量化为 q * scale"""
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def top_k(scores, k):
+    """返回分数最高的 k 个下标（按分数降序）"""
+    k = min(k, len(scores))
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _memmap(writer):
+    """只读映射 NpyAppender 已写入的行（空文件无法映射，返回空数组）"""
+    shape = (writer.rows, writer.dimension)
+    if writer.rows == 0:
+        return np.zeros(shape, dtype=writer.dtype)
+    return np.memmap(writer.path, dtype=writer.dtype, mode="r", shape=shape, offset=NPY_HEADER_SIZE)
+
+
+def _match(value, condition):
+    if callable(condition):
+        return condition(value)
+    if isinstance(condition, (list, tuple, set, frozenset)):
+        return value in condition
+    return value == condition
+
+
+# ============================================================
+# 向量存储
+# ============================================================
+class VectorStore:
+    """
+    追加写入、内存映射读取的本地向量存储
+
+    Args:
+        path: 存储目录（已存在时按 store.json 中的配置打开并继续追加）
+        dimension: 向量维度
+        dtype: 存储类型，float32 / float16 / int8
+        variants: 额外保存的降维变体维度，例如 (256,)
+    """
+
+    def __init__(self, path, dimension=DEFAULT_DIMENSION, dtype="float32", variants=()):
+        self.path = path
+        config_path = os.path.join(path, "store.json")
+        if os.path.exists(config_path):
+            with open(config_path, encoding="utf-8") as f:
+                config = json.load(f)
+            dimension, dtype, variants = config["dimension"], config["dtype"], config["variants"]
+        else:
+            if dtype not in STORAGE_DTYPES:
+                raise ValueError(f"不支持的存储类型: {dtype}，可选 {STORAGE_DTYPES}")
+            if any(d >= dimension or d not in SUPPORTED_DIMENSIONS for d in variants):
+                raise ValueError(f"降维变体必须是小于 {dimension} 的 {SUPPORTED_DIMENSIONS} 之一")
+            os.makedirs(path, exist_ok=True)
+            with open(config_path, "w", encoding="utf-8") as f:
+                json.dump({"dimension": dimension, "dtype": dtype, "variants": sorted(variants)}, f)
+
+        self.dimension = dimension
+        self.dtype = dtype
+        self.variants = sorted(variants)
+        self.lock = threading.Lock()
+
+        storage_dtype = np.int8 if dtype == "int8" else np.dtype(dtype)
+        self._writers = {dimension: NpyAppender(self._vectors_path(dimension), dimension, storage_dtype, resume=True)}
+        for d in self.variants:
+            self._writers[d] = NpyAppender(self._vectors_path(d), d, storage_dtype, resume=True)
+        self._scales = {}
+        if dtype == "int8":
+            for d in self._writers:
+                self._scales[d] = NpyAppender(self._vectors_path(d, "scales"), 1, np.float32, resume=True)
+
+        metadata_path = os.path.join(path, "metadata.jsonl")
+        self.metadata = []
+        if os.path.exists(metadata_path):
+            with open(metadata_path, encoding="utf-8") as f:
+                self.metadata = [json.loads(line) for line in f]
+        if len(self.metadata) != self._writers[dimension].rows:
+            raise ValueError(f"{path} 中向量数与元数据行数不一致")
+        self._metadata_file = open(metadata_path, "a", encoding="utf-8")
+        self._views = {}
+
+    def _vectors_path(self, dimension, name="vectors"):
+        suffix = "" if dimension == self.dimension else f"-{dimension}"
+        return os.path.join(self.path, f"{name}{suffix}.npy")
+
+    def __len__(self):
+        return len(self.metadata)
+
+    # -------------------- 写入 --------------------
+    def _append(self, dimension, vectors):
+        if self.dtype == "int8":
+            vectors, scales = quantize_int8(vectors)
+            self._scales[dimension].append(scales)
+        self._writers[dimension].append(vectors)
+
+    def add(self, vectors, metadata=None):
+        """
+        追加一批向量，返回第一行的行号
+
+        Args:
+            vectors: (n, dimension) 或单个向量，写入前做 L2 归一化
+            metadata: 与向量一一对应的 dict 列表（可选）
+        """
+        vectors = normalize(vectors).reshape(-1, self.dimension)
+        metadata = metadata if metadata is not None else [{} for _ in range(len(vectors))]
+        if len(metadata) != len(vectors):
+            raise ValueError("metadata 与 vectors 数量不一致")
+
+        with self.lock:
+            first = len(self.metadata)
+            self._append(self.dimension, vectors)
+            for d in self.variants:
+                self._append(d, reduce_dimension(vectors, d))
+            for meta in metadata:
+                self._metadata_file.write(json.dumps(meta, ensure_ascii=False) + "\n")
+            self.metadata.extend(metadata)
+            self._views.clear()
+        return first
+
+    def flush(self):
+        with self.lock:
+            for writer in list(self._writers.values()) + list(self._scales.values()):
+                writer.flush()
+            self._metadata_file.flush()
+
+    def close(self):
+        for writer in list(self._writers.values()) + list(self._scales.values()):
+            writer.close()
+        self._metadata_file.close()
+        self._views.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # -------------------- 读取 --------------------
+    def _view(self, dimension):
+        """返回 (向量矩阵, 缩放系数) 的内存映射视图，写入后首次读取时重新映射"""
+        view = self._views.get(dimension)
+        if view is None:
+            self.flush()
+            vectors = _memmap(self._writers[dimension])
+            scales = _memmap(self._scales[dimension])[:, 0] if dimension in self._scales else None
+            view = self._views[dimension] = (vectors, scales)
+        return view
+
+    def vectors(self, dimension=None):
+        """以 float32 返回全部向量（会读入内存，仅用于导出和调试）"""
+        vectors, scales = self._view(dimension or self.dimension)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors * scales[:, None] if scales is not None else vectors
+
+    def filter_rows(self, where):
+        """
+        返回满足 where 条件的行号数组
+
+        where 为 dict 时，每个键的条件可以是具体值、取值列表或 callable(value) -> bool；
+        也可以直接传 callable(metadata) -> bool
+        """
+        if callable(where):
+            mask = [bool(where(meta)) for meta in self.metadata]
+        else:
+            mask = [all(key in meta and _match(meta[key], condition) for key, condition in where.items())
+                    for meta in self.metadata]
+        return np.flatnonzero(np.array(mask, dtype=bool))
+
+    def _scores(self, query, dimension, rows=None):
+        """分块计算余弦相似度，rows 为 None 时计算全部行"""
+        vectors, scales = self._view(dimension)
+        total = len(vectors) if rows is None else len(rows)
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, total)
+            index = slice(start, end) if rows is None else rows[start:end]
+            block = vectors[index]
+            if block.dtype != np.float32:
+                block = block.astype(np.float32)
+            scores[start:end] = block @ query
+            if scales is not None:
+                scores[start:end] *= scales[index]
+        return scores
+
+    def search(self, query, k=10, where=None, dimension=None, rerank=DEFAULT_RERANK):
+        """
+        余弦相似度 top-k 检索
+
+        Args:
+            query: 查询向量（完整维度）
+            k: 返回条数
+            where: 元数据过滤条件，见 filter_rows
+            dimension: 使用哪个降维变体粗筛，None 表示直接在完整向量上检索
+            rerank: 粗筛候选数为 k * rerank
+
+        Returns:
+            [(行号, 相似度, 元数据), ...]，按相似度降序
+        """
+        query = normalize(query).reshape(self.dimension)
+        rows = self.filter_rows(where) if where else None
+
+        if dimension and dimension != self.dimension:
+            if dimension not in self.variants:
+                raise ValueError(f"没有 {dimension} 维的降维变体，可用: {self.variants}")
+            coarse = self._scores(reduce_dimension(query, dimension), dimension, rows)
+            candidates = top_k(coarse, k * rerank)
+            rows = candidates if rows is None else rows[candidates]
+
+        scores = self._scores(query, self.dimension, rows)
+        top = top_k(scores, k)
+        ids = top if rows is None else rows[top]
+        return [(int(i), float(s), self.metadata[i]) for i, s in zip(ids, scores[top])]
+
+    # -------------------- 导入 --------------------
+    def import_npy(self, vectors_path, ids_path=None, batch_rows=SEARCH_BLOCK_ROWS):
+        """导入嵌入流水线输出的 vectors.npy（及 ids.jsonl），返回导入行数"""
+        vectors = np.load(vectors_path, mmap_mode="r")
+        ids = open(ids_path, encoding="utf-8") if ids_path else None
+        try:
+            for start in range(0, len(vectors), batch_rows):
+                block = vectors[start:start + batch_rows]
+                metadata = [json.loads(next(ids)) for _ in range(len(block))] if ids else None
+                self.add(block, metadata)
+        finally:
+            if ids:
+                ids.close()
+        return len(vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nova MME 本地向量存储")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    importer = subparsers.add_parser("import", help="导入嵌入流水线的输出")
+    importer.add_argument("store")
+    importer.add_argument("vectors", help="vectors.npy")
+    importer.add_argument("ids", nargs="?", help="ids.jsonl")
+    importer.add_argument("--dtype", choices=STORAGE_DTYPES, default="float32")
+    importer.add_argument("--variants", type=int, nargs="*", default=[])
+
+    query = subparsers.add_parser("query", help="用文本查询")
+    query.add_argument("store")
+    query.add_argument("text")
+    query.add_argument("--k", type=int, default=5)
+    query.add_argument("--dimension", type=int, help="先在该降维变体上粗筛")
+    query.add_argument("--where", type=json.loads, help='元数据过滤，如 \'{"id": "a.txt"}\'')
+    args = parser.parse_args()
+
+    if args.command == "import":
+        dimension = np.load(args.vectors, mmap_mode="r").shape[1]
+        with VectorStore(args.store, dimension, args.dtype, args.variants) as store:
+            count = store.import_npy(args.vectors, args.ids)
+        print(f"✅ 导入 {count} 条向量到 {args.store} ({args.dtype})")
+        return
+
+    with VectorStore(args.store) as store:
+        vector = embed_text(args.text, client=get_client(), dimension=store.dimension, purpose="GENERIC_RETRIEVAL")
+        for row, score, meta in store.search(vector, args.k, where=args.where, dimension=args.dimension):
+            print(f"{score:.4f}  #{row}  {json.dumps(meta, ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import io
+import json
+import threading
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+import nova_embedding_pipeline
+from nova_embedding_pipeline import EmbeddingPipeline
+from nova_embeddings import get_client
+
+
+class ThrottlingEmbeddingClient:
+    """每个文本第一次调用返回 ThrottlingException，之后返回固定向量"""
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.seen = set()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def invoke_model(self, body, **kwargs):
+        text = json.loads(body)["singleEmbeddingParams"]["text"]["value"]
+        with self.lock:
+            self.calls += 1
+            first = text not in self.seen
+            self.seen.add(text)
+        if first:
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+        payload = json.dumps({"embeddings": [{"embedding": [1.0] * self.dimension}]}).encode()
+        return {"body": io.BytesIO(payload)}
+
+
+def test_default_client_leaves_retries_to_the_pipeline():
+    assert get_client(max_attempts=1).meta.config.retries["total_max_attempts"] == 1
+
+
+def test_pipeline_retries_throttles_and_counts_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(nova_embedding_pipeline.time, "sleep", lambda seconds: None)
+    client = ThrottlingEmbeddingClient(dimension=8)
+    pipeline = EmbeddingPipeline(str(tmp_path), client=client, dimension=8, max_in_flight=4)
+    chunks = (({"id": f"doc{i}", "chunk": 0, "start": 0}, f"text {i}") for i in range(10))
+    stats = pipeline.run(chunks)
+
+    assert stats["chunks"] == 10 and stats["failed"] == 0
+    assert stats["retries"] == 10
+    assert client.calls == 20
+    assert np.load(tmp_path / "vectors.npy").shape == (10, 8)
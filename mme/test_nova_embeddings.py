@@ -0,0 +1,37 @@
+import numpy as np
+
+from nova_embeddings import NPY_HEADER_SIZE, NpyAppender
+
+
+def test_appender_writes_loadable_npy(tmp_path):
+    path = str(tmp_path / "vectors.npy")
+    vectors = np.arange(12, dtype=np.float32).reshape(4, 3)
+    with NpyAppender(path, 3) as writer:
+        assert writer.append(vectors[:1]) == 0
+        assert writer.append(vectors[1:]) == 1
+        writer.flush()
+        assert np.array_equal(np.load(path, mmap_mode="r"), vectors)
+
+    with NpyAppender(path, 3, resume=True) as writer:
+        assert writer.append(np.ones(3)) == 4
+    assert np.array_equal(np.load(path), np.vstack([vectors, np.ones((1, 3), dtype=np.float32)]))
+
+
+def test_resume_drops_rows_written_after_last_header_update(tmp_path):
+    path = str(tmp_path / "vectors.npy")
+    writer = NpyAppender(path, 4)
+    writer.append(np.ones((2, 4)))
+    writer.flush()
+    # 模拟中断：一整行和半行已写入，但头部仍记录 2 行
+    writer.append(np.full((1, 4), 9))
+    writer.file.write(np.full(2, 9, dtype=np.float32).tobytes())
+    writer.file.close()
+
+    with NpyAppender(path, 4, resume=True) as writer:
+        assert writer.rows == 2
+        assert writer.append(np.full((1, 4), 2)) == 2
+
+    data = np.load(path)
+    assert data.shape == (3, 4)
+    assert np.array_equal(data[2], np.full(4, 2, dtype=np.float32))
+    assert (tmp_path / "vectors.npy").stat().st_size == NPY_HEADER_SIZE + 3 * 4 * 4
@@ -0,0 +1,50 @@
+import numpy as np
+
+from nova_semantic_cache import SemanticIndex
+
+
+def test_add_batch_assigns_new_vectors_to_trained_clusters():
+    rng = np.random.default_rng(1)
+    index = SemanticIndex(dimension=16, capacity=1000, ann_threshold=200, nprobe=2)
+    index.add_batch(rng.normal(size=(300, 16)))
+    assert index.centroids is not None and index.trained_size == 300
+
+    # 未达到重新训练的规模，新向量应按现有质心分配，而不是留在 -1
+    vectors = rng.normal(size=(50, 16))
+    slots = index.add_batch(vectors)
+    assert index.trained_size == 300
+    assert (index.assign[slots] >= 0).all()
+
+    found, scores = index.search(vectors[0], k=1)
+    assert found[0] == slots[0]
+    assert np.isclose(scores[0], 1.0)
+
+
+def _cluster_members(index):
+    return {c: sorted(index.cluster_slots[c][:index.cluster_sizes[c]].tolist()) for c in range(len(index.centroids))}
+
+
+def test_cluster_slot_arrays_track_add_and_remove():
+    rng = np.random.default_rng(2)
+    index = SemanticIndex(dimension=16, capacity=1000, ann_threshold=200, nprobe=3)
+    index.add_batch(rng.normal(size=(250, 16)))
+    for slot in range(0, 250, 3):
+        index.remove(slot)
+    index.add_batch(rng.normal(size=(40, 16)))
+    for _ in range(10):
+        index.add(rng.normal(size=16))
+
+    # 每个簇的槽位数组与 assign / valid 一致，position 指向槽位在簇数组中的下标
+    members = _cluster_members(index)
+    valid = np.flatnonzero(index.valid)
+    assert members == {c: sorted(valid[index.assign[valid] == c].tolist()) for c in members}
+    for c, slots in members.items():
+        for slot in slots:
+            assert index.cluster_slots[c][index.position[slot]] == slot
+
+    query = rng.normal(size=16)
+    probes = np.argsort(-(index.centroids @ (query / np.linalg.norm(query))))[:index.nprobe]
+    expected = sorted(slot for c in probes for slot in members[c])
+    found, scores = index.search(query, k=len(index))
+    assert sorted(found.tolist()) == expected
+    assert np.all(np.diff(scores) <= 0)
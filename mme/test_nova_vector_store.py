@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pytest
+
+from nova_embeddings import normalize
+from nova_vector_store import VectorStore, quantize_int8, reduce_dimension, top_k
+
+DIMENSION = 384
+
+
+def _vectors(count, seed=0):
+    return normalize(np.random.default_rng(seed).normal(size=(count, DIMENSION)))
+
+
+def _brute_force(vectors, query, k):
+    return list(np.argsort(-(vectors @ normalize(query)))[:k])
+
+
+def test_top_k_and_quantize():
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+    assert list(top_k(scores, 3)) == [1, 3, 2]
+    assert list(top_k(scores, 10)) == [1, 3, 2, 0]
+    assert len(top_k(scores[:0], 3)) == 0
+
+    vectors = _vectors(5)
+    quantized, scales = quantize_int8(vectors)
+    assert quantized.dtype == np.int8 and np.abs(quantized).max() == 127
+    assert np.allclose(quantized * scales[:, None], vectors, atol=scales.max())
+    assert np.allclose(np.linalg.norm(reduce_dimension(vectors, 256), axis=1), 1)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_search_matches_brute_force(tmp_path, dtype):
+    vectors = _vectors(500)
+    with VectorStore(str(tmp_path / "store"), DIMENSION, dtype) as store:
+        store.add(vectors[:200], [{"i": i} for i in range(200)])
+        store.add(vectors[200:], [{"i": i} for i in range(200, 500)])
+        query = vectors[42] + 0.05 * _vectors(1, seed=1)[0]
+
+        results = store.search(query, k=5)
+
+    assert [row for row, _, _ in results][0] == 42
+    assert results[0][2] == {"i": 42}
+    if dtype == "float32":
+        assert [row for row, _, _ in results] == _brute_force(vectors, query, 5)
+    assert [score for _, score, _ in results] == sorted((score for _, score, _ in results), reverse=True)
+
+
+def test_metadata_filters(tmp_path):
+    vectors = _vectors(100)
+    metadata = [{"lang": "zh" if i % 2 else "en", "page": i} for i in range(100)]
+    with VectorStore(str(tmp_path / "store"), DIMENSION) as store:
+        store.add(vectors, metadata)
+
+        assert list(store.filter_rows({"lang": "zh", "page": [1, 2, 3]})) == [1, 3]
+        assert list(store.filter_rows({"page": lambda page: page >= 98})) == [98, 99]
+        assert list(store.filter_rows(lambda meta: meta["page"] == 7)) == [7]
+        assert list(store.filter_rows({"missing": 1})) == []
+
+        results = store.search(vectors[10], k=3, where={"lang": "zh"})
+        assert all(meta["lang"] == "zh" for _, _, meta in results)
+        assert 10 not in [row for row, _, _ in results]
+        assert store.search(vectors[11], k=1, where={"lang": "zh"})[0][0] == 11
+
+
+def test_variant_coarse_search_then_rerank(tmp_path):
+    vectors = _vectors(300)
+    with VectorStore(str(tmp_path / "store"), DIMENSION, variants=(256,)) as store:
+        store.add(vectors)
+        assert store.vectors(256).shape == (300, 256)
+
+        results = store.search(vectors[7], k=3, dimension=256, rerank=5)
+        assert results[0][0] == 7 and np.isclose(results[0][1], 1, atol=1e-5)
+        with pytest.raises(ValueError):
+            store.search(vectors[7], dimension=1024)
+
+
+def test_reopen_and_import(tmp_path):
+    path = str(tmp_path / "store")
+    vectors = _vectors(30)
+    with VectorStore(path, DIMENSION, "int8", variants=(256,)) as store:
+        store.add(vectors[:10])
+
+    np.save(tmp_path / "vectors.npy", vectors[10:])
+    with open(tmp_path / "ids.jsonl", "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"id": f"doc-{i}"}) + "\n" for i in range(10, 30))
+
+    # 重新打开时沿用 store.json 中的配置
+    with VectorStore(path) as store:
+        assert (store.dimension, store.dtype, store.variants) == (DIMENSION, "int8", [256])
+        assert store.import_npy(str(tmp_path / "vectors.npy"), str(tmp_path / "ids.jsonl"), batch_rows=7) == 20
+        assert len(store) == 30
+        row, _, meta = store.search(vectors[25], k=1)[0]
+        assert (row, meta) == (25, {"id": "doc-25"})
+        assert np.allclose(store.vectors(), vectors, atol=0.01)
+
+
+def test_invalid_configuration(tmp_path):
+    with pytest.raises(ValueError):
+        VectorStore(str(tmp_path / "a"), DIMENSION, "int4")
+    with pytest.raises(ValueError):
+        VectorStore(str(tmp_path / "b"), DIMENSION, variants=(300,))
+    with VectorStore(str(tmp_path / "c"), DIMENSION) as store:
+        with pytest.raises(ValueError):
+            store.add(_vectors(2), [{}])
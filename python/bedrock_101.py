@@ -1,7 +1,7 @@
-import boto3
 import json
+from bedrock_client import get_runtime_client
 
-bedrock_client = boto3.client(service_name='bedrock-runtime', region_name='us-east-1', aws_access_key_id='ACCESS_KEY',
+bedrock_client = get_runtime_client(region_name='us-east-1', aws_access_key_id='ACCESS_KEY',
     aws_secret_access_key='SECRET_KEY')
 
 
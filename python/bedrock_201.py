@@ -1,14 +1,15 @@
 import json
 import os
 import sys
-import boto3
 import timeit
+from bedrock_client import get_runtime_client
+from stream_consumer import StreamConsumer, COMPLETION_FORMAT
 
 
 # bedrock_client = boto3.client('bedrock')
 # bedrock_client.list_foundation_models()
 
-boto3_bedrock = boto3.client(service_name='bedrock-runtime')
+boto3_bedrock = get_runtime_client()
 
 prompt = '''Human: 生成10条商品评论，每条20个字左右
 \n\nAssistant:
@@ -26,15 +27,7 @@ body = json.dumps({"prompt": prompt,
                   }) 
 
 response = boto3_bedrock.invoke_model_with_response_stream(body=body, modelId=modelId, accept=accept, contentType=contentType)
-stream = response.get('body')
-output = []
-i = 1
-if stream:
-    for event in stream:
-        chunk = event.get('chunk')
-        if chunk:
-            chunk_obj = json.loads(chunk.get('bytes').decode())
-            text = chunk_obj['completion']
-            output.append(text)
-            print(text)
-            i+=1
\ No newline at end of file
+consumer = StreamConsumer(response.get('body'), fmt=COMPLETION_FORMAT)
+for text in consumer.iter_text():
+    print(text)
+output = consumer.text_parts
\ No newline at end of file
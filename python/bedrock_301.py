@@ -2,67 +2,161 @@
 #First, I download three decision guides in PDF format from the AWS website. These guides help choose the AWS services that fit your use case.
 #首先，我从 AWS 网站下载了三个 PDF 格式的决策指南。这些指南可帮助您选择适合您的使用案例的 AWS 服务。
 
-#Then, I use a Python script to ask three questions about the documents. In the code, I create a converse() function to handle the conversation with the model. The first time I call the function, I include a list of documents and a flag to add a cachePoint block.
-#然后，我使用 Python 脚本询问有关文档的三个问题。在代码中，我创建了一个 converse() 函数来处理与模型的对话。第一次调用该函数时，我包含一个文档列表和一个用于添加 cachePoint 块的标志。
+#Then, I use a Python script to ask three questions about the documents. In the code, I create a Conversation class to handle the conversation with the model. Documents are loaded once and a cachePoint block is placed automatically.
+#然后，我使用 Python 脚本询问有关文档的三个问题。在代码中，我创建了一个 Conversation 类来处理与模型的对话。文档只加载一次，并自动插入 cachePoint 块。
+
+#Cache points are placed at stable prefix boundaries: right after the documents, and at the end of the latest user turn so the next turn can read the whole history from cache.
+#缓存点放在稳定的前缀边界：文档之后，以及最近一轮用户消息末尾，这样下一轮可以从缓存读取完整的历史前缀。
 
 import json
-import boto3
+import mmap
+from bedrock_client import get_runtime_client
 
 MODEL_ID = "us.anthropic.claude-3-5-sonnet-20241022-v2:0"
 AWS_REGION = "us-west-2"
 
-bedrock_runtime = boto3.client(
-    "bedrock-runtime",
-    region_name=AWS_REGION,
-)
+# 每个请求最多 4 个缓存点
+MAX_CACHE_POINTS = 4
+
+bedrock_runtime = get_runtime_client(region_name=AWS_REGION)
 
 DOCS = [
     "bedrock-or-sagemaker.pdf"
 ]
 
-messages = []
-
-
-def converse(new_message, docs=[], cache=False):
-
-    if len(messages) == 0 or messages[-1]["role"] != "user":
-        messages.append({"role": "user", "content": []})
-
-    for doc in docs:
-        print(f"Adding document: {doc}")
-        name, format = doc.rsplit('.', maxsplit=1)
-        with open(doc, "rb") as f:
-            bytes = f.read()
-        messages[-1]["content"].append({
-            "document": {
-                "name": name,
-                "format": format,
-                "source": {"bytes": bytes},
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+
+class Conversation:
+    """支持 Prompt Caching 的多轮对话"""
+
+    def __init__(self, model_id=MODEL_ID, client=None, system=None, cache=True):
+        self.model_id = model_id
+        self.client = client or bedrock_runtime
+        self.system = system
+        self.cache = cache
+        self.messages = []
+        self.turns = []
+        self._documents = {}
+        self._ms_per_input_token = None
+
+    def load_document(self, path):
+        """以内存映射方式加载文档，同一文件只加载一次"""
+        if path not in self._documents:
+            print(f"Adding document: {path}")
+            name, format = path.rsplit('.', maxsplit=1)
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._documents[path] = {
+                "document": {
+                    "name": name,
+                    "format": format,
+                    "source": {"bytes": data},
+                }
             }
-        })
-
-    messages[-1]["content"].append({"text": new_message})
-
-    if cache:
-        messages[-1]["content"].append({"cachePoint": {"type": "default"}})
-
-    response = bedrock_runtime.converse(
-        modelId=MODEL_ID,
-        messages=messages,
-    )
-
-    output_message = response["output"]["message"]
-    response_text = output_message["content"][0]["text"]
-
-    print("Response text:")
-    print(response_text)
-
-    print("Usage:")
-    print(json.dumps(response["usage"], indent=2))
-
-    messages.append(output_message)
-
-
-converse("Compare AWS Trainium and AWS Inferentia in 20 words or less.", docs=DOCS, cache=True)
-converse("Compare Amazon Textract and Amazon Transcribe in 20 words or less.")
-converse("Compare Amazon Q Business and Amazon Q Developer in 20 words or less.")
\ No newline at end of file
+        return self._documents[path]
+
+    def _place_cache_points(self):
+        """保留文档后的缓存点，把滚动缓存点移到最后一条用户消息末尾"""
+        cache_points = 1 if self.system else 0
+        for message in self.messages:
+            content = message["content"]
+            if message["role"] == "user" and message is not self.messages[-1]:
+                # 旧的滚动缓存点（位于消息末尾且前面不是文档）不再需要
+                if content and content[-1] == CACHE_POINT and "document" not in content[-2]:
+                    content.pop()
+            cache_points += sum(1 for block in content if block == CACHE_POINT)
+
+        last = self.messages[-1]["content"]
+        if last[-1] != CACHE_POINT and cache_points < MAX_CACHE_POINTS:
+            last.append(CACHE_POINT)
+
+    def _record_usage(self, response):
+        usage = response["usage"]
+        latency_ms = response.get("metrics", {}).get("latencyMs")
+        cache_read = usage.get("cacheReadInputTokens", 0)
+        cache_write = usage.get("cacheWriteInputTokens", 0)
+        total_input = usage["inputTokens"] + cache_read + cache_write
+
+        # 用未命中缓存的轮次估算每个输入 token 的处理耗时，进而估算缓存节省的延迟
+        if latency_ms and cache_read == 0 and total_input:
+            self._ms_per_input_token = latency_ms / total_input
+        saved_ms = cache_read * self._ms_per_input_token if self._ms_per_input_token else None
+
+        turn = {
+            "turn": len(self.turns) + 1,
+            "input_tokens": usage["inputTokens"],
+            "output_tokens": usage["outputTokens"],
+            "cache_read_tokens": cache_read,
+            "cache_write_tokens": cache_write,
+            "cache_hit_ratio": cache_read / total_input if total_input else 0,
+            "latency_ms": latency_ms,
+            "estimated_saved_ms": saved_ms,
+        }
+        self.turns.append(turn)
+        return turn
+
+    def converse(self, new_message, docs=()):
+
+        if len(self.messages) == 0 or self.messages[-1]["role"] != "user":
+            self.messages.append({"role": "user", "content": []})
+
+        content = self.messages[-1]["content"]
+        for doc in docs:
+            content.append(self.load_document(doc))
+        if docs and self.cache:
+            content.append(CACHE_POINT)
+
+        content.append({"text": new_message})
+
+        if self.cache:
+            self._place_cache_points()
+
+        kwargs = {"modelId": self.model_id, "messages": self.messages}
+        if self.system:
+            kwargs["system"] = [{"text": self.system}] + ([CACHE_POINT] if self.cache else [])
+        response = self.client.converse(**kwargs)
+
+        output_message = response["output"]["message"]
+        response_text = output_message["content"][0]["text"]
+
+        print("Response text:")
+        print(response_text)
+
+        print("Usage:")
+        print(json.dumps(response["usage"], indent=2))
+
+        turn = self._record_usage(response)
+        saved = turn["estimated_saved_ms"]
+        print(f"Cache hit ratio: {turn['cache_hit_ratio']:.1%}"
+              + (f", estimated saved latency: {saved:.0f} ms" if saved else ""))
+
+        self.messages.append(output_message)
+        return response_text
+
+    def cache_report(self):
+        """汇总各轮的缓存命中情况"""
+        cache_read = sum(t["cache_read_tokens"] for t in self.turns)
+        total_input = sum(t["input_tokens"] + t["cache_read_tokens"] + t["cache_write_tokens"] for t in self.turns)
+        return {
+            "turns": self.turns,
+            "cache_hit_ratio": cache_read / total_input if total_input else 0,
+            "estimated_saved_ms": sum(t["estimated_saved_ms"] or 0 for t in self.turns),
+        }
+
+    def close(self):
+        for document in self._documents.values():
+            document["document"]["source"]["bytes"].close()
+        self._documents.clear()
+
+
+if __name__ == "__main__":
+    conversation = Conversation()
+    conversation.converse("Compare AWS Trainium and AWS Inferentia in 20 words or less.", docs=DOCS)
+    conversation.converse("Compare Amazon Textract and Amazon Transcribe in 20 words or less.")
+    conversation.converse("Compare Amazon Q Business and Amazon Q Developer in 20 words or less.")
+
+    report = conversation.cache_report()
+    print(f"\nOverall cache hit ratio: {report['cache_hit_ratio']:.1%}, "
+          f"estimated saved latency: {report['estimated_saved_ms']:.0f} ms")
+    conversation.close()
@@ -23,13 +23,12 @@
     python bedrock_claude37.py
 """
 
-import boto3
 import json
+from bedrock_client import get_runtime_client
 
 def claude_reasoning():
     # Initialize Bedrock client for AWS region us-west-2
-    bedrock = boto3.client(service_name='bedrock-runtime', 
-                          region_name='us-west-2')
+    bedrock = get_runtime_client(region_name='us-west-2')
 
     # Set up the model ID for Claude 3.7 Sonnet
     model_id = 'us.anthropic.claude-3-7-sonnet-20250219-v1:0'
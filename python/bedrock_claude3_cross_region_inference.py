@@ -12,15 +12,17 @@
 """
 
 
-import boto3
 import json
 import base64
 import pprint
+import time
+from bedrock_client import get_client, get_runtime_client
+from stream_metrics import TimedStream, print_stream_summary
 
-bedrock_runtime = boto3.client(service_name='bedrock-runtime', region_name='us-east-1')
+bedrock_runtime = get_runtime_client(region_name='us-east-1')
 
 # List available inference profiles
-bedrock = boto3.client(service_name='bedrock', region_name='us-east-1')
+bedrock = get_client('bedrock', region_name='us-east-1')
 inference_profiles = bedrock.list_inference_profiles()
 print(inference_profiles)
 
@@ -54,6 +56,7 @@ payload = {
 body_bytes = json.dumps(payload['body']).encode('utf-8')
 
 # Invoke the model
+start_time = time.perf_counter()
 response = bedrock_runtime.invoke_model_with_response_stream(
     body=body_bytes,
     contentType=payload['contentType'],
@@ -65,8 +68,11 @@ stream = response.get('body')
 chunk_obj = {}
 
 if stream:
-    for event in stream:
+    # 记录每个 chunk 的到达时间，用于观察跨区域路由下的 chunk 间隔和卡顿
+    timed_stream = TimedStream(stream, start_time=start_time)
+    for event in timed_stream:
         chunk = event.get('chunk')
         if chunk:
             chunk_obj = json.loads(chunk.get('bytes').decode())
             pprint.pprint(chunk_obj)
+    print_stream_summary(timed_stream)
@@ -1,6 +1,6 @@
-import boto3
 import json
 import base64
+from bedrock_client import get_runtime_client
 
 #多模态需要将文件以base64的形式输入给大模型
 with open("aws.png", "rb") as image_file:
@@ -8,7 +8,7 @@ with open("aws.png", "rb") as image_file:
     base64_string = encoded_string.decode('utf-8')
 
 # Create a BedrockRuntime client
-bedrock_runtime = boto3.client(service_name='bedrock-runtime', region_name='us-east-1', aws_access_key_id='ACCESS_KEY',
+bedrock_runtime = get_runtime_client(region_name='us-east-1', aws_access_key_id='ACCESS_KEY',
     aws_secret_access_key='SECRET_KEY')
 
 payload = {
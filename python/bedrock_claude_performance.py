@@ -6,26 +6,30 @@ Description: This script tests the performance metrics of Bedrock Claude 3 Sonne
 - Time to First Token (TTFT)
 - Output Tokens per Second  
 - Total Response Time
+- Concurrent load mode: p50/p90/p99 TTFT, inter-token latency, aggregate tokens/sec
+
+Usage:
+    python bedrock_claude_performance.py                                  # 顺序测试
+    python bedrock_claude_performance.py --mode load --concurrency 100    # 并发压测
+    python bedrock_claude_performance.py --mode load --rps 20 --stub      # 使用本地桩客户端离线压测
 """
 
-import boto3
+import argparse
 import json
 import time
-import tiktoken
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from bedrock_client import get_runtime_client
+from stream_consumer import StreamConsumer
+from stream_metrics import percentile
+from token_counter import TokenCounter, count_tokens, generate_text_with_tokens
 
-def count_tokens(text):
-    """计算文本的token数量"""
-    encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(text))
+MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
 
-def create_bedrock_client():
+def create_bedrock_client(max_pool_connections=10):
     """创建Bedrock运行时客户端"""
-    return boto3.client(
-        service_name='bedrock-runtime',
-        region_name='us-east-1'
-    )
+    return get_runtime_client(region_name='us-east-1', max_pool_connections=max_pool_connections)
 
-def invoke_model(client, prompt, max_tokens=100):
+def invoke_model(client, prompt, max_tokens=100, model_id=MODEL_ID):
     """调用模型并返回响应和性能指标"""
     body = {
         "anthropic_version": "bedrock-2023-05-31",
@@ -45,47 +49,49 @@ def invoke_model(client, prompt, max_tokens=100):
 
     start_time = time.time()
     first_token_time = None
-    response_text = ""
+    last_token_time = None
+    inter_token_latencies = []
+    token_counter = TokenCounter()
     
     response = client.invoke_model_with_response_stream(
         body=json.dumps(body).encode('utf-8'),
-        modelId="anthropic.claude-3-sonnet-20240229-v1:0",
+        modelId=model_id,
         contentType="application/json",
         accept="application/json"
     )
 
 
-    for event in response.get('body'):
-        chunk = event.get('chunk')
-        if chunk:
-            chunk_obj = json.loads(chunk.get('bytes').decode())
-            if chunk_obj['type'] == 'content_block_delta':
-                if first_token_time is None:
-                    first_token_time = time.time()
-                response_text += chunk_obj['delta']['text']
+    consumer = StreamConsumer(response.get('body'))
+    for text in consumer.iter_text():
+        now = time.time()
+        if first_token_time is None:
+            first_token_time = now
+        else:
+            inter_token_latencies.append(now - last_token_time)
+        last_token_time = now
+        token_counter.add(text)
     
     end_time = time.time()
     
     # 计算性能指标
-    ttft = first_token_time - start_time
+    ttft = first_token_time - start_time if first_token_time else None
     total_time = end_time - start_time
-    output_tokens = count_tokens(response_text)
+    output_tokens = token_counter.count
     tokens_per_second = output_tokens / (end_time - first_token_time) if first_token_time else 0
     
     return {
-        'text': response_text,
+        'text': consumer.text,
         'ttft': ttft,
         'total_time': total_time,
         'tokens_per_second': tokens_per_second,
-        'output_tokens': output_tokens
+        'output_tokens': output_tokens,
+        'inter_token_latencies': inter_token_latencies
     }
 
 def generate_input_text(target_tokens=1000):
     """生成指定token数量的输入文本"""
     base_text = "请详细描述人工智能在现代社会中的应用，包括但不限于以下方面：医疗保健、教育、金融、交通、制造业等。"
-    while count_tokens(base_text) < target_tokens:
-        base_text += " " + base_text
-    return base_text[:target_tokens]
+    return generate_text_with_tokens(target_tokens, base_text)
 
 def run_performance_tests():
     """运行性能测试"""
@@ -119,23 +125,140 @@ def run_performance_tests():
         print("="*80)
         results.append(response)
         
-        print(f"TTFT: {response['ttft']:.3f} 秒")
+        if response['ttft'] is None:
+            print("TTFT: 无（未收到任何输出内容）")
+        else:
+            print(f"TTFT: {response['ttft']:.3f} 秒")
         print(f"输出速度: {response['tokens_per_second']:.2f} tokens/秒")
         print(f"总响应时间: {response['total_time']:.3f} 秒")
         print(f"输出tokens: {response['output_tokens']}")
     
     # 计算平均值
-    avg_ttft = sum(r['ttft'] for r in results) / len(results)
+    # 空输出等未收到内容的运行没有 TTFT，不计入 TTFT 平均值
+    ttfts = [r['ttft'] for r in results if r['ttft'] is not None]
     avg_tokens_per_second = sum(r['tokens_per_second'] for r in results) / len(results)
     avg_total_time = sum(r['total_time'] for r in results) / len(results)
     
     print("\n性能测试结果（平均值）：")
-    print(f"Time to First Token: {avg_ttft:.3f} 秒")
+    if ttfts:
+        print(f"Time to First Token: {sum(ttfts) / len(ttfts):.3f} 秒")
+    else:
+        print("Time to First Token: 无")
+    if len(ttfts) < len(results):
+        print(f"  （{len(results) - len(ttfts)} 次运行未收到输出内容，没有 TTFT）")
     print(f"Output Tokens per Second: {avg_tokens_per_second:.2f} tokens/秒")
     print(f"Total Response Time: {avg_total_time:.3f} 秒")
 
+def run_load_test(client, prompt, concurrency=50, rps=None, total_requests=200, max_tokens=100,
+                  model_id=MODEL_ID):
+    """
+    并发压测：以固定并发数（闭环）或固定请求速率（开环）驱动 invoke_model()
+
+    Args:
+        client: bedrock-runtime 客户端，或任何实现了 invoke_model_with_response_stream 的对象
+        prompt: 输入文本
+        concurrency: 最大并发流数（线程池大小）
+        rps: 目标每秒请求数；为 None 时所有请求立即提交，由 concurrency 限制在途数量
+        total_requests: 请求总数
+        max_tokens: 每个请求的最大输出 tokens
+
+    Returns:
+        dict: 汇总指标
+    """
+    results = []
+    errors = []
+    start_time = time.time()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = []
+        for i in range(total_requests):
+            if rps:
+                # 开环模式：按计划时间点提交请求，不受响应快慢影响
+                delay = start_time + i / rps - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(executor.submit(invoke_model, client, prompt, max_tokens, model_id))
+
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors.append(str(e))
+
+    wall_time = time.time() - start_time
+    ttfts = [r['ttft'] for r in results if r['ttft'] is not None]
+    itls = [gap for r in results for gap in r['inter_token_latencies']]
+    total_output_tokens = sum(r['output_tokens'] for r in results)
+
+    return {
+        'requests': total_requests,
+        'succeeded': len(results),
+        'failed': len(errors),
+        'errors': errors,
+        'concurrency': concurrency,
+        'target_rps': rps,
+        'wall_time': wall_time,
+        'achieved_rps': len(results) / wall_time if wall_time else 0,
+        'ttft': {p: percentile(ttfts, p) for p in (50, 90, 99)},
+        'inter_token_latency': {p: percentile(itls, p) for p in (50, 90, 99)},
+        'total_output_tokens': total_output_tokens,
+        'output_tokens_per_second': total_output_tokens / wall_time if wall_time else 0
+    }
+
+def print_load_report(report):
+    """打印压测结果"""
+    def fmt(value):
+        return f"{value:.3f}" if value is not None else "N/A"
+
+    print("\n压测结果：")
+    print(f"请求数: {report['requests']} (成功 {report['succeeded']}, 失败 {report['failed']})")
+    print(f"并发数: {report['concurrency']}, 目标RPS: {report['target_rps'] or '不限'}")
+    print(f"总耗时: {report['wall_time']:.3f} 秒, 实际RPS: {report['achieved_rps']:.2f}")
+    for name, key in (("TTFT", 'ttft'), ("Inter-token latency", 'inter_token_latency')):
+        stats = report[key]
+        print(f"{name}: p50 {fmt(stats[50])} 秒 | p90 {fmt(stats[90])} 秒 | p99 {fmt(stats[99])} 秒")
+    print(f"总输出tokens: {report['total_output_tokens']}")
+    print(f"聚合输出速度: {report['output_tokens_per_second']:.2f} tokens/秒")
+    for error in report['errors'][:5]:
+        print(f"错误: {error}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bedrock Claude 性能测试")
+    parser.add_argument("--mode", choices=["sequential", "load"], default="sequential", help="测试模式")
+    parser.add_argument("--concurrency", type=int, default=50, help="压测并发数")
+    parser.add_argument("--rps", type=float, default=None, help="压测目标每秒请求数（开环模式）")
+    parser.add_argument("--requests", type=int, default=200, help="压测请求总数")
+    parser.add_argument("--input-tokens", type=int, default=1000, help="输入tokens数")
+    parser.add_argument("--max-tokens", type=int, default=100, help="最大输出tokens数")
+    parser.add_argument("--stub", action="store_true", help="使用本地桩客户端回放事件流（离线）")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.mode == "sequential":
+        run_performance_tests()
+        return
+
+    if args.stub:
+        from bedrock_stub_client import StubBedrockRuntimeClient
+        client = StubBedrockRuntimeClient()
+    else:
+        client = create_bedrock_client(max_pool_connections=args.concurrency)
+
+    input_text = generate_input_text(args.input_tokens)
+    print(f"开始并发压测: {args.requests} 个请求, 并发 {args.concurrency}"
+          + (f", 目标 {args.rps} RPS" if args.rps else ""))
+    report = run_load_test(
+        client, input_text,
+        concurrency=args.concurrency,
+        rps=args.rps,
+        total_requests=args.requests,
+        max_tokens=args.max_tokens
+    )
+    print_load_report(report)
+
 if __name__ == "__main__":
     try:
-        run_performance_tests()
+        main()
     except Exception as e:
         print(f"测试过程中发生错误: {str(e)}")
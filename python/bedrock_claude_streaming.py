@@ -1,13 +1,14 @@
 
 
 
-import boto3
 import json
-import base64
-import pprint
+import time
+from bedrock_client import get_runtime_client
+from stream_consumer import StreamConsumer
+from stream_metrics import TimedStream, print_stream_summary
 
 
-bedrock_runtime = boto3.client(service_name='bedrock-runtime', region_name='us-east-1')
+bedrock_runtime = get_runtime_client(region_name='us-east-1')
     
     
 payload = {
@@ -37,6 +38,7 @@ body_bytes = json.dumps(payload['body']).encode('utf-8')
 
 
 # Invoke the model
+start_time = time.perf_counter()
 response = bedrock_runtime.invoke_model_with_response_stream(
    body=body_bytes,
     contentType=payload['contentType'],
@@ -44,12 +46,14 @@ response = bedrock_runtime.invoke_model_with_response_stream(
     modelId=payload['modelId']
 )
 
-stream = response.get('body')
-chunk_obj = {}
-    
-if stream:
-    for event in stream:
-        chunk = event.get('chunk')
-        if chunk:
-            chunk_obj = json.loads(chunk.get('bytes').decode())
-            pprint.pprint(chunk_obj)
+timed_stream = TimedStream(response.get('body'), start_time=start_time)
+consumer = StreamConsumer(timed_stream)
+
+for text in consumer.iter_text():
+    print(text, end='', flush=True)
+
+print()
+print(json.dumps(consumer.message()['usage'], indent=2))
+
+# chunk 计时汇总，可通过 timed_stream.to_jsonl("trace.jsonl") 导出完整时间线
+print_stream_summary(timed_stream)
@@ -0,0 +1,166 @@
+"""
+文件名: bedrock_client.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+Bedrock 客户端工厂，所有示例脚本共用。
+
+功能：
+    - 按 (服务, 区域, endpoint, 连接参数) 缓存客户端，同一进程内复用连接池
+    - 可配置连接池大小、TCP keep-alive、超时和 adaptive 重试模式
+    - 支持注入 endpoint_url（或环境变量 BEDROCK_ENDPOINT_URL），便于指向本地桩服务
+    - AsyncBedrockClient 在有界线程池中执行阻塞调用，供 asyncio 代码并发使用
+
+使用示例：
+    from bedrock_client import get_runtime_client, AsyncBedrockClient
+
+    bedrock_runtime = get_runtime_client(region_name="us-east-1")
+
+    async with AsyncBedrockClient(max_concurrency=200) as client:
+        responses = await asyncio.gather(*(client.invoke_model(**kwargs) for kwargs in requests))
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_REGION = "us-east-1"
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 300
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def build_config(max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS, tcp_keepalive=True,
+                 retry_mode="adaptive", max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT):
+    """构建 botocore 客户端配置"""
+    return Config(
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=tcp_keepalive,
+        retries={"mode": retry_mode, "max_attempts": max_attempts},
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+    )
+
+
+def get_client(service_name="bedrock-runtime", region_name=None, endpoint_url=None,
+               max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS, tcp_keepalive=True,
+               retry_mode="adaptive", max_attempts=DEFAULT_MAX_ATTEMPTS,
+               connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+               **client_kwargs):
+    """
+    获取（并缓存）Bedrock 客户端
+
+    Args:
+        service_name: bedrock-runtime 或 bedrock
+        region_name: 区域，默认 us-east-1
+        endpoint_url: 自定义 endpoint，默认读取环境变量 BEDROCK_ENDPOINT_URL
+        max_pool_connections: 连接池大小，应不小于并发请求数
+        client_kwargs: 透传给 boto3.client 的其他参数（如 aws_access_key_id）
+
+    Returns:
+        boto3 客户端（线程安全，可在多个线程间共享）
+    """
+    region_name = region_name or DEFAULT_REGION
+    endpoint_url = endpoint_url or os.environ.get("BEDROCK_ENDPOINT_URL")
+    key = (service_name, region_name, endpoint_url, max_pool_connections, tcp_keepalive,
+           retry_mode, max_attempts, connect_timeout, read_timeout,
+           tuple(sorted(client_kwargs.items())))
+
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = boto3.client(
+                    service_name=service_name,
+                    region_name=region_name,
+                    endpoint_url=endpoint_url,
+                    config=build_config(max_pool_connections, tcp_keepalive, retry_mode,
+                                        max_attempts, connect_timeout, read_timeout),
+                    **client_kwargs
+                )
+                _clients[key] = client
+    return client
+
+
+def get_runtime_client(region_name=None, **kwargs):
+    """获取 bedrock-runtime 客户端"""
+    return get_client("bedrock-runtime", region_name=region_name, **kwargs)
+
+
+def reset_clients():
+    """清空客户端缓存（用于测试）"""
+    with _clients_lock:
+        _clients.clear()
+
+
+class AsyncBedrockClient:
+    """
+    asyncio 接口的 Bedrock Runtime 客户端
+
+    阻塞的 boto3 调用在有界线程池中执行，线程池大小即最大在途请求数；
+    底层连接池大小与之保持一致，避免请求排队等待连接或频繁新建连接。
+
+    Args:
+        client: 已有的 bedrock-runtime 客户端（可选，也可以是本地桩客户端）
+        max_concurrency: 最大并发调用数
+        client_kwargs: 未传入 client 时透传给 get_runtime_client 的参数
+    """
+
+    def __init__(self, client=None, max_concurrency=DEFAULT_MAX_POOL_CONNECTIONS, **client_kwargs):
+        client_kwargs.setdefault("max_pool_connections", max_concurrency)
+        self.client = client or get_runtime_client(**client_kwargs)
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                           thread_name_prefix="bedrock")
+
+    async def call(self, method, **kwargs):
+        """在线程池中调用任意客户端方法"""
+        loop = asyncio.get_running_loop()
+        func = functools.partial(getattr(self.client, method), **kwargs)
+        return await loop.run_in_executor(self.executor, func)
+
+    async def invoke_model(self, **kwargs):
+        return await self.call("invoke_model", **kwargs)
+
+    async def converse(self, **kwargs):
+        return await self.call("converse", **kwargs)
+
+    async def invoke_model_with_response_stream(self, **kwargs):
+        return await self.call("invoke_model_with_response_stream", **kwargs)
+
+    async def iter_stream(self, **kwargs):
+        """
+        异步迭代 invoke_model_with_response_stream 的事件
+
+        读取下一个事件同样在线程池中进行，不阻塞事件循环
+        """
+        loop = asyncio.get_running_loop()
+        response = await self.invoke_model_with_response_stream(**kwargs)
+        iterator = iter(response.get("body") or ())
+        sentinel = object()
+        while True:
+            event = await loop.run_in_executor(self.executor, next, iterator, sentinel)
+            if event is sentinel:
+                break
+            yield event
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,8 +1,8 @@
-import boto3
 import json
 import base64
+from bedrock_client import get_runtime_client
 
-bedrock_runtime = boto3.client(service_name='bedrock-runtime', region_name='us-east-1')
+bedrock_runtime = get_runtime_client(region_name='us-east-1')
     
     
 payload = {
@@ -20,9 +20,11 @@
 
 """
 
-import boto3
 import json
+import time
 from enum import Enum
+from bedrock_client import get_runtime_client
+from stream_metrics import TimedStream, print_stream_summary
 
 
 # replace with your region
@@ -30,7 +32,7 @@ region_name = "us-west-2"
 # replace with your model ARN
 model_id = "arn:aws:sagemaker:us-west-2:xxx:endpoint/endpoint-quick-bd-mp-llama-8b"  
 # model_id = "arn:aws:sagemaker:us-west-2:xxx:endpoint/endpoint-bk-mp-qwen-7b-cls"
-bedrock_runtime = boto3.client("bedrock-runtime", region_name= region_name)
+bedrock_runtime = get_runtime_client(region_name=region_name)
 
 def invoke_deepseek_model(prompt, max_tokens=1000, temperature=0.6, top_p=0.9, stream=False):
     # Format prompt with unified template
@@ -61,6 +63,7 @@ def invoke_deepseek_model(prompt, max_tokens=1000, temperature=0.6, top_p=0.9, s
 
     else:
         # 流式输出
+        start_time = time.perf_counter()
         response = bedrock_runtime.invoke_model_with_response_stream(
             modelId=model_id,
             body=json.dumps(request_body)
@@ -69,12 +72,14 @@ def invoke_deepseek_model(prompt, max_tokens=1000, temperature=0.6, top_p=0.9, s
 
         stream = response.get("body")
         if stream:
-            for event in stream:
+            timed_stream = TimedStream(stream, start_time=start_time)
+            for event in timed_stream:
                 chunk = event.get("chunk")
                 if chunk:
                     # Print the response chunk
                     chunk_json = json.loads(chunk.get("bytes").decode())
                     print(chunk_json)
+            print_stream_summary(timed_stream)
         else:
             print("No response stream received.")
 
@@ -1,7 +1,7 @@
-import boto3
 import json
+from bedrock_client import get_runtime_client
 
-bedrock = boto3.client(service_name="bedrock-runtime",region_name='us-west-2')
+bedrock = get_runtime_client(region_name='us-west-2')
 
 
 # Mistral AI Mistral 7B   mistral.mistral-7b-instruct-v0:2
@@ -0,0 +1,322 @@
+"""
+文件名: bedrock_response_cache.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+invoke_model / converse 的客户端响应缓存，用于回归测试等重复发送相同请求的场景。
+
+功能：
+    - 缓存键为 (操作, modelId, 请求体) 规范化 JSON 的 SHA-256，字段顺序不影响命中
+    - 两级缓存：进程内 LRU + SQLite 磁盘缓存（跨进程、跨运行复用）
+    - 支持 TTL，内存层按条目数淘汰，磁盘层按总字节数淘汰（最久未访问优先）
+    - 磁盘层以 JSON 保存（bytes 以 base64 编码），读取缓存文件不会执行任意代码
+    - 只缓存确定性请求（temperature=0 或 top_k=1），其他请求直接透传，可通过 force=True 强制缓存
+    - 统计命中 / 未命中 / 跳过 / 淘汰次数
+
+使用示例：
+    bedrock_runtime = CachedBedrockClient(get_runtime_client(), ResponseCache("bedrock-cache.db"))
+    response = bedrock_runtime.invoke_model(body=body, modelId=model_id)
+    print(bedrock_runtime.cache.stats())
+"""
+
+import base64
+import copy
+import hashlib
+import io
+import json
+import mmap
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from botocore.response import StreamingBody
+
+DEFAULT_MEMORY_ENTRIES = 1024
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+# ============================================================
+# 缓存键与确定性判断
+# ============================================================
+def _json_default(value):
+    """bytes / mmap 等二进制内容（如文档、图片）以其哈希参与缓存键"""
+    if isinstance(value, (bytes, bytearray, memoryview, mmap.mmap)):
+        return "sha256:" + hashlib.sha256(value).hexdigest()
+    raise TypeError(f"无法序列化的请求参数类型: {type(value).__name__}")
+
+
+def _parse_body(body):
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode("utf-8")
+    return json.loads(body) if isinstance(body, str) else body
+
+
+def make_key(operation, model_id, request):
+    """计算规范化的缓存键"""
+    canonical = json.dumps([operation, model_id, request], sort_keys=True, ensure_ascii=False,
+                           separators=(",", ":"), default=_json_default)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _sampling_params(request):
+    """从各模型格式的请求中找出 temperature / top_k"""
+    sections = [request]
+    for name in ("textGenerationConfig", "inferenceConfig", "parameters", "additionalModelRequestFields"):
+        if isinstance(request.get(name), dict):
+            sections.append(request[name])
+
+    temperature = top_k = None
+    for section in sections:
+        if "temperature" in section:
+            temperature = section["temperature"]
+        for key in ("top_k", "topK"):
+            if key in section:
+                top_k = section[key]
+    return temperature, top_k
+
+
+def is_deterministic(request):
+    """temperature=0 或 top_k=1 时视为确定性请求（未设置 temperature 时模型默认值通常为 1）"""
+    temperature, top_k = _sampling_params(request)
+    return temperature == 0 or top_k == 1
+
+
+# ============================================================
+# 磁盘层序列化
+# ============================================================
+def _encode_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"无法写入磁盘缓存的类型: {type(value).__name__}")
+
+
+def _decode_hook(obj):
+    if len(obj) == 1 and "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+def dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_encode_default).encode("utf-8")
+
+
+def loads(blob):
+    return json.loads(blob, object_hook=_decode_hook)
+
+
+# ============================================================
+# 两级缓存
+# ============================================================
+class ResponseCache:
+    """
+    内存 LRU + SQLite 磁盘两级缓存
+
+    Args:
+        path: SQLite 文件路径，为 None 时只使用内存层
+        memory_entries: 内存层最大条目数
+        max_disk_bytes: 磁盘层最大总字节数
+        ttl: 过期时间（秒），None 表示不过期
+    """
+
+    def __init__(self, path=None, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES, ttl=DEFAULT_TTL):
+        self.memory = OrderedDict()
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "skipped": 0, "evictions": 0}
+
+        self.db = None
+        self.disk_bytes = 0  # 磁盘层总字节数，打开时统计一次，之后随写入 / 删除增减
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value BLOB,
+                    size INTEGER,
+                    created_at REAL,
+                    accessed_at REAL
+                )""")
+            self.db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS idx_created ON responses (created_at)")
+            self.disk_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _expired(self, created_at, now):
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._expired(created_at, now):
+                    self.memory.move_to_end(key)
+                    self.metrics["memory_hits"] += 1
+                    return value
+                del self.memory[key]
+
+            if self.db is not None:
+                row = self.db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                value = None
+                if row and not self._expired(row[1], now):
+                    try:
+                        value = loads(row[0])
+                    except ValueError:
+                        pass  # 无法解析的条目（如旧版本写入的格式）按未命中处理并删除
+                if value is not None:
+                    with self.db:
+                        self.db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._put_memory(key, row[1], value)
+                    self.metrics["disk_hits"] += 1
+                    return value
+                if row:
+                    with self.db:
+                        self._delete_disk(key)
+
+            self.metrics["misses"] += 1
+            return None
+
+    def _put_memory(self, key, created_at, value):
+        self.memory[key] = (created_at, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+            self.metrics["evictions"] += 1
+
+    def put(self, key, value):
+        now = time.time()
+        with self.lock:
+            self._put_memory(key, now, value)
+            if self.db is None:
+                return
+            try:
+                blob = dumps(value)
+            except TypeError:
+                return  # 无法 JSON 序列化的响应只保存在内存层
+            with self.db:
+                self._delete_disk(key)
+                self.db.execute("INSERT INTO responses VALUES (?, ?, ?, ?, ?)", (key, blob, len(blob), now, now))
+                self.disk_bytes += len(blob)
+                self._evict_disk(now)
+
+    def _delete_disk(self, key):
+        """删除一条磁盘条目并更新总字节数（调用方持有锁并处于事务中）"""
+        row = self.db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row:
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.disk_bytes -= row[0]
+
+    def _evict_disk(self, now):
+        """
+        删除过期条目，并按最久未访问淘汰到 max_disk_bytes 以内，两种删除都计入 evictions
+
+        先用 fetchall() 取出待删除的键，再统一 executemany 删除，不在遍历游标的同时修改表
+        （调用方持有锁并处于事务中）
+        """
+        victims = []
+        if self.ttl is not None:
+            victims = self.db.execute("SELECT key, size FROM responses WHERE created_at < ?",
+                                      (now - self.ttl,)).fetchall()
+        disk_bytes = self.disk_bytes - sum(size for _, size in victims)
+        if disk_bytes > self.max_disk_bytes:
+            expired = {key for key, _ in victims}
+            for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+                if key in expired:
+                    continue
+                victims.append((key, size))
+                disk_bytes -= size
+                if disk_bytes <= self.max_disk_bytes:
+                    break
+        if victims:
+            self.db.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in victims])
+            self.metrics["evictions"] += len(victims)
+            self.disk_bytes = disk_bytes
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.db is not None:
+                with self.db:
+                    self.db.execute("DELETE FROM responses")
+                self.disk_bytes = 0
+
+    def record_skip(self):
+        """记录一次未经缓存直接透传的请求"""
+        with self.lock:
+            self.metrics["skipped"] += 1
+
+    def stats(self):
+        with self.lock:
+            metrics, memory_size = dict(self.metrics), len(self.memory)
+        hits = metrics["memory_hits"] + metrics["disk_hits"]
+        lookups = hits + metrics["misses"]
+        return dict(metrics, hit_ratio=hits / lookups if lookups else 0, memory_size=memory_size,
+                    disk_bytes=self.disk_bytes)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+
+
+# ============================================================
+# 客户端包装
+# ============================================================
+class CachedBedrockClient:
+    """
+    为 bedrock-runtime 客户端的 invoke_model / converse 加上响应缓存，其他方法原样透传
+
+    Args:
+        client: bedrock-runtime 客户端
+        cache: ResponseCache 实例（默认只使用内存层）
+        force: 是否忽略确定性判断，缓存所有请求
+    """
+
+    def __init__(self, client, cache=None, force=False):
+        self.client = client
+        self.cache = cache or ResponseCache()
+        self.force = force
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def invoke_model(self, force=None, **kwargs):
+        request = _parse_body(kwargs.get("body", "{}"))
+        if not (self.force if force is None else force) and not is_deterministic(request):
+            self.cache.record_skip()
+            return self.client.invoke_model(**kwargs)
+
+        extra = {k: v for k, v in kwargs.items() if k not in ("body", "modelId")}
+        key = make_key("invoke_model", kwargs.get("modelId"), [request, extra])
+        cached = self.cache.get(key)
+        if cached is None:
+            response = self.client.invoke_model(**kwargs)
+            cached = {
+                "body": response["body"].read(),
+                "contentType": response.get("contentType"),
+            }
+            self.cache.put(key, cached)
+
+        return {
+            "body": StreamingBody(io.BytesIO(cached["body"]), len(cached["body"])),
+            "contentType": cached["contentType"],
+        }
+
+    def converse(self, force=None, **kwargs):
+        request = {k: v for k, v in kwargs.items() if k != "modelId"}
+        if not (self.force if force is None else force) and not is_deterministic(request):
+            self.cache.record_skip()
+            return self.client.converse(**kwargs)
+
+        key = make_key("converse", kwargs.get("modelId"), request)
+        cached = self.cache.get(key)
+        if cached is None:
+            response = self.client.converse(**kwargs)
+            cached = {k: v for k, v in response.items() if k != "ResponseMetadata"}
+            self.cache.put(key, cached)
+        return copy.deepcopy(cached)
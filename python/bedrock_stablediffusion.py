@@ -1,11 +1,11 @@
 import base64
-import boto3
 import json
 import os
 import random
+from bedrock_client import get_runtime_client
 
 # 填写region
-client = boto3.client("bedrock-runtime", region_name="us-east-1")
+client = get_runtime_client(region_name="us-east-1")
 
 # model id
 model_id = "stability.stable-diffusion-xl-v1"
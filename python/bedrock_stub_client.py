@@ -0,0 +1,122 @@
+"""
+文件名: bedrock_stub_client.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+本地 Bedrock Runtime 桩客户端，按 Claude Messages API 的流式事件格式回放预置的响应，
+用于在没有 AWS 凭证的情况下离线运行性能测试、压测和流式解析逻辑。
+
+功能：
+    - 根据给定文本自动生成 message_start / content_block_delta / message_stop 等事件
+    - 从 JSON Lines 文件回放录制好的事件流（每行一个 chunk 对象）
+    - 可配置首 token 延迟和 token 间隔，模拟真实的流式输出节奏
+
+使用示例：
+    from bedrock_stub_client import StubBedrockRuntimeClient
+    client = StubBedrockRuntimeClient(ttft=0.2, inter_token_delay=0.01)
+    response = client.invoke_model_with_response_stream(body=b"{}", modelId="stub")
+"""
+
+import io
+import json
+import time
+
+DEFAULT_STUB_TEXT = (
+    "人工智能已经广泛应用于医疗保健、教育、金融、交通和制造业等领域，"
+    "在提高效率、降低成本和改善用户体验方面发挥着重要作用。"
+)
+
+
+def build_message_events(text, chunk_chars=4, input_tokens=1000):
+    """把一段文本拆分成 Claude Messages API 的流式事件列表"""
+    deltas = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+    events = [
+        {
+            "type": "message_start",
+            "message": {
+                "id": "msg_stub",
+                "type": "message",
+                "role": "assistant",
+                "content": [],
+                "model": "stub",
+                "usage": {"input_tokens": input_tokens, "output_tokens": 1},
+            },
+        },
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+    ]
+    for delta in deltas:
+        events.append({
+            "type": "content_block_delta",
+            "index": 0,
+            "delta": {"type": "text_delta", "text": delta},
+        })
+    events.append({"type": "content_block_stop", "index": 0})
+    events.append({
+        "type": "message_delta",
+        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+        "usage": {"output_tokens": len(deltas)},
+    })
+    events.append({"type": "message_stop"})
+    return events
+
+
+def load_events(path):
+    """从 JSON Lines 文件加载录制好的事件流"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class StubBedrockRuntimeClient:
+    """
+    模拟 bedrock-runtime 客户端的 invoke_model / invoke_model_with_response_stream
+
+    Args:
+        events: 预置事件列表（可选，默认由 text 生成）
+        text: 用于生成事件的响应文本
+        ttft: 首个 content_block_delta 之前的延迟（秒）
+        inter_token_delay: 相邻 content_block_delta 之间的延迟（秒）
+    """
+
+    def __init__(self, events=None, text=DEFAULT_STUB_TEXT, ttft=0.2, inter_token_delay=0.02):
+        self.events = events if events is not None else build_message_events(text)
+        self.ttft = ttft
+        self.inter_token_delay = inter_token_delay
+
+    @classmethod
+    def from_jsonl(cls, path, **kwargs):
+        """从录制文件创建桩客户端"""
+        return cls(events=load_events(path), **kwargs)
+
+    def _replay(self):
+        """按配置的节奏逐个产出事件"""
+        first_delta = True
+        for event in self.events:
+            if event.get("type") == "content_block_delta":
+                time.sleep(self.ttft if first_delta else self.inter_token_delay)
+                first_delta = False
+            yield {"chunk": {"bytes": json.dumps(event, ensure_ascii=False).encode("utf-8")}}
+
+    def invoke_model_with_response_stream(self, body=None, modelId=None, **kwargs):
+        return {"body": self._replay(), "contentType": "application/json"}
+
+    def invoke_model(self, body=None, modelId=None, **kwargs):
+        text = "".join(
+            e["delta"].get("text", "") for e in self.events if e.get("type") == "content_block_delta"
+        )
+        output_tokens = sum(1 for e in self.events if e.get("type") == "content_block_delta")
+        time.sleep(self.ttft + self.inter_token_delay * output_tokens)
+        response_body = {
+            "id": "msg_stub",
+            "type": "message",
+            "role": "assistant",
+            "content": [{"type": "text", "text": text}],
+            "model": modelId or "stub",
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 0, "output_tokens": output_tokens},
+        }
+        return {
+            "body": io.BytesIO(json.dumps(response_body, ensure_ascii=False).encode("utf-8")),
+            "contentType": "application/json",
+        }
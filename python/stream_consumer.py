@@ -0,0 +1,173 @@
+"""
+文件名: stream_consumer.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+invoke_model_with_response_stream 响应流的公共消费模块。
+
+功能：
+    - 文本 delta 追加到列表，最后一次性 join，避免 += 造成的二次方拷贝
+    - 复用同一个 JSONDecoder；先在原始字节里判断事件类型，
+      ping / content_block_stop 等无关事件不做 JSON 解析
+    - 同时提供 delta 迭代器（边收边处理）和最终组装好的完整消息
+    - 支持 Claude Messages API（默认）和旧版 Text Completions（claude-v2 等）两种格式
+
+使用示例：
+    consumer = StreamConsumer(response.get('body'))
+    for text in consumer.iter_text():
+        print(text, end="", flush=True)
+    message = consumer.message()
+"""
+
+import json
+
+MESSAGES_FORMAT = "messages"
+COMPLETION_FORMAT = "completion"
+
+_DECODER = json.JSONDecoder()
+
+# 需要解析的事件类型标记（按原始字节匹配，无需先解析 JSON）
+_DELTA_MARKER = b'"content_block_delta"'
+_PARSED_MARKERS = (
+    b'"message_start"',
+    b'"content_block_start"',
+    b'"message_delta"',
+    b'"message_stop"',
+)
+
+
+def parse_chunk(raw):
+    """解析单个 chunk 的字节内容"""
+    return _DECODER.decode(raw.decode("utf-8"))
+
+
+class StreamConsumer:
+    """
+    流式响应消费者
+
+    Args:
+        stream: 响应中的 EventStream（response.get('body')），也可以是任意 chunk 事件可迭代对象
+        fmt: 响应格式，messages（Claude 3 及以上）或 completion（claude-v2 等旧版模型）
+    """
+
+    def __init__(self, stream, fmt=MESSAGES_FORMAT):
+        self.stream = stream
+        self.fmt = fmt
+        self.blocks = {}         # index -> {"type": ..., "parts": [...]}
+        self.text_parts = []     # 所有 text delta，按到达顺序
+        self.message_meta = {}
+        self.stop_reason = None
+        self.usage = {}
+        self.invocation_metrics = None
+        self._consumed = False
+
+    def _raw_chunks(self):
+        for event in self.stream or ():
+            chunk = event.get("chunk")
+            if chunk:
+                yield chunk.get("bytes")
+
+    def _handle_messages_event(self, raw):
+        """处理一个 Messages API 事件，若产生文本 delta 则返回文本"""
+        if _DELTA_MARKER in raw:
+            obj = parse_chunk(raw)
+            delta = obj["delta"]
+            block = self.blocks.setdefault(obj.get("index", 0), {"type": "text", "parts": []})
+            delta_type = delta.get("type")
+            if delta_type == "text_delta":
+                text = delta["text"]
+                block["parts"].append(text)
+                self.text_parts.append(text)
+                return text
+            if delta_type == "thinking_delta":
+                block["parts"].append(delta["thinking"])
+            elif delta_type == "input_json_delta":
+                block["parts"].append(delta["partial_json"])
+            return None
+
+        if not any(marker in raw for marker in _PARSED_MARKERS):
+            return None
+
+        obj = parse_chunk(raw)
+        event_type = obj.get("type")
+        if event_type == "message_start":
+            message = obj.get("message", {})
+            self.message_meta = {k: message.get(k) for k in ("id", "model", "role")}
+            self.usage.update(message.get("usage", {}))
+        elif event_type == "content_block_start":
+            content_block = obj.get("content_block", {})
+            self.blocks[obj.get("index", 0)] = {
+                "type": content_block.get("type", "text"),
+                "parts": [],
+                "start": content_block,
+            }
+        elif event_type == "message_delta":
+            self.stop_reason = obj.get("delta", {}).get("stop_reason")
+            self.usage.update(obj.get("usage", {}))
+        elif event_type == "message_stop":
+            self.invocation_metrics = obj.get("amazon-bedrock-invocationMetrics")
+        return None
+
+    def _handle_completion_event(self, raw):
+        """处理一个旧版 Text Completions 事件"""
+        obj = parse_chunk(raw)
+        if obj.get("stop_reason"):
+            self.stop_reason = obj["stop_reason"]
+        if "amazon-bedrock-invocationMetrics" in obj:
+            self.invocation_metrics = obj["amazon-bedrock-invocationMetrics"]
+        text = obj.get("completion")
+        if text:
+            self.text_parts.append(text)
+        return text
+
+    def iter_text(self):
+        """逐个产出文本 delta（响应流只能消费一次）"""
+        if self._consumed:
+            raise RuntimeError("响应流已被消费")
+        self._consumed = True
+
+        handle = (self._handle_completion_event if self.fmt == COMPLETION_FORMAT
+                  else self._handle_messages_event)
+        for raw in self._raw_chunks():
+            text = handle(raw)
+            if text:
+                yield text
+
+    def consume(self):
+        """消费剩余的全部响应流"""
+        if not self._consumed:
+            for _ in self.iter_text():
+                pass
+        return self
+
+    @property
+    def text(self):
+        """拼接后的完整文本"""
+        self.consume()
+        return "".join(self.text_parts)
+
+    def message(self):
+        """组装与非流式 invoke_model 响应结构一致的完整消息"""
+        self.consume()
+        if self.fmt == COMPLETION_FORMAT:
+            return {"completion": self.text, "stop_reason": self.stop_reason}
+
+        content = []
+        for index in sorted(self.blocks):
+            block = self.blocks[index]
+            joined = "".join(block["parts"])
+            if block["type"] == "thinking":
+                content.append({"type": "thinking", "thinking": joined})
+            elif block["type"] == "tool_use":
+                tool_use = dict(block.get("start", {}))
+                tool_use["input"] = json.loads(joined) if joined else {}
+                content.append(tool_use)
+            else:
+                content.append({"type": block["type"], "text": joined})
+
+        message = {"type": "message", **self.message_meta, "content": content,
+                   "stop_reason": self.stop_reason, "usage": self.usage}
+        if self.invocation_metrics:
+            message["amazon-bedrock-invocationMetrics"] = self.invocation_metrics
+        return message
@@ -0,0 +1,169 @@
+"""
+文件名: stream_metrics.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+流式响应的逐 chunk 计时工具，用于诊断高并发下的尾延迟和输出卡顿。
+
+功能：
+    - 包装任意 invoke_model_with_response_stream 的响应流，记录每个 chunk 的到达时间和大小
+    - 统计 chunk 间隔的分桶直方图和 p50/p90/p99
+    - 按阈值检测卡顿（相邻 chunk 间隔过大）
+    - 以 JSON Lines 导出单个请求的完整时间线
+
+使用示例：
+    start = time.perf_counter()
+    response = bedrock_runtime.invoke_model_with_response_stream(...)
+    stream = TimedStream(response.get('body'), start_time=start)
+    for event in stream:
+        ...
+    print_stream_summary(stream)
+    stream.to_jsonl("trace.jsonl")
+"""
+
+import json
+import re
+import time
+import uuid
+
+# 直方图分桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DEFAULT_STALL_THRESHOLD = 1.0
+
+_TYPE_PATTERN = re.compile(rb'"type"\s*:\s*"(\w+)"')
+
+
+def percentile(values, p):
+    """计算百分位数（线性插值），values 为空时返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def histogram(values, buckets=DEFAULT_BUCKETS):
+    """按分桶上界统计数量，返回 [(上界, 数量), ...]，最后一个桶上界为 inf"""
+    bounds = list(buckets) + [float("inf")]
+    counts = [0] * len(bounds)
+    for value in values:
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                counts[i] += 1
+                break
+    return list(zip(bounds, counts))
+
+
+class TimedStream:
+    """
+    带计时的响应流包装器
+
+    Args:
+        stream: 原始响应流（response.get('body')）
+        request_id: 请求标识，写入导出的 trace（默认自动生成）
+        start_time: 请求发出时刻（time.perf_counter()），默认为包装时刻
+        stall_threshold: 判定为卡顿的 chunk 间隔（秒）
+    """
+
+    def __init__(self, stream, request_id=None, start_time=None,
+                 stall_threshold=DEFAULT_STALL_THRESHOLD):
+        self.stream = stream
+        self.request_id = request_id or uuid.uuid4().hex
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        self.stall_threshold = stall_threshold
+        self.end_time = None
+        self.records = []    # [(相对开始时刻的秒数, 字节数, 事件类型), ...]
+
+    def __iter__(self):
+        for event in self.stream or ():
+            now = time.perf_counter()
+            chunk = event.get("chunk")
+            raw = chunk.get("bytes", b"") if chunk else b""
+            match = _TYPE_PATTERN.search(raw)
+            event_type = match.group(1).decode() if match else None
+            self.records.append((now - self.start_time, len(raw), event_type))
+            yield event
+        self.end_time = time.perf_counter()
+
+    @property
+    def first_chunk_latency(self):
+        return self.records[0][0] if self.records else None
+
+    def gaps(self):
+        """相邻 chunk 的到达间隔"""
+        offsets = [r[0] for r in self.records]
+        return [b - a for a, b in zip(offsets, offsets[1:])]
+
+    def stalls(self, threshold=None):
+        """间隔超过阈值的卡顿列表"""
+        threshold = threshold if threshold is not None else self.stall_threshold
+        offsets = [r[0] for r in self.records]
+        return [
+            {"seq": i + 1, "at": offsets[i], "gap": gap}
+            for i, gap in enumerate(self.gaps())
+            if gap >= threshold
+        ]
+
+    def histogram(self, buckets=DEFAULT_BUCKETS):
+        return histogram(self.gaps(), buckets)
+
+    def summary(self):
+        gaps = self.gaps()
+        total = (self.end_time - self.start_time) if self.end_time else (
+            self.records[-1][0] if self.records else None)
+        return {
+            "request_id": self.request_id,
+            "chunks": len(self.records),
+            "bytes": sum(r[1] for r in self.records),
+            "first_chunk_latency": self.first_chunk_latency,
+            "total_time": total,
+            "gap_p50": percentile(gaps, 50),
+            "gap_p90": percentile(gaps, 90),
+            "gap_p99": percentile(gaps, 99),
+            "gap_max": max(gaps) if gaps else None,
+            "stalls": self.stalls(),
+        }
+
+    def to_jsonl(self, path_or_file):
+        """导出 trace：每个 chunk 一行，最后一行为汇总"""
+        if isinstance(path_or_file, str):
+            with open(path_or_file, "a", encoding="utf-8") as f:
+                return self.to_jsonl(f)
+
+        previous = 0.0
+        for seq, (offset, size, event_type) in enumerate(self.records):
+            line = {
+                "request_id": self.request_id,
+                "seq": seq,
+                "t": round(offset, 6),
+                "gap": round(offset - previous, 6),
+                "bytes": size,
+                "type": event_type,
+            }
+            path_or_file.write(json.dumps(line) + "\n")
+            previous = offset
+        path_or_file.write(json.dumps({"request_id": self.request_id, "summary": self.summary()}) + "\n")
+
+
+def print_stream_summary(stream):
+    """打印单个请求的 chunk 计时汇总和间隔直方图"""
+    def fmt(value):
+        return f"{value:.3f}" if value is not None else "N/A"
+
+    summary = stream.summary()
+    print(f"\n[{summary['request_id']}] chunks: {summary['chunks']}, "
+          f"首个 chunk: {fmt(summary['first_chunk_latency'])} 秒, 总耗时: {fmt(summary['total_time'])} 秒")
+    print(f"chunk 间隔: p50 {fmt(summary['gap_p50'])} | p90 {fmt(summary['gap_p90'])} | "
+          f"p99 {fmt(summary['gap_p99'])} | max {fmt(summary['gap_max'])} 秒")
+
+    hist = stream.histogram()
+    peak = max((count for _, count in hist), default=0) or 1
+    for bound, count in hist:
+        label = f"<= {bound:g}s" if bound != float("inf") else f" > {hist[-2][0]:g}s"
+        print(f"  {label:>9} | {'#' * int(40 * count / peak):<40} {count}")
+
+    for stall in summary["stalls"]:
+        print(f"  [!] 卡顿: 第 {stall['seq']} 个 chunk 前等待 {stall['gap']:.3f} 秒")
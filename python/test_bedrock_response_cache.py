@@ -0,0 +1,171 @@
+import io
+import json
+
+import pytest
+
+import bedrock_response_cache
+from bedrock_response_cache import CachedBedrockClient, ResponseCache, dumps, is_deterministic, make_key
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(bedrock_response_cache.time, "time", clock.time)
+    return clock
+
+
+class FakeRuntimeClient:
+    def __init__(self):
+        self.calls = {"invoke_model": 0, "converse": 0}
+
+    def invoke_model(self, body, modelId, **kwargs):
+        self.calls["invoke_model"] += 1
+        return {"body": io.BytesIO(json.dumps({"n": self.calls["invoke_model"]}).encode()),
+                "contentType": "application/json"}
+
+    def converse(self, modelId, **kwargs):
+        self.calls["converse"] += 1
+        return {"output": {"message": {"content": [{"text": str(self.calls["converse"])}]}},
+                "ResponseMetadata": {"RequestId": "r"}}
+
+    def list_foundation_models(self):
+        return "passthrough"
+
+
+def _value(i):
+    return {"body": b"x" * 50, "i": i}
+
+
+def _disk_keys(cache):
+    return [row[0] for row in cache.db.execute("SELECT key FROM responses ORDER BY key")]
+
+
+def test_disk_eviction_by_size_keeps_recently_used(tmp_path, clock):
+    size = len(dumps(_value(0)))
+    cache = ResponseCache(str(tmp_path / "cache.db"), memory_entries=100, max_disk_bytes=size * 3, ttl=None)
+    for i in range(3):
+        cache.put(f"k{i}", _value(i))
+        clock.now += 1
+    cache.memory.clear()
+    assert cache.get("k0") == _value(0)  # 刷新 k0 的访问时间
+    clock.now += 1
+
+    cache.put("k3", _value(3))
+
+    assert _disk_keys(cache) == ["k0", "k2", "k3"]
+    assert cache.metrics["evictions"] == 1
+    assert cache.disk_bytes == size * 3
+    cache.close()
+
+
+def test_disk_eviction_counts_expired_entries(tmp_path, clock):
+    size = len(dumps(_value(0)))
+    cache = ResponseCache(str(tmp_path / "cache.db"), memory_entries=100, max_disk_bytes=size * 2, ttl=10)
+    cache.put("old1", _value(1))
+    cache.put("old2", _value(2))
+    clock.now += 5
+    cache.put("fresh", _value(3))  # 超出容量：淘汰最久未访问的 old1
+    assert _disk_keys(cache) == ["fresh", "old2"]
+    clock.now += 6
+
+    cache.put("new", _value(4))  # old2 过期被删除，不再需要按容量淘汰
+
+    assert _disk_keys(cache) == ["fresh", "new"]
+    assert cache.metrics["evictions"] == 2
+    assert cache.disk_bytes == size * 2
+    assert cache.db.execute("SELECT SUM(size) FROM responses").fetchone()[0] == cache.disk_bytes
+    cache.close()
+
+
+def test_key_ignores_field_order_but_not_content():
+    a = make_key("invoke_model", "m", {"temperature": 0, "messages": [{"role": "user", "content": "hi"}]})
+    b = make_key("invoke_model", "m", {"messages": [{"content": "hi", "role": "user"}], "temperature": 0})
+    assert a == b
+    assert a != make_key("invoke_model", "m2", {"temperature": 0, "messages": [{"role": "user", "content": "hi"}]})
+    assert a != make_key("converse", "m", {"temperature": 0, "messages": [{"role": "user", "content": "hi"}]})
+    assert make_key("converse", "m", {"doc": b"abc"}) != make_key("converse", "m", {"doc": b"abd"})
+
+
+def test_is_deterministic():
+    assert is_deterministic({"temperature": 0})
+    assert is_deterministic({"inferenceConfig": {"topK": 1, "temperature": 0.7}})
+    assert is_deterministic({"textGenerationConfig": {"temperature": 0}})
+    assert not is_deterministic({"max_tokens": 10})
+    assert not is_deterministic({"temperature": 0.5})
+
+
+def test_ttl_expiry_in_memory_and_on_disk(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path, ttl=10)
+    cache.put("k", _value(1))
+    clock.now += 5
+    assert cache.get("k") == _value(1)
+    assert cache.metrics["memory_hits"] == 1
+    cache.close()
+
+    # 新进程：内存层为空，从磁盘层命中
+    cache = ResponseCache(path, ttl=10)
+    assert cache.disk_bytes == len(dumps(_value(1)))
+    assert cache.get("k") == _value(1)
+    assert cache.metrics["disk_hits"] == 1
+    clock.now += 6
+
+    assert cache.get("k") is None
+    cache.memory.clear()
+    assert cache.get("k") is None
+    assert cache.metrics["misses"] == 2
+    assert _disk_keys(cache) == []
+    assert cache.disk_bytes == 0
+    cache.close()
+
+
+def test_memory_lru_eviction(clock):
+    cache = ResponseCache(memory_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert list(cache.memory) == ["a", "c"]
+    assert cache.metrics["evictions"] == 1
+
+
+def test_cached_client_invoke_model(clock):
+    runtime = FakeRuntimeClient()
+    client = CachedBedrockClient(runtime)
+
+    first = client.invoke_model(body=json.dumps({"temperature": 0, "prompt": "hi"}), modelId="m")
+    second = client.invoke_model(body=json.dumps({"prompt": "hi", "temperature": 0}), modelId="m")
+    assert json.loads(first["body"].read()) == json.loads(second["body"].read()) == {"n": 1}
+    assert second["contentType"] == "application/json"
+
+    client.invoke_model(body=json.dumps({"temperature": 0, "prompt": "hi"}), modelId="m", trace="ENABLED")
+    client.invoke_model(body=json.dumps({"temperature": 0.9, "prompt": "hi"}), modelId="m")
+    client.invoke_model(body=json.dumps({"temperature": 0.9, "prompt": "hi"}), modelId="m", force=True)
+    client.invoke_model(body=json.dumps({"temperature": 0.9, "prompt": "hi"}), modelId="m", force=True)
+
+    assert runtime.calls["invoke_model"] == 4
+    stats = client.cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["skipped"]) == (2, 3, 1)
+    assert client.list_foundation_models() == "passthrough"
+
+
+def test_cached_client_converse_returns_copies(clock):
+    runtime = FakeRuntimeClient()
+    client = CachedBedrockClient(runtime)
+    request = {"modelId": "m", "messages": [{"role": "user", "content": [{"text": "hi"}]}],
+               "inferenceConfig": {"temperature": 0}}
+
+    first = client.converse(**request)
+    first["output"]["message"]["content"][0]["text"] = "changed"
+    second = client.converse(**request)
+
+    assert runtime.calls["converse"] == 1
+    assert second == {"output": {"message": {"content": [{"text": "1"}]}}}
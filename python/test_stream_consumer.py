@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from bedrock_stub_client import StubBedrockRuntimeClient, build_message_events
+from stream_consumer import COMPLETION_FORMAT, StreamConsumer
+
+
+def _stream(events):
+    return [{"chunk": {"bytes": json.dumps(event, ensure_ascii=False).encode("utf-8")}} for event in events]
+
+
+def test_text_deltas_and_message():
+    text = "人工智能正在改变医疗、教育和金融。"
+    events = build_message_events(text, chunk_chars=3, input_tokens=12)
+    events[-1]["amazon-bedrock-invocationMetrics"] = {"inputTokenCount": 12}
+    consumer = StreamConsumer(_stream(events))
+
+    deltas = list(consumer.iter_text())
+
+    assert deltas == [text[i:i + 3] for i in range(0, len(text), 3)]
+    assert consumer.text == text
+    assert consumer.message() == {
+        "type": "message", "id": "msg_stub", "model": "stub", "role": "assistant",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "usage": {"input_tokens": 12, "output_tokens": len(deltas)},
+        "amazon-bedrock-invocationMetrics": {"inputTokenCount": 12},
+    }
+
+
+def test_thinking_and_tool_use_blocks():
+    events = [
+        {"type": "message_start", "message": {"id": "m", "model": "x", "role": "assistant", "usage": {}}},
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "thinking", "thinking": ""}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "thinking_delta", "thinking": "先想"}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "thinking_delta", "thinking": "一下"}},
+        {"type": "content_block_stop", "index": 0},
+        {"type": "content_block_start", "index": 1, "content_block": {"type": "text", "text": ""}},
+        {"type": "content_block_delta", "index": 1, "delta": {"type": "text_delta", "text": "查询天气"}},
+        {"type": "content_block_start", "index": 2,
+         "content_block": {"type": "tool_use", "id": "t1", "name": "weather", "input": {}}},
+        {"type": "content_block_delta", "index": 2, "delta": {"type": "input_json_delta", "partial_json": '{"city"'}},
+        {"type": "content_block_delta", "index": 2, "delta": {"type": "input_json_delta", "partial_json": ': "北京"}'}},
+        {"type": "ping"},
+        {"type": "message_delta", "delta": {"stop_reason": "tool_use"}, "usage": {"output_tokens": 9}},
+        {"type": "message_stop"},
+    ]
+    consumer = StreamConsumer(_stream(events))
+
+    assert list(consumer.iter_text()) == ["查询天气"]
+    message = consumer.message()
+    assert message["content"] == [
+        {"type": "thinking", "thinking": "先想一下"},
+        {"type": "text", "text": "查询天气"},
+        {"type": "tool_use", "id": "t1", "name": "weather", "input": {"city": "北京"}},
+    ]
+    assert message["stop_reason"] == "tool_use"
+    assert message["usage"] == {"output_tokens": 9}
+
+
+def test_completion_format():
+    events = [{"completion": "Hello"}, {"completion": ", world"},
+              {"completion": "", "stop_reason": "stop_sequence",
+               "amazon-bedrock-invocationMetrics": {"outputTokenCount": 3}}]
+    consumer = StreamConsumer(_stream(events), fmt=COMPLETION_FORMAT)
+
+    assert list(consumer.iter_text()) == ["Hello", ", world"]
+    assert consumer.message() == {"completion": "Hello, world", "stop_reason": "stop_sequence"}
+    assert consumer.invocation_metrics == {"outputTokenCount": 3}
+
+
+def test_stream_is_consumed_once():
+    consumer = StreamConsumer(_stream(build_message_events("abcdef", chunk_chars=2)))
+    assert consumer.text == "abcdef"
+    assert consumer.text == "abcdef"
+    with pytest.raises(RuntimeError):
+        list(consumer.iter_text())
+
+
+def test_empty_stream_and_non_chunk_events():
+    consumer = StreamConsumer([{"internalServerException": {}}, {"chunk": {}}])
+    assert consumer.text == ""
+    assert consumer.message()["content"] == []
+    assert StreamConsumer(None).text == ""
+
+
+def test_stub_client_stream():
+    client = StubBedrockRuntimeClient(text="离线回放", ttft=0, inter_token_delay=0)
+    response = client.invoke_model_with_response_stream(body=b"{}", modelId="stub")
+    assert StreamConsumer(response["body"]).text == "离线回放"
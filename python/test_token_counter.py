@@ -0,0 +1,34 @@
+import pytest
+import tiktoken
+
+import token_counter
+from token_counter import count_tokens, generate_text_with_tokens
+
+CL100K_PATTERN = (r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|"""
+                  r"""\s++$|\s*[\r\n]|\s+(?!\S)|\s""")
+MERGED = ["the", " the", " is", " performance", " test", "\n\n", "  ", "性能", "测试"]
+
+
+@pytest.fixture(scope="module")
+def encoding_name():
+    """离线构造的小型 BPE 编码：单字节 token 加少量合并，中文字符大多被拆成多个字节 token"""
+    ranks = {bytes([i]): i for i in range(256)}
+    for word in MERGED:
+        data = word.encode("utf-8")
+        for end in range(2, len(data) + 1):
+            ranks.setdefault(data[:end], len(ranks))
+    name = "test_bpe"
+    token_counter._encodings[name] = tiktoken.Encoding(name, pat_str=CL100K_PATTERN, mergeable_ranks=ranks,
+                                                       special_tokens={})
+    yield name
+    del token_counter._encodings[name]
+
+
+@pytest.mark.parametrize("base_text", [
+    "This is the performance test. ",
+    "这是一个性能测试，用于测量首 token 延迟。",
+])
+@pytest.mark.parametrize("target", [1, 2, 7, 50, 333, 1000])
+def test_generated_text_has_exact_token_count(encoding_name, base_text, target):
+    text = generate_text_with_tokens(target, base_text, encoding_name)
+    assert count_tokens(text, encoding_name) == target
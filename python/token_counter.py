@@ -0,0 +1,113 @@
+"""
+文件名: token_counter.py
+作者: Cao Liu
+创建日期: 2025-10-17
+
+描述:
+基于 tiktoken 的 token 计数组件，供性能测试脚本使用。
+
+功能：
+    - 编码器在进程内只加载一次（线程安全），避免每次计数都重新加载词表
+    - TokenCounter 按流式 delta 增量计数，无需在流结束后重新编码整段响应
+    - generate_text_with_tokens 通过切片 token ID 生成恰好指定 token 数的输入文本
+
+注意：
+    按 delta 分别编码时，跨 delta 边界的字符不会被合并成一个 token，
+    结果与整段编码相比可能略有偏差（通常在 1% 以内），对吞吐量统计足够精确。
+"""
+
+import threading
+import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def get_encoding(name=DEFAULT_ENCODING):
+    """获取（并缓存）tiktoken 编码器"""
+    encoding = _encodings.get(name)
+    if encoding is None:
+        with _encodings_lock:
+            encoding = _encodings.get(name)
+            if encoding is None:
+                encoding = tiktoken.get_encoding(name)
+                _encodings[name] = encoding
+    return encoding
+
+
+def count_tokens(text, encoding_name=DEFAULT_ENCODING):
+    """计算文本的token数量"""
+    return len(get_encoding(encoding_name).encode_ordinary(text))
+
+
+class TokenCounter:
+    """流式输出的增量 token 计数器"""
+
+    def __init__(self, encoding_name=DEFAULT_ENCODING):
+        self.encoding = get_encoding(encoding_name)
+        self.count = 0
+
+    def add(self, text):
+        """累加一个 delta 的 token 数，返回该 delta 的 token 数"""
+        tokens = len(self.encoding.encode_ordinary(text))
+        self.count += tokens
+        return tokens
+
+    def reset(self):
+        self.count = 0
+
+
+PAD_FILLERS = (" x", "x", " ", "\n")
+
+
+def generate_text_with_tokens(target_tokens, base_text, encoding_name=DEFAULT_ENCODING):
+    """
+    生成恰好 target_tokens 个 token 的文本
+
+    先对 base_text 编码一次，再重复并切片 token ID 后解码，避免反复编码不断变长的字符串。
+    解码后的文本重新编码时，切片边界附近的 token 可能合并或拆分（或切在多字节字符中间被丢弃），
+    因此重新计数并按差值调整切片长度；仍差几个 token 时（例如一个汉字占多个 token）在末尾补短填充。
+
+    Raises:
+        ValueError: 无法拼出恰好 target_tokens 个 token 的文本
+    """
+    if target_tokens <= 0:
+        return ""
+    encoding = get_encoding(encoding_name)
+    base_tokens = encoding.encode_ordinary(base_text + "\n")
+    # 多留两份余量，供重新计数后加长切片
+    tokens = base_tokens * (target_tokens // len(base_tokens) + 2)
+
+    def decode(length):
+        # 切片末尾落在多字节字符中间时丢弃不完整的 token
+        for end in range(length, max(length - 4, 0), -1):
+            try:
+                return encoding.decode_bytes(tokens[:end]).decode("utf-8")
+            except UnicodeDecodeError:
+                continue
+        return ""
+
+    # 按差值调整切片长度，记录不超过目标的最长结果
+    text, count = "", 0
+    length = target_tokens
+    for _ in range(20):
+        candidate = decode(length)
+        candidate_count = len(encoding.encode_ordinary(candidate))
+        if count <= candidate_count <= target_tokens:
+            text, count = candidate, candidate_count
+        if candidate_count == target_tokens:
+            return candidate
+        length = min(max(length + target_tokens - candidate_count, 1), len(tokens))
+
+    # 逐个追加填充，直到恰好达到目标
+    while count < target_tokens:
+        for filler in PAD_FILLERS:
+            padded_count = len(encoding.encode_ordinary(text + filler))
+            if count < padded_count <= target_tokens:
+                text, count = text + filler, padded_count
+                break
+        else:
+            raise ValueError(f"无法生成恰好 {target_tokens} 个 token 的文本")
+    return text
@@ -0,0 +1,82 @@
+import gzip
+import json
+import os
+
+import boto3
+import pytest
+
+from bedrock_batch_input import RECORD_ID_WIDTH, S3Target, make_record_id, write_batch_input
+
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+
+
+def _read_lines(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_record_ids_are_eleven_characters_and_sort_in_order():
+    indexes = [0, 9, 10, 10 ** 8, 10 ** 10, 10 ** 11 - 1]
+    ids = [make_record_id(i) for i in indexes]
+    assert all(len(record_id) == RECORD_ID_WIDTH == 11 and record_id.isalnum() for record_id in ids)
+    assert ids == sorted(ids)
+    with pytest.raises(ValueError):
+        make_record_id(10 ** 11)
+    with pytest.raises(ValueError):
+        make_record_id(-1)
+
+
+def test_write_local_shards_by_record_count(tmp_path):
+    prompts = (f"问题 {i}" for i in range(25))
+    shards = write_batch_input(prompts, str(tmp_path), MODEL_ID, records_per_shard=10)
+
+    assert [shard["records"] for shard in shards] == [10, 10, 5]
+    records = [record for shard in shards for record in _read_lines(shard["uri"])]
+    assert [record["recordId"] for record in records] == [make_record_id(i) for i in range(25)]
+    assert records[3]["modelInput"]["messages"][0]["content"][0]["text"] == "问题 3"
+    assert all(shard["bytes"] == os.path.getsize(shard["uri"]) for shard in shards)
+
+
+def test_write_local_shards_by_bytes_and_compressed(tmp_path):
+    prompts = ["x" * 100] * 6
+    line_bytes = len((json.dumps({"recordId": make_record_id(0),
+                                  "modelInput": {"prompt": "x" * 100, "max_tokens": 10}}) + "\n").encode())
+    shards = write_batch_input(prompts, str(tmp_path), "meta.llama3-8b-instruct-v1:0",
+                               max_shard_bytes=line_bytes * 2, compress=True, max_tokens=10)
+
+    assert [shard["records"] for shard in shards] == [2, 2, 2]
+    assert all(shard["uri"].endswith(".jsonl.gz") for shard in shards)
+    assert _read_lines(shards[0]["uri"])[1] == {"recordId": make_record_id(1),
+                                                "modelInput": {"prompt": "x" * 100, "max_tokens": 10}}
+
+
+def test_write_s3_shards():
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="input-bucket")
+
+        shards = write_batch_input(["a", "b", "c"], "s3://input-bucket/jobs/run1/", MODEL_ID,
+                                   records_per_shard=2, s3_client=s3)
+
+        assert [shard["uri"] for shard in shards] == [
+            "s3://input-bucket/jobs/run1/batch-input-00000.jsonl",
+            "s3://input-bucket/jobs/run1/batch-input-00001.jsonl",
+        ]
+        body = s3.get_object(Bucket="input-bucket", Key="jobs/run1/batch-input-00001.jsonl")["Body"].read()
+        assert [json.loads(line)["recordId"] for line in body.decode("utf-8").splitlines()] == [make_record_id(2)]
+
+
+def test_s3_target_removes_temp_file_when_upload_fails():
+    class FailingS3:
+        def upload_file(self, filename, bucket, key):
+            raise RuntimeError("upload failed")
+
+    target = S3Target("s3://bucket", s3_client=FailingS3())
+    f = target.open_shard("batch-input-00000.jsonl")
+    f.write(b"{}\n")
+    with pytest.raises(RuntimeError):
+        target.commit_shard(f, "batch-input-00000.jsonl")
+    assert target.prefix == ""
+    assert not os.path.exists(f.name)
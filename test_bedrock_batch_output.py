@@ -0,0 +1,101 @@
+import json
+import os
+
+import boto3
+import pytest
+
+from bedrock_batch_input import make_record_id, write_batch_input
+from bedrock_batch_output import BatchOutputReader, InputIndex, list_output_shards
+
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+
+
+def _write_jsonl(path, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write((row if isinstance(row, str) else json.dumps(row, ensure_ascii=False)) + "\n")
+
+
+def _output(index, text="ok"):
+    return {"recordId": make_record_id(index), "modelInput": {"i": index},
+            "modelOutput": {"content": [{"type": "text", "text": text}]}}
+
+
+@pytest.fixture
+def input_index(tmp_path):
+    shards = write_batch_input((f"问题 {i}" for i in range(6)), str(tmp_path / "input"), MODEL_ID,
+                               records_per_shard=4)
+    index = InputIndex(str(tmp_path / "index.db"))
+    assert index.build([shard["uri"] for shard in shards], batch_size=3) == 6
+    yield index
+    index.close()
+
+
+def test_input_index_lookup(input_index):
+    assert len(input_index) == 6
+    record = input_index.get(make_record_id(5))
+    assert record["modelInput"]["messages"][0]["content"][0]["text"] == "问题 5"
+    assert input_index.get("missing0000") is None
+
+
+def test_join_with_missing_and_errored_records(tmp_path, input_index):
+    output_dir = tmp_path / "output" / "job-1"
+    _write_jsonl(str(output_dir / "batch-input-00000.jsonl.out"), [
+        _output(0),
+        {"recordId": make_record_id(1), "modelInput": {}, "error": {"errorCode": 400, "errorMessage": "bad"}},
+        "{not json",
+        _output(3),
+    ])
+    # 记录 2 没有输出；99 不在输入索引中
+    _write_jsonl(str(output_dir / "batch-input-00001.jsonl.out"), [
+        _output(4),
+        _output(99),
+        {"recordId": make_record_id(5), "modelInput": {}},
+    ])
+    _write_jsonl(str(output_dir / "manifest.json.out"), [{"totalRecordCount": 6}])
+
+    reader = BatchOutputReader(str(tmp_path / "output"), input_index=input_index, max_workers=2, queue_size=1)
+    results = {result.record_id: result for result in reader}
+
+    assert sorted(results) == [make_record_id(i) for i in (0, 3, 4, 99)]
+    assert results[make_record_id(3)].input_record["recordId"] == make_record_id(3)
+    assert results[make_record_id(0)].model_output["content"][0]["text"] == "ok"
+    assert results[make_record_id(99)].input_record is None
+    assert reader.succeeded == 4
+
+    failures = {failure.record_id: failure for failure in reader.failures}
+    assert len(reader.failures) == 3
+    assert failures[make_record_id(1)].error == {"errorCode": 400, "errorMessage": "bad"}
+    assert failures[make_record_id(5)].error == "缺少 modelOutput"
+    assert failures[None].line == "{not json"
+    assert make_record_id(2) not in results and make_record_id(2) not in failures
+
+
+def test_early_stop_releases_reader_threads(tmp_path):
+    paths = []
+    for shard in range(3):
+        path = str(tmp_path / f"part-{shard}.jsonl.out")
+        _write_jsonl(path, [_output(shard * 100 + i) for i in range(50)])
+        paths.append(path)
+
+    reader = BatchOutputReader(paths, max_workers=3, queue_size=2)
+    for count, _ in enumerate(reader, 1):
+        if count == 5:
+            break
+    assert reader.succeeded == 5
+
+
+def test_read_s3_output_shards():
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="output-bucket")
+        s3.put_object(Bucket="output-bucket", Key="out/job-1/a.jsonl.out",
+                      Body="\n".join(json.dumps(_output(i)) for i in range(3)).encode("utf-8"))
+        s3.put_object(Bucket="output-bucket", Key="out/job-1/manifest.json.out", Body=b"{}")
+
+        assert list_output_shards("s3://output-bucket/out/", s3) == ["s3://output-bucket/out/job-1/a.jsonl.out"]
+        reader = BatchOutputReader("s3://output-bucket/out/", s3_client=s3)
+        assert sorted(result.record_id for result in reader) == [make_record_id(i) for i in range(3)]
+        assert reader.failures == []
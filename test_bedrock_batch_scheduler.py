@@ -0,0 +1,87 @@
+import pytest
+from botocore.exceptions import ClientError
+
+import bedrock_batch_scheduler
+from bedrock_batch_scheduler import BatchJobScheduler
+from bedrock_batch_stub import StubBedrockBatchClient
+
+
+class ScriptedThrottleClient(StubBedrockBatchClient):
+    """按调用顺序对指定的第 n 次 create / get 调用抛出 ThrottlingException"""
+
+    def __init__(self, throttle_creates=(), throttle_gets=(), **kwargs):
+        super().__init__(**kwargs)
+        self.throttle_creates = set(throttle_creates)
+        self.throttle_gets = set(throttle_gets)
+        self.calls = {"create": 0, "get": 0}
+
+    def _throttle(self, api, scripted, operation):
+        self.calls[api] += 1
+        if self.calls[api] in scripted:
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, operation)
+
+    def create_model_invocation_job(self, **kwargs):
+        self._throttle("create", self.throttle_creates, "CreateModelInvocationJob")
+        return super().create_model_invocation_job(**kwargs)
+
+    def get_model_invocation_job(self, jobIdentifier):
+        self._throttle("get", self.throttle_gets, "GetModelInvocationJob")
+        return super().get_model_invocation_job(jobIdentifier)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    intervals = []
+    monkeypatch.setattr(bedrock_batch_scheduler.time, "sleep", intervals.append)
+    return intervals
+
+
+def _scheduler(bedrock, jobs=3, **kwargs):
+    scheduler = BatchJobScheduler(bedrock, role_arn="role", poll_interval=1, max_poll_interval=8, **kwargs)
+    for i in range(jobs):
+        scheduler.add_job(f"s3://input/batch-{i:05d}.jsonl", records=100, model_id="model-a",
+                          output_s3_uri="s3://output/")
+    return scheduler
+
+
+def test_throttle_then_resubmit_failed_job(sleeps):
+    bedrock = ScriptedThrottleClient(throttle_creates={2}, throttle_gets={1}, job_duration=0,
+                                     fail_job_names={"batch-00001-1"})
+    scheduler = _scheduler(bedrock)
+
+    report = scheduler.run()
+
+    stats = report["models"]["model-a"]
+    assert stats == {"jobs": 3, "succeeded": 3, "failed": 0, "resubmits": 1, "records": 300,
+                     "records_per_hour": stats["records_per_hour"]}
+    assert report["failed_jobs"] == []
+    assert [job.attempts for job in scheduler.jobs] == [1, 2, 1]
+    names = sorted(job["jobName"] for job in bedrock.jobs.values())
+    assert names == ["batch-00000-1", "batch-00001-1", "batch-00001-2", "batch-00002-1"]
+    # 第一轮提交和轮询都被限流：间隔加倍；之后有状态变化时重置
+    assert sleeps[:2] == [1, 2]
+    assert max(sleeps) <= 8
+
+
+def test_quota_limits_submissions_and_gives_up_after_max_resubmits(sleeps):
+    bedrock = StubBedrockBatchClient(job_duration=0, max_concurrent_jobs=1,
+                                     fail_job_names={"batch-00000-1", "batch-00000-2"})
+    scheduler = _scheduler(bedrock, jobs=2, max_concurrent_jobs=1, max_resubmits=1)
+
+    report = scheduler.run()
+
+    assert [job.status for job in scheduler.jobs] == ["Failed", "Completed"]
+    assert scheduler.jobs[0].attempts == 2
+    assert report["models"]["model-a"]["failed"] == 1
+    assert report["failed_jobs"] == [{"name": "batch-00000", "status": "Failed",
+                                      "message": "模拟任务失败", "input": "s3://input/batch-00000.jsonl"}]
+
+
+def test_non_retryable_poll_error_is_raised(sleeps):
+    class BrokenPollClient(StubBedrockBatchClient):
+        def get_model_invocation_job(self, jobIdentifier):
+            raise ClientError({"Error": {"Code": "AccessDeniedException", "Message": "denied"}},
+                              "GetModelInvocationJob")
+
+    with pytest.raises(ClientError):
+        _scheduler(BrokenPollClient(job_duration=0), jobs=1).run()
@@ -0,0 +1,126 @@
+import io
+import json
+
+import pytest
+
+import bedrock_batch_scheduler
+import bedrock_dispatcher
+from bedrock_batch_input import iter_records
+from bedrock_batch_scheduler import BatchJobScheduler
+from bedrock_batch_stub import StubBedrockBatchClient
+from bedrock_dispatcher import BATCH, ON_DEMAND, TokenBucket, choose_mode, dispatch, estimate_tokens, run_on_demand
+
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+
+
+class FakeRuntimeClient:
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.calls = 0
+
+    def invoke_model(self, body, modelId, **kwargs):
+        self.calls += 1
+        text = json.loads(body)["messages"][0]["content"][0]["text"]
+        if text in self.fail_ids:
+            raise RuntimeError("invoke failed")
+        return {"body": io.BytesIO(json.dumps({"content": [{"type": "text", "text": text}]}).encode())}
+
+
+class FrozenClock:
+    """time.monotonic 固定不动，sleep 只记录等待时间"""
+
+    def __init__(self):
+        self.sleeps = []
+
+    def monotonic(self):
+        return 0.0
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FrozenClock()
+    monkeypatch.setattr(bedrock_dispatcher, "time", clock)
+    return clock
+
+
+def _records(count, text="问题"):
+    return list(iter_records((f"{text} {i}" for i in range(count)), MODEL_ID, max_tokens=100))
+
+
+def test_choose_mode_rules():
+    few = choose_mode(_records(10), deadline_seconds=60)
+    assert few.mode == ON_DEMAND and few.requests == 10
+
+    records = _records(300)
+    assert choose_mode(records, deadline_seconds=24 * 3600).mode == BATCH
+
+    fits = choose_mode(records, deadline_seconds=3600, max_tokens=100, tpm_budget=100000, rpm_budget=200)
+    assert fits.mode == ON_DEMAND
+    assert fits.estimated_tokens == sum(estimate_tokens(record, 100) for record in records)
+    # 300 个请求受 RPM 限制：300 / 200 分钟
+    assert fits.on_demand_seconds == pytest.approx(90)
+
+    too_slow = choose_mode(records, deadline_seconds=60, max_tokens=100, rpm_budget=10)
+    assert too_slow.mode == ON_DEMAND
+    assert too_slow.on_demand_seconds == pytest.approx(1800)
+    assert "无法在截止时间前完成" in too_slow.reason
+
+
+def test_choose_mode_token_budget_dominates():
+    records = _records(200)
+    decision = choose_mode(records, deadline_seconds=3600, max_tokens=1000, tpm_budget=20000, rpm_budget=10000)
+    assert decision.on_demand_seconds == pytest.approx(decision.estimated_tokens / 20000 * 60)
+    assert decision.on_demand_seconds > 200 / 10000 * 60
+
+
+def test_token_bucket_reserve(clock):
+    bucket = TokenBucket(rate=2, capacity=4)
+    assert [bucket.reserve() for _ in range(4)] == [0.0] * 4
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve(3) == pytest.approx(2.0)
+
+
+def test_run_on_demand_stays_within_budgets(clock):
+    records = _records(20)
+    client = FakeRuntimeClient(fail_ids={"问题 3"})
+    tpm_budget, rpm_budget = 60000, 120
+
+    results = run_on_demand(records, MODEL_ID, client, concurrency=1, tpm_budget=tpm_budget,
+                            rpm_budget=rpm_budget, max_tokens=100)
+
+    assert [result["recordId"] for result in results] == [record["recordId"] for record in records]
+    assert results[3] == {"recordId": records[3]["recordId"], "error": "invoke failed"}
+    assert results[0]["modelOutput"]["content"][0]["text"] == "问题 0"
+    # 时钟不前进：桶容量之外的请求都要等待，且等待时间覆盖所需的 RPM / TPM 额度
+    tokens = sum(estimate_tokens(record, 100) for record in records)
+    required = max((len(records) - rpm_budget / 60) / (rpm_budget / 60),
+                   (tokens - tpm_budget / 60) / (tpm_budget / 60))
+    assert clock.sleeps and max(clock.sleeps) == pytest.approx(required)
+
+
+def test_dispatch_on_demand_passes_budgets(clock):
+    client = FakeRuntimeClient()
+    result = dispatch([f"问题 {i}" for i in range(5)], deadline_seconds=60, model_id=MODEL_ID,
+                      runtime_client=client, max_tokens=100, rpm_budget=60)
+    assert result["decision"].mode == ON_DEMAND
+    assert client.calls == 5
+    # rpm_budget=60：容量 1 个请求，其后每个请求多等 1 秒
+    assert max(clock.sleeps) == pytest.approx(4)
+
+
+def test_dispatch_batch_uses_scheduler(tmp_path, monkeypatch):
+    monkeypatch.setattr(bedrock_batch_scheduler.time, "sleep", lambda seconds: None)
+    scheduler = BatchJobScheduler(StubBedrockBatchClient(job_duration=0), role_arn="role", poll_interval=1)
+
+    result = dispatch([f"问题 {i}" for i in range(150)], deadline_seconds=48 * 3600, model_id=MODEL_ID,
+                      input_s3_prefix=str(tmp_path), output_s3_uri="s3://output/", scheduler=scheduler)
+
+    assert result["decision"].mode == BATCH
+    assert result["report"]["models"][MODEL_ID]["records"] == 150
+    assert result["output_s3_uri"] == "s3://output/"
+
+    with pytest.raises(ValueError):
+        dispatch([f"问题 {i}" for i in range(150)], deadline_seconds=48 * 3600, model_id=MODEL_ID)